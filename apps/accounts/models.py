@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 
@@ -27,6 +29,30 @@ class UserManager(BaseUserManager):
 
         return self.create_user(email, password, **extra_fields)
 
+    def search(self, query):
+        """
+        Users whose email, first name or last name starts with each word of
+        query (case-insensitive)
+
+        Prefixes are matched as ranges on the lowercased columns, which the
+        functional indexes on User can answer on both SQLite and PostgreSQL;
+        a LIKE 'x%' on LOWER(...) can't use an index on SQLite.
+        """
+        queryset = self.get_queryset().annotate(
+            email_lower=Lower('email'),
+            first_name_lower=Lower('first_name'),
+            last_name_lower=Lower('last_name'),
+        )
+        for word in query.lower().split():
+            # Every string starting with word sorts between word and word + U+10FFFF
+            upper = word + '\U0010ffff'
+            queryset = queryset.filter(
+                Q(email_lower__gte=word, email_lower__lt=upper) |
+                Q(first_name_lower__gte=word, first_name_lower__lt=upper) |
+                Q(last_name_lower__gte=word, last_name_lower__lt=upper)
+            )
+        return queryset
+
 class User(AbstractUser):
     class Role(models.TextChoices):
         VISITOR = 'visitor', _('Visitor')
@@ -56,6 +82,12 @@ class User(AbstractUser):
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        indexes = [
+            # Prefix search in the chat user picker (UserManager.search)
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+            models.Index(Lower('first_name'), name='user_first_name_lower_idx'),
+            models.Index(Lower('last_name'), name='user_last_name_lower_idx'),
+        ]
 
     def __str__(self):
         return self.email
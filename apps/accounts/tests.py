@@ -1,3 +1,68 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.core.models import EmailOutbox
+from apps.core.outbox import process_outbox
+from apps.core.smtp_sink import LocalSMTPServer
+
+
+class RegistrationEmailTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.payload = {
+            'email': 'new.user@example.com',
+            'password': 'a-strong-password-123',
+            'first_name': 'New',
+            'last_name': 'User',
+        }
+
+    def test_register_queues_verification_email(self):
+        response = self.client.post(reverse('accounts:register'), self.payload, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        entry = EmailOutbox.objects.get()
+        self.assertEqual(entry.status, EmailOutbox.Status.PENDING)
+        self.assertEqual(entry.recipients, ['new.user@example.com'])
+        self.assertIn('Verify your email', entry.subject)
+
+    def test_worker_delivers_queued_email_over_smtp(self):
+        self.client.post(reverse('accounts:register'), self.payload, format='json')
+
+        with LocalSMTPServer() as sink:
+            with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                EMAIL_HOST=sink.host,
+                EMAIL_PORT=sink.port,
+                EMAIL_USE_SSL=False,
+                EMAIL_USE_TLS=False,
+                EMAIL_HOST_USER='',
+                EMAIL_HOST_PASSWORD='',
+            ):
+                sent, failed = process_outbox()
+
+        self.assertEqual((sent, failed), (1, 0))
+        self.assertEqual(len(sink.messages), 1)
+        self.assertEqual(sink.messages[0]['to'], ['new.user@example.com'])
+        entry = EmailOutbox.objects.get()
+        self.assertEqual(entry.status, EmailOutbox.Status.SENT)
+        self.assertIsNotNone(entry.send_duration_ms)
+
+    def test_failed_delivery_is_rescheduled(self):
+        self.client.post(reverse('accounts:register'), self.payload, format='json')
+
+        # Nothing listens on port 1, so the SMTP connection is refused
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=1,
+            EMAIL_USE_SSL=False,
+            EMAIL_USE_TLS=False,
+        ):
+            sent, failed = process_outbox()
+
+        self.assertEqual((sent, failed), (0, 1))
+        entry = EmailOutbox.objects.get()
+        self.assertEqual(entry.status, EmailOutbox.Status.PENDING)
+        self.assertEqual(entry.attempts, 1)
+        self.assertGreater(entry.next_attempt_at, entry.created_at)
@@ -16,10 +16,10 @@ from .models import Profile, UserActivity
 from .permissions import IsAdmin, IsRegisteredUser, IsOwnerOrAdmin
 from django.contrib.auth.tokens import default_token_generator
 from django.conf import settings
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
+from apps.core.outbox import enqueue_email
 import uuid
 import json
 from datetime import datetime, timedelta
@@ -84,15 +84,14 @@ Best regards,
             
             # Send verification email
             try:
-                send_mail(
+                enqueue_email(
                     f'Verify your email for {settings.SITE_NAME}',
                     plain_message,
                     settings.DEFAULT_FROM_EMAIL,
                     [user.email],
                     html_message=html_message,
-                    fail_silently=False,
                 )
-                print(f"Verification email sent to {user.email}")
+                print(f"Verification email queued for {user.email}")
             except Exception as e:
                 print(f"Error sending verification email: {str(e)}")
             
@@ -157,15 +156,14 @@ Best regards,
                 
                 # Send verification email
                 try:
-                    send_mail(
+                    enqueue_email(
                         f'Please verify your email for {settings.SITE_NAME}',
                         plain_message,
                         settings.DEFAULT_FROM_EMAIL,
                         [user.email],
                         html_message=html_message,
-                        fail_silently=False,
                     )
-                    print(f"Verification email resent to {user.email}")
+                    print(f"Verification email re-queued for {user.email}")
                 except Exception as e:
                     print(f"Error sending verification email: {str(e)}")
                 
@@ -293,10 +291,7 @@ class ForgotPasswordView(APIView):
             token = default_token_generator.make_token(user)
             reset_url = f"{settings.SITE_URL}/reset-password?token={token}&email={email}"
 
-            # Send password reset email using Django's send_mail
-            from django.core.mail import send_mail
-            from django.template.loader import render_to_string
-            
+            # Queue password reset email for the outbox worker
             html_content = render_to_string('accounts/email/password_reset.html', {
                 'reset_url': reset_url,
                 'site_name': settings.SITE_NAME,
@@ -351,13 +346,12 @@ Best regards,
 '''
             
             try:
-                send_mail(
+                enqueue_email(
                     'Password Reset - Your Portfolio',
                     plain_text,
                     settings.DEFAULT_FROM_EMAIL,
                     [email],
                     html_message=html_content,
-                    fail_silently=False,
                 )
             except Exception as e:
                 print(f"Error sending password reset email: {str(e)}")
@@ -413,9 +407,6 @@ class ResetPasswordView(APIView):
             
             # Send password reset confirmation email
             try:
-                from django.core.mail import send_mail
-                from django.template.loader import render_to_string
-                
                 html_content = render_to_string('accounts/email/password_reset_successful.html', {
                     'site_name': settings.SITE_NAME,
                     'site_url': settings.SITE_URL,
@@ -464,13 +455,12 @@ Best regards,
 {settings.SITE_NAME}
 '''
                 
-                send_mail(
+                enqueue_email(
                     'Password Reset Successful - Your Portfolio',
                     plain_text,
                     settings.DEFAULT_FROM_EMAIL,
                     [email],
                     html_message=html_content,
-                    fail_silently=False,
                 )
             except Exception as e:
                 print(f"Error sending confirmation email: {str(e)}")
@@ -564,16 +554,15 @@ class EmailVerificationView(APIView):
                 '''
                 
                 # Send the email
-                send_mail(
+                enqueue_email(
                     subject=f"{settings.SITE_NAME} - Email Verification Successful",
                     message=plain_text,
                     from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[user.email],
                     html_message=html_message,
-                    fail_silently=False,
                 )
                 
-                print(f"Verification success email sent to {user.email}")
+                print(f"Verification success email queued for {user.email}")
             except Exception as email_error:
                 print(f"Error sending verification success email: {str(email_error)}")
                 # Continue even if email sending fails
@@ -665,13 +654,12 @@ class ResendVerificationEmailView(APIView):
             {settings.SITE_NAME} Team
             '''
             
-            send_mail(
+            enqueue_email(
                 'Verify Your Email Address',
                 plain_text,
                 settings.DEFAULT_FROM_EMAIL,
                 [email],
                 html_message=html_content,
-                fail_silently=False,
             )
             
             # Log activity
@@ -0,0 +1,21 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import EmailOutbox
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'transport', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'transport', 'created_at']
+    search_fields = ['subject', 'recipients']
+    readonly_fields = ['created_at', 'sent_at', 'send_duration_ms', 'locked_at', 'last_error']
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=EmailOutbox.Status.SENT).update(
+            status=EmailOutbox.Status.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            locked_at=None,
+        )
+        self.message_user(request, f"{updated} email(s) re-queued")
+    retry_now.short_description = 'Retry selected emails now'
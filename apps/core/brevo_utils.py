@@ -3,24 +3,71 @@ from sib_api_v3_sdk.rest import ApiException
 from django.conf import settings
 from django.template.loader import render_to_string
 import logging
+import threading
+from functools import lru_cache
+from .models import EmailOutbox
+from .outbox import enqueue_email
 
 logger = logging.getLogger(__name__)
 
 # Configure Brevo API client
 config = sib_api_v3_sdk.Configuration()
-config.api_key['api-key'] = settings.BREVO_API_KEY
+config.api_key['api-key'] = getattr(settings, 'BREVO_API_KEY', '')
+# Size of the keep-alive connection pool shared by all threads in the process
+config.connection_pool_maxsize = getattr(settings, 'BREVO_CONNECTION_POOL_SIZE', 10)
+
+# Brevo accepts at most this many message versions in one request
+BREVO_MAX_MESSAGE_VERSIONS = 1000
 
 # SMTP configuration for direct SMTP usage if needed
 BREVO_SMTP_CONFIG = {
     'host': 'smtp-relay.brevo.com',
     'port': 587,
     'username': '88a3a1001@smtp-brevo.com',
-    'password': settings.BREVO_SMTP_PASSWORD,
+    'password': getattr(settings, 'BREVO_SMTP_PASSWORD', ''),
 }
 
-def send_email_with_brevo(to_email, subject, html_content, sender_name=None, sender_email=None):
+_api_instance = None
+_api_lock = threading.Lock()
+
+def get_transactional_api():
     """
-    Send an email using Brevo API
+    Return the process-wide TransactionalEmailsApi.
+    
+    The underlying ApiClient owns a urllib3 pool, so reusing it keeps TLS
+    connections to api.brevo.com alive between sends instead of opening a
+    new one for every email.
+    """
+    global _api_instance
+    if _api_instance is None:
+        with _api_lock:
+            if _api_instance is None:
+                _api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(config))
+    return _api_instance
+
+@lru_cache(maxsize=8)
+def _parse_sender(default_from_email, site_name):
+    # Format is like "Name <email@example.com>"
+    if '<' in default_from_email and '>' in default_from_email:
+        name = default_from_email.split('<')[0].strip()
+        email = default_from_email.split('<')[1].split('>')[0].strip()
+        return name, email
+    return site_name, default_from_email
+
+def get_default_sender():
+    """Sender name and email parsed once from DEFAULT_FROM_EMAIL"""
+    return _parse_sender(settings.DEFAULT_FROM_EMAIL, settings.SITE_NAME)
+
+def _build_sender(sender_name=None, sender_email=None):
+    default_name, default_email = get_default_sender()
+    return {
+        "name": sender_name or default_name,
+        "email": sender_email or default_email
+    }
+
+def deliver_email_with_brevo(to_email, subject, html_content, sender_name=None, sender_email=None):
+    """
+    Send an email using Brevo API. Called by the email outbox worker.
     
     Args:
         to_email (str): Recipient email address
@@ -30,48 +77,99 @@ def send_email_with_brevo(to_email, subject, html_content, sender_name=None, sen
         sender_email (str, optional): Sender email. Defaults to DEFAULT_FROM_EMAIL from settings.
     
     Returns:
-        bool: True if email was sent successfully, False otherwise
+        str: Brevo message ID
+    
+    Raises:
+        ApiException: If the Brevo API rejects the request
     """
-    try:
-        # Create an instance of the API class
-        api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(config))
-        
-        # Set up sender
-        # Extract email from DEFAULT_FROM_EMAIL if it contains a name
-        default_email = settings.DEFAULT_FROM_EMAIL
-        if '<' in default_email and '>' in default_email:
-            # Format is like "Name <email@example.com>"
-            default_name = default_email.split('<')[0].strip()
-            default_email = default_email.split('<')[1].split('>')[0].strip()
-        else:
-            default_name = settings.SITE_NAME
-            
-        sender = {
-            "name": sender_name or default_name,
-            "email": sender_email or default_email
-        }
-        
-        # Set up recipient
-        to = [{"email": to_email}]
-        
-        # Create the email request
+    send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+        to=[{"email": to_email}],
+        html_content=html_content,
+        sender=_build_sender(sender_name, sender_email),
+        subject=subject
+    )
+    
+    response = get_transactional_api().send_transac_email(send_smtp_email)
+    logger.info(f"Email sent successfully to {to_email} with message ID: {response.message_id}")
+    return response.message_id
+
+def deliver_batch_with_brevo(to_emails, subject, html_content, sender_name=None, sender_email=None, params=None):
+    """
+    Send one template to many recipients using Brevo message versions
+    
+    Each recipient gets their own message version, so nobody sees the other
+    addresses, but up to BREVO_MAX_MESSAGE_VERSIONS recipients share a single
+    API round trip.
+    
+    Args:
+        to_emails (list): Recipient email addresses
+        subject (str): Email subject
+        html_content (str): HTML template, may reference {{ params.<key> }}
+        sender_name (str, optional): Sender name. Defaults to site name from settings.
+        sender_email (str, optional): Sender email. Defaults to DEFAULT_FROM_EMAIL from settings.
+        params (dict, optional): Per-recipient template params keyed by email address
+    
+    Returns:
+        list: Brevo message IDs, one per API call
+    
+    Raises:
+        ApiException: If the Brevo API rejects the request
+    """
+    params = params or {}
+    sender = _build_sender(sender_name, sender_email)
+    message_ids = []
+    
+    for start in range(0, len(to_emails), BREVO_MAX_MESSAGE_VERSIONS):
+        chunk = to_emails[start:start + BREVO_MAX_MESSAGE_VERSIONS]
+        versions = [
+            sib_api_v3_sdk.SendSmtpEmailMessageVersions(
+                to=[{"email": email}],
+                params=params.get(email)
+            )
+            for email in chunk
+        ]
         send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-            to=to,
-            html_content=html_content,
             sender=sender,
-            subject=subject
+            subject=subject,
+            html_content=html_content,
+            message_versions=versions
+        )
+        response = get_transactional_api().send_transac_email(send_smtp_email)
+        message_ids.append(response.message_id)
+        logger.info(f"Batch email sent to {len(chunk)} recipients with message ID: {response.message_id}")
+    
+    return message_ids
+
+def send_email_with_brevo(to_email, subject, html_content, sender_name=None, sender_email=None):
+    """
+    Queue an email for delivery through the Brevo API
+    
+    The request returns immediately; the process_email_outbox worker performs
+    the API call and retries it with backoff on failure.
+    
+    Args:
+        to_email (str): Recipient email address
+        subject (str): Email subject
+        html_content (str): HTML content of the email
+        sender_name (str, optional): Sender name. Defaults to site name from settings.
+        sender_email (str, optional): Sender email. Defaults to DEFAULT_FROM_EMAIL from settings.
+    
+    Returns:
+        bool: True if email was queued successfully, False otherwise
+    """
+    try:
+        enqueue_email(
+            subject,
+            '',
+            sender_email,
+            [to_email],
+            html_message=html_content,
+            transport=EmailOutbox.Transport.BREVO,
+            sender_name=sender_name,
         )
-        
-        # Send the email
-        response = api_instance.send_transac_email(send_smtp_email)
-        logger.info(f"Email sent successfully to {to_email} with message ID: {response.message_id}")
         return True
-        
-    except ApiException as e:
-        logger.error(f"Exception when calling Brevo API: {e}")
-        return False
     except Exception as e:
-        logger.error(f"Unexpected error when sending email via Brevo: {e}")
+        logger.error(f"Failed to queue Brevo email to {to_email}: {e}")
         return False
 
 def send_message_notification(recipient_email, sender_name, message_preview):
@@ -94,12 +192,52 @@ def send_message_notification(recipient_email, sender_name, message_preview):
         )
         
         if success:
-            logger.info(f"Email notification sent to {recipient_email} via Brevo")
+            logger.info(f"Email notification queued for {recipient_email} via Brevo")
             return True
         else:
-            logger.warning(f"Failed to send email notification to {recipient_email} via Brevo")
+            logger.warning(f"Failed to queue email notification for {recipient_email} via Brevo")
             return False
             
     except Exception as e:
         logger.error(f"Failed to send email to {recipient_email}: {str(e)}")
         return False
+
+def send_batch_email_with_brevo(to_emails, subject, html_content, sender_name=None, sender_email=None):
+    """
+    Queue one email for many recipients as a single Brevo batch send
+    
+    Returns:
+        bool: True if the batch was queued successfully, False otherwise
+    """
+    to_emails = list(to_emails)
+    if not to_emails:
+        return True
+    try:
+        enqueue_email(
+            subject,
+            '',
+            sender_email,
+            to_emails,
+            html_message=html_content,
+            transport=EmailOutbox.Transport.BREVO,
+            sender_name=sender_name,
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Failed to queue Brevo batch email to {len(to_emails)} recipients: {e}")
+        return False
+
+def send_message_notification_batch(recipient_emails, sender_name, message_preview):
+    """
+    Queue a new message notification for several recipients as one Brevo call
+    """
+    html_message = render_to_string('chat/email/new_message.html', {
+        'sender_name': sender_name,
+        'message_preview': message_preview,
+        'site_url': settings.SITE_URL,
+    })
+    return send_batch_email_with_brevo(
+        to_emails=recipient_emails,
+        subject=f"New Message from {sender_name}",
+        html_content=html_message
+    )
@@ -0,0 +1,173 @@
+"""
+Delivery of uploaded files (chat attachments, hiring request attachments,
+user documents) to the browser.
+
+Views check access and then hand the FieldFile to serve_file(). Every
+backend answers conditional requests (If-None-Match / If-Modified-Since)
+with 304 from the storage's size and modification time, without opening
+the file. What happens to the body depends on FILE_DELIVERY_BACKEND:
+
+    PythonFileDelivery       -- the worker streams the file itself and
+                                honours single byte ranges (development,
+                                or no front-end server)
+    XAccelRedirectDelivery   -- nginx: the response carries an
+                                X-Accel-Redirect to FILE_DELIVERY_ACCEL_PREFIX
+                                + the file's storage name
+    XSendfileDelivery        -- Apache mod_xsendfile / lighttpd: the response
+                                carries X-Sendfile with the absolute path
+
+With the offloading backends the web server reads the file and handles
+Range itself, so the worker returns as soon as the headers are built. The
+internal location must not be reachable directly, e.g. for nginx:
+
+    location /protected-media/ {
+        internal;
+        alias /path/to/media/;
+    }
+"""
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+from django.utils.module_loading import import_string
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileDeliveryBackend:
+    def serve(self, request, field_file, filename=None, content_type=None, as_attachment=True):
+        """Return the response for a GET of field_file"""
+        filename = filename or field_file.name.rsplit('/', 1)[-1]
+        content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        size, modified = self.stat(field_file)
+        etag = quote_etag(f"{int(modified or 0):x}-{size:x}")
+        last_modified = int(modified) if modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self.respond(request, field_file, size, content_type, etag, last_modified)
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = 'private, no-cache'
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        return response
+
+    def stat(self, field_file):
+        """(size, modification time as a timestamp or None) without opening the file"""
+        storage = field_file.storage
+        size = storage.size(field_file.name)
+        try:
+            modified = storage.get_modified_time(field_file.name).timestamp()
+        except NotImplementedError:
+            modified = None
+        return size, modified
+
+    def respond(self, request, field_file, size, content_type, etag, last_modified):
+        raise NotImplementedError
+
+
+def _requested_range(request, size, etag, last_modified):
+    """
+    The (start, end) byte range to send (end inclusive), None for the whole
+    file, or False when the range can't be satisfied
+    """
+    header = request.META.get('HTTP_RANGE', '').strip()
+    if not header or request.method != 'GET':
+        return None
+
+    # A stale If-Range means the client's partial copy is outdated: send it all
+    if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+    if if_range:
+        if if_range.startswith(('"', 'W/')):
+            if if_range != etag:
+                return None
+        elif last_modified is None or parse_http_date_safe(if_range) != last_modified:
+            return None
+
+    # Multiple ranges are legal but not worth a multipart body; send it all
+    match = RANGE_RE.match(header)
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(field_file, start, length):
+    with field_file.open('rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+class PythonFileDelivery(FileDeliveryBackend):
+    def respond(self, request, field_file, size, content_type, etag, last_modified):
+        byte_range = _requested_range(request, size, etag, last_modified)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        response = StreamingHttpResponse(_read_range(field_file, start, length), content_type=content_type)
+        response['Content-Length'] = str(length)
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        return response
+
+
+class XAccelRedirectDelivery(FileDeliveryBackend):
+    def respond(self, request, field_file, size, content_type, etag, last_modified):
+        prefix = getattr(settings, 'FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(field_file.name.lstrip('/'))
+        return response
+
+
+class XSendfileDelivery(FileDeliveryBackend):
+    def respond(self, request, field_file, size, content_type, etag, last_modified):
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = field_file.path
+        return response
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    path = getattr(settings, 'FILE_DELIVERY_BACKEND', 'apps.core.file_delivery.PythonFileDelivery')
+    if _backend is None or _backend[0] != path:
+        _backend = (path, import_string(path)())
+    return _backend[1]
+
+
+def serve_file(request, field_file, filename=None, content_type=None, as_attachment=True):
+    """Respond with field_file through the configured delivery backend"""
+    return get_backend().serve(request, field_file, filename, content_type, as_attachment)
@@ -0,0 +1,40 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.outbox import BATCH_SIZE, outbox_metrics, process_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails in batches, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Maximum emails to claim per batch')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the currently due emails and exit')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print queue depth and send latency metrics and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(outbox_metrics(), indent=2, default=str))
+            return
+
+        batch_size = options['batch_size']
+        self.stdout.write(f"Email outbox worker started (batch size {batch_size})")
+
+        try:
+            while True:
+                sent, failed = process_outbox(batch_size)
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Email outbox worker stopped')
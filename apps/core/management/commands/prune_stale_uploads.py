@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.uploads import STALE_AFTER_HOURS, prune_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished uploads (and their partial files) that have stopped receiving data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=STALE_AFTER_HOURS,
+                            help='Hours without a chunk before an upload counts as abandoned')
+        parser.add_argument('--interval', type=float, default=3600,
+                            help='Seconds between passes')
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single pass and exit')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                removed = prune_stale_uploads(options['hours'])
+                self.stdout.write(f"Removed {removed} stale uploads")
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Upload pruning stopped')
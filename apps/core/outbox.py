@@ -0,0 +1,254 @@
+"""
+Persistent outbound email queue.
+
+Views call enqueue_email() instead of send_mail(), which only inserts an
+EmailOutbox row. The process_email_outbox management command drains the
+queue in batches, reusing one SMTP connection per batch, and reschedules
+failures with exponential backoff.
+"""
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+BACKOFF_SECONDS = getattr(settings, 'EMAIL_OUTBOX_BACKOFF_SECONDS', 30)
+MAX_BACKOFF_SECONDS = getattr(settings, 'EMAIL_OUTBOX_MAX_BACKOFF_SECONDS', 3600)
+LOCK_TIMEOUT_SECONDS = getattr(settings, 'EMAIL_OUTBOX_LOCK_TIMEOUT', 300)
+
+
+def enqueue_email(subject, message, from_email, recipient_list, html_message=None,
+                  transport=EmailOutbox.Transport.SMTP, sender_name=''):
+    """
+    Queue an email for delivery by the outbox worker.
+
+    Takes the same leading arguments as django.core.mail.send_mail so call
+    sites can switch over without reshaping their data.
+    """
+    return EmailOutbox.objects.create(
+        transport=transport,
+        subject=subject,
+        body=message or '',
+        html_body=html_message or '',
+        from_email=from_email or '',
+        sender_name=sender_name or '',
+        recipients=list(recipient_list),
+        max_attempts=MAX_ATTEMPTS,
+    )
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retrying an email that has failed `attempts` times"""
+    delay = min(BACKOFF_SECONDS * (2 ** max(attempts - 1, 0)), MAX_BACKOFF_SECONDS)
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def release_stale_locks():
+    """Return rows left in 'sending' by a crashed worker to the queue"""
+    cutoff = timezone.now() - timedelta(seconds=LOCK_TIMEOUT_SECONDS)
+    return EmailOutbox.objects.filter(
+        status=EmailOutbox.Status.SENDING,
+        locked_at__lt=cutoff
+    ).update(status=EmailOutbox.Status.PENDING, locked_at=None)
+
+
+def claim_batch(batch_size=None):
+    """
+    Mark up to batch_size due emails as 'sending' and return them.
+
+    The claim is a conditional UPDATE, so two workers polling at the same
+    time never pick up the same row.
+    """
+    now = timezone.now()
+    due_ids = list(
+        EmailOutbox.objects.filter(
+            status=EmailOutbox.Status.PENDING,
+            next_attempt_at__lte=now
+        ).order_by('next_attempt_at').values_list('id', flat=True)[:batch_size or BATCH_SIZE]
+    )
+    if not due_ids:
+        return []
+
+    EmailOutbox.objects.filter(
+        id__in=due_ids,
+        status=EmailOutbox.Status.PENDING
+    ).update(status=EmailOutbox.Status.SENDING, locked_at=now)
+
+    return list(EmailOutbox.objects.filter(
+        id__in=due_ids,
+        status=EmailOutbox.Status.SENDING,
+        locked_at=now
+    ))
+
+
+def _build_message(entry, connection):
+    message = EmailMultiAlternatives(
+        subject=entry.subject,
+        body=entry.body,
+        from_email=entry.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=entry.recipients,
+        connection=connection,
+    )
+    if entry.html_body:
+        message.attach_alternative(entry.html_body, 'text/html')
+    return message
+
+
+def _deliver_brevo(entry):
+    # Imported lazily: the Brevo SDK is only needed when such rows exist
+    from .brevo_utils import deliver_batch_with_brevo, deliver_email_with_brevo
+
+    kwargs = {
+        'subject': entry.subject,
+        'html_content': entry.html_body or entry.body,
+        'sender_name': entry.sender_name or None,
+        'sender_email': entry.from_email or None,
+    }
+    if len(entry.recipients) == 1:
+        deliver_email_with_brevo(to_email=entry.recipients[0], **kwargs)
+    else:
+        deliver_batch_with_brevo(to_emails=entry.recipients, **kwargs)
+
+
+def _mark_sent(entry, duration_ms):
+    entry.status = EmailOutbox.Status.SENT
+    entry.attempts += 1
+    entry.sent_at = timezone.now()
+    entry.send_duration_ms = duration_ms
+    entry.locked_at = None
+    entry.last_error = ''
+    entry.save(update_fields=[
+        'status', 'attempts', 'sent_at', 'send_duration_ms', 'locked_at', 'last_error'
+    ])
+
+
+def _mark_failed(entry, error):
+    entry.attempts += 1
+    entry.last_error = str(error)
+    entry.locked_at = None
+    if entry.attempts >= entry.max_attempts:
+        entry.status = EmailOutbox.Status.FAILED
+        logger.error(f"Giving up on email {entry.id} after {entry.attempts} attempts: {error}")
+    else:
+        entry.status = EmailOutbox.Status.PENDING
+        entry.next_attempt_at = timezone.now() + timedelta(seconds=backoff_delay(entry.attempts))
+        logger.warning(f"Email {entry.id} failed (attempt {entry.attempts}), retrying at {entry.next_attempt_at}: {error}")
+    entry.save(update_fields=['status', 'attempts', 'last_error', 'locked_at', 'next_attempt_at'])
+
+
+def process_outbox(batch_size=None):
+    """
+    Deliver one batch of due emails.
+
+    Returns a (sent, failed) tuple for the batch.
+    """
+    release_stale_locks()
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    smtp_entries = [e for e in batch if e.transport == EmailOutbox.Transport.SMTP]
+    brevo_entries = [e for e in batch if e.transport == EmailOutbox.Transport.BREVO]
+
+    if smtp_entries:
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            for entry in smtp_entries:
+                _mark_failed(entry, e)
+            failed += len(smtp_entries)
+            smtp_entries = []
+
+        try:
+            for entry in smtp_entries:
+                started = time.monotonic()
+                try:
+                    _build_message(entry, connection).send()
+                except Exception as e:
+                    _mark_failed(entry, e)
+                    failed += 1
+                    continue
+                _mark_sent(entry, int((time.monotonic() - started) * 1000))
+                sent += 1
+        finally:
+            connection.close()
+
+    for entry in brevo_entries:
+        started = time.monotonic()
+        try:
+            _deliver_brevo(entry)
+        except Exception as e:
+            _mark_failed(entry, e)
+            failed += 1
+            continue
+        _mark_sent(entry, int((time.monotonic() - started) * 1000))
+        sent += 1
+
+    logger.info(f"Email outbox batch processed: {sent} sent, {failed} failed")
+    return sent, failed
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def outbox_metrics(window_minutes=60):
+    """Queue depth and send latency figures for monitoring"""
+    now = timezone.now()
+    counts = EmailOutbox.objects.aggregate(
+        pending=Count('id', filter=Q(status=EmailOutbox.Status.PENDING)),
+        sending=Count('id', filter=Q(status=EmailOutbox.Status.SENDING)),
+        failed=Count('id', filter=Q(status=EmailOutbox.Status.FAILED)),
+    )
+    oldest_pending = (
+        EmailOutbox.objects.filter(status=EmailOutbox.Status.PENDING)
+        .order_by('created_at')
+        .values_list('created_at', flat=True)
+        .first()
+    )
+    recent = list(
+        EmailOutbox.objects.filter(
+            status=EmailOutbox.Status.SENT,
+            sent_at__gte=now - timedelta(minutes=window_minutes)
+        ).order_by('-sent_at').values_list('send_duration_ms', 'created_at', 'sent_at')[:1000]
+    )
+    durations = [row[0] for row in recent if row[0] is not None]
+    queue_delays = [(row[2] - row[1]).total_seconds() for row in recent]
+
+    return {
+        'queue_depth': counts['pending'] + counts['sending'],
+        'pending': counts['pending'],
+        'sending': counts['sending'],
+        'failed': counts['failed'],
+        'oldest_pending_age_seconds': (
+            (now - oldest_pending).total_seconds() if oldest_pending else 0
+        ),
+        'sent_in_window': len(recent),
+        'window_minutes': window_minutes,
+        'send_latency_ms': {
+            'avg': sum(durations) / len(durations) if durations else None,
+            'p50': _percentile(durations, 50),
+            'p95': _percentile(durations, 95),
+            'max': max(durations) if durations else None,
+        },
+        'queue_delay_seconds': {
+            'avg': sum(queue_delays) / len(queue_delays) if queue_delays else None,
+            'p95': _percentile(queue_delays, 95),
+        },
+    }
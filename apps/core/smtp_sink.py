@@ -0,0 +1,107 @@
+"""
+Minimal local SMTP server that accepts every message and keeps it in memory.
+
+Used as a stand-in for the real mail relay when exercising the outbox worker
+in tests or local development:
+
+    with LocalSMTPServer() as sink:
+        with override_settings(EMAIL_HOST=sink.host, EMAIL_PORT=sink.port, ...):
+            process_outbox()
+        assert sink.messages
+"""
+import email
+import socketserver
+import threading
+from email import policy
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self._reply('220 localhost SMTP sink ready')
+        mail_from, rcpt_to = None, []
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+
+            if verb == 'EHLO':
+                self._reply('250-localhost')
+                self._reply('250 8BITMIME')
+            elif verb == 'HELO':
+                self._reply('250 localhost')
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command.split(':', 1)[1].strip(), []
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                rcpt_to.append(command.split(':', 1)[1].strip().strip('<>'))
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b'.\r\n', b'.\n'):
+                        break
+                    if data_line.startswith(b'..'):
+                        data_line = data_line[1:]
+                    data.append(data_line)
+                self.server.sink.record(mail_from, rcpt_to, b''.join(data))
+                self._reply('250 OK: queued')
+            elif verb == 'RSET':
+                mail_from, rcpt_to = None, []
+                self._reply('250 OK')
+            elif verb == 'NOOP':
+                self._reply('250 OK')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                break
+            else:
+                self._reply('502 Command not implemented')
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class LocalSMTPServer:
+    """Threaded SMTP sink bound to a free localhost port"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self._server = _ThreadingSMTPServer((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._thread = None
+        self._lock = threading.Lock()
+        self.host, self.port = self._server.server_address
+        self.messages = []
+
+    def record(self, mail_from, rcpt_to, raw):
+        message = email.message_from_bytes(raw, policy=policy.default)
+        with self._lock:
+            self.messages.append({
+                'from': mail_from,
+                'to': list(rcpt_to),
+                'subject': message['subject'],
+                'message': message,
+            })
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,97 @@
+import time
+from unittest import mock
+
+from django.test import TestCase
+from sib_api_v3_sdk.rest import ApiException
+
+from apps.core import brevo_utils
+from apps.core.brevo_utils import deliver_batch_with_brevo, send_message_notification_batch
+from apps.core.models import EmailOutbox
+from apps.core.outbox import process_outbox
+from apps.core.write_behind import WriteBehindBuffer
+
+
+class BrevoDeliveryTests(TestCase):
+    def setUp(self):
+        # A fresh API object per test, built from the mocked class
+        patcher = mock.patch.object(brevo_utils, '_api_instance', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        api_patcher = mock.patch('sib_api_v3_sdk.TransactionalEmailsApi')
+        self.api = api_patcher.start().return_value
+        self.addCleanup(api_patcher.stop)
+        self.api.send_transac_email.side_effect = [
+            mock.Mock(message_id=f'<message-{i}>') for i in range(10)
+        ]
+
+    def sent_emails(self):
+        return [call.args[0] for call in self.api.send_transac_email.call_args_list]
+
+    def test_batch_is_split_into_message_version_chunks(self):
+        emails = [f'user{i}@example.com' for i in range(5)]
+        params = {'user0@example.com': {'name': 'Zero'}, 'user3@example.com': {'name': 'Three'}}
+        with mock.patch.object(brevo_utils, 'BREVO_MAX_MESSAGE_VERSIONS', 2):
+            message_ids = deliver_batch_with_brevo(emails, 'Hello', '<p>{{ params.name }}</p>', params=params)
+
+        self.assertEqual(message_ids, ['<message-0>', '<message-1>', '<message-2>'])
+        versions = [sent.message_versions for sent in self.sent_emails()]
+        self.assertEqual([len(chunk) for chunk in versions], [2, 2, 1])
+        flat = [version for chunk in versions for version in chunk]
+        self.assertEqual([version.to for version in flat], [[{'email': email}] for email in emails])
+        self.assertEqual(
+            [version.params for version in flat],
+            [{'name': 'Zero'}, None, None, {'name': 'Three'}, None]
+        )
+        self.assertTrue(all(sent.subject == 'Hello' and sent.to is None for sent in self.sent_emails()))
+
+    def test_notification_batch_is_one_outbox_row_and_one_api_call(self):
+        self.assertTrue(send_message_notification_batch(['a@example.com', 'b@example.com'], 'Alice', 'Hi there'))
+        entry = EmailOutbox.objects.get()
+        self.assertEqual(entry.transport, EmailOutbox.Transport.BREVO)
+        self.assertEqual(entry.recipients, ['a@example.com', 'b@example.com'])
+        self.assertIn('Hi there', entry.html_body)
+
+        self.assertEqual(process_outbox(), (1, 0))
+        sent, = self.sent_emails()
+        self.assertEqual(sent.subject, 'New Message from Alice')
+        self.assertEqual([version.to for version in sent.message_versions],
+                         [[{'email': 'a@example.com'}], [{'email': 'b@example.com'}]])
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, EmailOutbox.Status.SENT)
+
+    def test_api_error_is_recorded_on_the_outbox_row(self):
+        self.api.send_transac_email.side_effect = ApiException(status=400, reason='Invalid sender')
+        send_message_notification_batch(['a@example.com'], 'Alice', 'Hi there')
+
+        self.assertEqual(process_outbox(), (0, 1))
+        # A single recipient goes out as a plain send, not message versions
+        self.assertEqual(self.sent_emails()[0].to, [{'email': 'a@example.com'}])
+        entry = EmailOutbox.objects.get()
+        self.assertEqual((entry.status, entry.attempts), (EmailOutbox.Status.PENDING, 1))
+        self.assertIn('Invalid sender', entry.last_error)
+        self.assertGreater(entry.next_attempt_at, entry.created_at)
+
+
+class WriteBehindBufferTests(TestCase):
+    def setUp(self):
+        self.buffer = WriteBehindBuffer(batch_size=1, interval=0.05, max_buffered=100)
+        self.buffer.write = mock.Mock(side_effect=[RuntimeError('database is locked'), None])
+        # No flusher thread: only append() and flush() write
+        patcher = mock.patch.object(self.buffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_append_after_a_failed_write_waits_for_the_retry_delay(self):
+        self.buffer.append(['a'])
+        self.assertEqual(self.buffer.write.call_count, 1)
+
+        # Over the batch size, but the database just failed
+        self.buffer.append(['b'])
+        self.buffer.append(['c'])
+        self.assertEqual(self.buffer.write.call_count, 1)
+        self.assertEqual(self.buffer.pending_count(), 3)
+
+        time.sleep(0.06)
+        self.buffer.append(['d'])
+        self.buffer.write.assert_called_with(['a', 'b', 'c', 'd'])
+        self.assertEqual(self.buffer.pending_count(), 0)
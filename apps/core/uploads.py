@@ -0,0 +1,253 @@
+"""
+Resumable, chunked uploads for chat and hiring attachments.
+
+A client announces the file (name and size), then PUTs the bytes in order,
+each chunk carrying the offset it starts at in an Upload-Offset header. A
+chunk is copied from the request stream straight onto the end of a partial
+file under MEDIA_ROOT, hashing it on the way, so nothing is held in memory
+and nothing is written twice. After a dropped connection the client asks
+for the upload's offset and carries on from there.
+
+When the last byte arrives the partial file is renamed to a path derived
+from its SHA-256; content that is already stored is not kept a second time,
+and attachments point their FileField at the shared StoredFile. A client
+can't skip the transfer by claiming a known hash: dedupe only happens on
+bytes the server has received.
+
+Uploads count against UPLOAD_USER_QUOTA whether finished or not;
+prune_stale_uploads removes unfinished ones that have gone quiet.
+
+This works on the local filesystem storage the project uses for media.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import StoredFile, Upload
+
+logger = logging.getLogger(__name__)
+
+MAX_FILE_SIZE = getattr(settings, 'UPLOAD_MAX_FILE_SIZE', 100 * 1024 * 1024)
+MAX_CHUNK_SIZE = getattr(settings, 'UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+USER_QUOTA = getattr(settings, 'UPLOAD_USER_QUOTA', 1024 * 1024 * 1024)
+STALE_AFTER_HOURS = getattr(settings, 'UPLOAD_STALE_AFTER_HOURS', 24)
+
+COPY_BUFFER_SIZE = 64 * 1024
+PARTIAL_DIR = 'uploads/partial'
+BLOB_DIR = 'blobs'
+
+
+class UploadError(Exception):
+    def __init__(self, message, status_code=400, offset=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+# Running hashes of uploads in progress, keyed by id, so consecutive chunks
+# don't rehash the file. A chunk landing in another process (or after a
+# restart) rebuilds the hash from the partial file once.
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+MAX_TRACKED_HASHERS = 256
+
+
+def _pop_hasher(upload):
+    with _hashers_lock:
+        entry = _hashers.pop(upload.id, None)
+    if entry and entry[0] == upload.received:
+        return entry[1]
+
+    hasher = hashlib.sha256()
+    remaining = upload.received
+    if remaining:
+        with open(partial_path(upload), 'rb') as f:
+            while remaining:
+                block = f.read(min(COPY_BUFFER_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+
+def _keep_hasher(upload, hasher):
+    with _hashers_lock:
+        _hashers[upload.id] = (upload.received, hasher)
+        while len(_hashers) > MAX_TRACKED_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def partial_path(upload):
+    return default_storage.path(f"{PARTIAL_DIR}/{upload.id}.part")
+
+
+def quota_used(user):
+    return Upload.objects.filter(user=user).aggregate(total=Sum('size'))['total'] or 0
+
+
+def start_upload(user, filename, size):
+    """Create an upload of size bytes for user after checking the limits"""
+    filename = os.path.basename(str(filename or '')).strip()
+    if not filename:
+        raise UploadError('filename is required')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('size must be an integer')
+    if size <= 0:
+        raise UploadError('size must be positive')
+    if size > MAX_FILE_SIZE:
+        raise UploadError(f'Files may be at most {MAX_FILE_SIZE} bytes', status_code=413)
+
+    with transaction.atomic():
+        # Serialises concurrent uploads by the same user, so two of them
+        # can't both pass the check before either is inserted
+        get_user_model().objects.select_for_update().get(pk=user.pk)
+        if quota_used(user) + size > USER_QUOTA:
+            raise UploadError('Upload quota exceeded', status_code=413)
+        upload = Upload.objects.create(user=user, filename=filename[:255], size=size)
+        # SQLite ignores row locks; checking again once our row is in place
+        # catches an upload inserted after the check above
+        if quota_used(user) > USER_QUOTA:
+            raise UploadError('Upload quota exceeded', status_code=413)
+
+    os.makedirs(os.path.dirname(partial_path(upload)), exist_ok=True)
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Append length bytes read from stream at offset
+
+    The offset must equal what has been received so far; a mismatch raises
+    UploadError carrying the offset to resume from.
+    """
+    if upload.status == Upload.Status.COMPLETE:
+        raise UploadError('Upload is already complete', status_code=409, offset=upload.received)
+    if offset != upload.received:
+        raise UploadError('Offset does not match the received bytes', status_code=409, offset=upload.received)
+    if length <= 0 or length > MAX_CHUNK_SIZE:
+        raise UploadError(f'Chunks must be 1 to {MAX_CHUNK_SIZE} bytes', status_code=413, offset=upload.received)
+    if offset + length > upload.size:
+        raise UploadError('Chunk runs past the announced size', status_code=413, offset=upload.received)
+
+    hasher = _pop_hasher(upload)
+    written = 0
+    with open(partial_path(upload), 'r+b') as f:
+        # Drop anything past the offset left by a chunk that failed midway
+        f.truncate(offset)
+        f.seek(offset)
+        while written < length:
+            block = stream.read(min(COPY_BUFFER_SIZE, length - written))
+            if not block:
+                break
+            f.write(block)
+            hasher.update(block)
+            written += len(block)
+
+    if written != length:
+        # The client went away; keep nothing past the last complete chunk
+        with open(partial_path(upload), 'r+b') as f:
+            f.truncate(offset)
+        raise UploadError('Chunk body is shorter than Content-Length', offset=upload.received)
+
+    # Conditional on the offset so two racing chunks can't both be counted
+    updated = Upload.objects.filter(id=upload.id, received=offset).update(
+        received=F('received') + written, updated_at=timezone.now()
+    )
+    if not updated:
+        upload.refresh_from_db()
+        raise UploadError('Offset does not match the received bytes', status_code=409, offset=upload.received)
+    upload.received = offset + written
+
+    if upload.received < upload.size:
+        _keep_hasher(upload, hasher)
+        return upload
+    return _complete(upload, hasher.hexdigest())
+
+
+def _complete(upload, sha256):
+    name = f"{BLOB_DIR}/{sha256[:2]}/{sha256}/{default_storage.get_valid_name(upload.filename)}"
+    stored = StoredFile.objects.filter(sha256=sha256).first()
+    if stored is not None:
+        os.remove(partial_path(upload))
+    else:
+        target = default_storage.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Same directory tree, so this is a rename rather than a copy
+        os.replace(partial_path(upload), target)
+        try:
+            with transaction.atomic():
+                stored = StoredFile.objects.create(sha256=sha256, size=upload.size, file=name)
+        except IntegrityError:
+            # Someone else finished the same content first
+            stored = StoredFile.objects.get(sha256=sha256)
+            if stored.file.name != name:
+                os.remove(target)
+
+    upload.stored_file = stored
+    upload.status = Upload.Status.COMPLETE
+    upload.save(update_fields=['stored_file', 'status', 'updated_at'])
+    return upload
+
+
+def abort_upload(upload):
+    with _hashers_lock:
+        _hashers.pop(upload.id, None)
+    if upload.status == Upload.Status.UPLOADING:
+        try:
+            os.remove(partial_path(upload))
+        except FileNotFoundError:
+            pass
+    upload.delete()
+
+
+def get_completed_upload(user, upload_id):
+    """The user's finished upload with this id, or UploadError"""
+    try:
+        upload = Upload.objects.select_related('stored_file').get(id=upload_id, user=user)
+    except (Upload.DoesNotExist, ValidationError):
+        raise UploadError(f'Upload {upload_id} not found', status_code=404)
+    if upload.status != Upload.Status.COMPLETE:
+        raise UploadError(f'Upload {upload_id} is not complete', status_code=409, offset=upload.received)
+    return upload
+
+
+def prune_stale_uploads(hours=None):
+    """Delete unfinished uploads that have received nothing for `hours`; returns the count"""
+    cutoff = timezone.now() - timedelta(hours=STALE_AFTER_HOURS if hours is None else hours)
+    stale = Upload.objects.filter(status=Upload.Status.UPLOADING, updated_at__lt=cutoff)
+    count = 0
+    for upload in stale.iterator():
+        abort_upload(upload)
+        count += 1
+    if count:
+        logger.info(f"Removed {count} stale uploads")
+    return count
+
+
+def serialize_upload(upload):
+    data = {
+        'id': str(upload.id),
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.received,
+        'status': upload.status,
+        'max_chunk_size': MAX_CHUNK_SIZE,
+    }
+    if upload.stored_file_id:
+        data['sha256'] = upload.stored_file.sha256
+    return data
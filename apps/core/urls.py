@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import UploadDetailView, UploadListView
+
+urlpatterns = [
+    path('', UploadListView.as_view(), name='upload-list'),
+    path('<uuid:upload_id>/', UploadDetailView.as_view(), name='upload-detail'),
+]
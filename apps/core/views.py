@@ -0,0 +1,75 @@
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import Upload
+from .uploads import (
+    UploadError,
+    abort_upload,
+    append_chunk,
+    serialize_upload,
+    start_upload,
+)
+
+
+def _error_response(error):
+    data = {'error': str(error)}
+    if error.offset is not None:
+        data['offset'] = error.offset
+    return Response(data, status=error.status_code)
+
+
+class UploadListView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """Announce a file: {"filename": ..., "size": ...}"""
+        try:
+            upload = start_upload(request.user, request.data.get('filename'), request.data.get('size'))
+        except UploadError as e:
+            return _error_response(e)
+        return Response(serialize_upload(upload), status=status.HTTP_201_CREATED)
+
+
+class UploadDetailView(APIView):
+    """
+    GET reports the offset to resume from; PUT appends the raw request body
+    at the Upload-Offset header's position; DELETE abandons the upload
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_upload(self, request, upload_id):
+        return Upload.objects.select_related('stored_file').filter(id=upload_id, user=request.user).first()
+
+    def get(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(serialize_upload(upload))
+
+    def put(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            return Response(
+                {'error': 'Upload-Offset and Content-Length headers are required', 'offset': upload.received},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            # Read the body stream directly; request.data / request.body would
+            # buffer the whole chunk in memory first
+            upload = append_chunk(upload, offset, request.stream, length)
+        except UploadError as e:
+            return _error_response(e)
+        return Response(serialize_upload(upload))
+
+    def delete(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        abort_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,122 @@
+"""
+In-process write-behind buffer.
+
+Callers append items and return immediately; the buffer hands them to
+write() in one batch once batch_size items are waiting, or once the oldest
+has waited interval seconds. That deadline is checked on every append and
+by a daemon thread, so it holds both for quiet processes and for servers
+that never run background threads (uWSGI without enable-threads).
+
+A failed write puts the batch back in front for the next flush, keeping at
+most max_buffered items and dropping the oldest beyond that. Automatic
+flushes then hold off for interval seconds, doubling with every further
+failure up to MAX_RETRY_DELAY, so requests appending to the buffer don't
+each wait on a database that is still locked. Buffered items
+are lost if the process is killed; owners register flush() with atexit to
+write them on a normal exit.
+"""
+import logging
+import threading
+import time
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 60
+
+
+def reset_for_insert(instances):
+    """
+    Make model instances insertable again after a rolled back bulk_create
+
+    The rollback removes the rows but not the ids bulk_create set on the
+    instances, which by the next flush may belong to other rows.
+    """
+    for instance in instances:
+        instance.pk = None
+        instance._state.adding = True
+
+
+class WriteBehindBuffer:
+    # Used in log messages and as the name of the flusher thread
+    label = 'buffered items'
+    thread_name = 'write-behind'
+
+    def __init__(self, batch_size, interval, max_buffered):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_buffered = max_buffered
+        self._buffer = []  # [(buffered_at, item)]
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._failures = 0
+        self._retry_at = 0  # No automatic flush before this monotonic time
+
+    def write(self, batch):
+        """Persist a list of items; raising puts them back for the next flush"""
+        raise NotImplementedError
+
+    def append(self, items):
+        now = time.monotonic()
+        with self._lock:
+            self._buffer.extend((now, item) for item in items)
+            due = self._flush_is_due(now)
+            self._ensure_flusher()
+        if due:
+            self.flush()
+
+    def buffered(self):
+        """The items waiting to be written, oldest first"""
+        with self._lock:
+            return [item for _, item in self._buffer]
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Write every buffered item in one batch; returns the number written"""
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+        if not entries:
+            return 0
+        try:
+            self.write([item for _, item in entries])
+        except Exception as e:
+            logger.error(f"Failed to write {len(entries)} {self.label}: {str(e)}")
+            # Put them back in front so the next flush retries them
+            with self._lock:
+                self._failures += 1
+                delay = min(self.interval * 2 ** (self._failures - 1), MAX_RETRY_DELAY)
+                self._retry_at = time.monotonic() + delay
+                self._buffer = entries + self._buffer
+                overflow = len(self._buffer) - self.max_buffered
+                if overflow > 0:
+                    # Drop the oldest rather than grow without bound while the database is unavailable
+                    del self._buffer[:overflow]
+                    logger.error(f"Dropped {overflow} {self.label}")
+            return 0
+        with self._lock:
+            self._failures = 0
+            self._retry_at = 0
+        return len(entries)
+
+    def _flush_is_due(self, now):
+        if not self._buffer or now < self._retry_at:
+            return False
+        return len(self._buffer) >= self.batch_size or now - self._buffer[0][0] >= self.interval
+
+    def _ensure_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._run_flusher, name=self.thread_name, daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.interval / 2)
+            with self._lock:
+                due = self._flush_is_due(time.monotonic())
+            if due:
+                close_old_connections()
+                self.flush()
@@ -0,0 +1,108 @@
+"""
+Hourly AnalyticsEvent counters behind the analytics summary.
+
+Each AnalyticsCounter row holds the number of events with one event type
+and name in one UTC hour. Ingestion batches add to them in the same
+transaction that inserts the events (at most three queries per batch,
+whatever its size), and single events created or deleted through the ORM
+adjust them from signals. A summary then reads at most one row per type,
+name and hour in the range, however many events that hour had.
+
+Editing an event's type, name or time through the admin CRUD isn't
+tracked; rebuild_counters() recomputes the rows from the event table with
+one grouped query.
+"""
+from collections import Counter, defaultdict
+from datetime import timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Case, Count, F, Sum, Value, When
+from django.db.models.functions import TruncHour
+
+from .models import AnalyticsCounter, AnalyticsEvent
+
+
+def hour_of(moment):
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _merge(counts):
+    keys = list(counts)
+    existing = {
+        (event_type, event_name, hour): counter_id
+        for counter_id, event_type, event_name, hour in AnalyticsCounter.objects.filter(
+            hour__in={hour for _, _, hour in keys},
+            event_name__in={event_name for _, event_name, _ in keys},
+        ).order_by().values_list('id', 'event_type', 'event_name', 'hour')
+    }
+
+    # One UPDATE for all existing rows, grouping the ids that move by the same amount
+    ids_by_delta = defaultdict(list)
+    for key, counter_id in existing.items():
+        if key in counts:
+            ids_by_delta[counts[key]].append(counter_id)
+    if ids_by_delta:
+        AnalyticsCounter.objects.filter(id__in=[i for ids in ids_by_delta.values() for i in ids]).update(
+            count=F('count') + Case(
+                *[When(id__in=ids, then=Value(delta)) for delta, ids in ids_by_delta.items()],
+                output_field=BigIntegerField(),
+            )
+        )
+
+    AnalyticsCounter.objects.bulk_create([
+        AnalyticsCounter(event_type=event_type, event_name=event_name, hour=hour, count=delta)
+        for (event_type, event_name, hour), delta in counts.items()
+        if (event_type, event_name, hour) not in existing and delta > 0
+    ])
+
+
+def add_to_counters(events, sign=1):
+    """Count (or with sign=-1, uncount) AnalyticsEvent instances"""
+    counts = Counter()
+    for event in events:
+        counts[(event.event_type, event.event_name, hour_of(event.created_at))] += sign
+    if not counts:
+        return
+    try:
+        with transaction.atomic():
+            _merge(counts)
+    except IntegrityError:
+        # Another writer created one of the rows first; they all exist now
+        with transaction.atomic():
+            _merge(counts)
+
+
+def rebuild_counters():
+    """Recompute every counter from the event table; returns the number of rows"""
+    rows = (
+        AnalyticsEvent.objects.order_by()
+        .annotate(hour=TruncHour('created_at', tzinfo=dt_timezone.utc))
+        .values('event_type', 'event_name', 'hour')
+        .annotate(count=Count('id'))
+    )
+    with transaction.atomic():
+        AnalyticsCounter.objects.all().delete()
+        counters = AnalyticsCounter.objects.bulk_create(
+            (AnalyticsCounter(**row) for row in rows.iterator()), batch_size=1000
+        )
+    return len(counters)
+
+
+def summarize(start=None, end=None, event_type=None):
+    """
+    Event counts per type, busiest first, for the hours starting at or after
+    start and before end
+    """
+    counters = AnalyticsCounter.objects.order_by()
+    if start is not None:
+        counters = counters.filter(hour__gte=start)
+    if end is not None:
+        counters = counters.filter(hour__lt=end)
+    if event_type:
+        counters = counters.filter(event_type=event_type)
+    return list(
+        counters.values('event_type')
+        .annotate(count=Sum('count'))
+        .filter(count__gt=0)
+        .order_by('-count', 'event_type')
+    )
@@ -0,0 +1,123 @@
+"""
+Batched ingestion of frontend analytics events.
+
+The ingest endpoint takes up to ANALYTICS_MAX_BATCH_EVENTS page-view and
+user-action events per POST, checks them against the small schema below and
+appends them to an in-process buffer. The buffer is written with one
+bulk_create once it holds ANALYTICS_BUFFER_SIZE events, or at the latest
+ANALYTICS_FLUSH_INTERVAL seconds after the oldest one arrived, so page-view
+tracking costs one INSERT per batch instead of a transaction per event.
+The hourly summary counters are updated in the same transaction.
+
+Events keep the time they were received, not the time they were written.
+Like the chat turn write-behind (both use apps.core.write_behind), buffered
+events are lost if the process is killed (they are flushed on a normal
+exit), and a failed write puts them back for the next flush, up to
+ANALYTICS_MAX_BUFFERED events.
+"""
+import atexit
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.throttling import SimpleRateThrottle
+
+from apps.core.write_behind import WriteBehindBuffer, reset_for_insert
+
+from .counters import add_to_counters
+from .models import AnalyticsEvent
+
+BUFFER_SIZE = getattr(settings, 'ANALYTICS_BUFFER_SIZE', 200)
+FLUSH_INTERVAL = getattr(settings, 'ANALYTICS_FLUSH_INTERVAL', 5.0)
+INGEST_RATE = getattr(settings, 'ANALYTICS_INGEST_RATE', '120/min')
+MAX_BUFFERED = getattr(settings, 'ANALYTICS_MAX_BUFFERED', 10000)
+MAX_BATCH_EVENTS = getattr(settings, 'ANALYTICS_MAX_BATCH_EVENTS', 100)
+MAX_EVENT_DATA_BYTES = getattr(settings, 'ANALYTICS_MAX_EVENT_DATA_BYTES', 2048)
+
+INGESTIBLE_TYPES = {AnalyticsEvent.EventType.PAGE_VIEW, AnalyticsEvent.EventType.USER_ACTION}
+EVENT_NAME_MAX_LENGTH = AnalyticsEvent._meta.get_field('event_name').max_length
+
+
+class AnalyticsIngestThrottle(SimpleRateThrottle):
+    scope = 'analytics_ingest'
+    rate = INGEST_RATE
+
+    def get_cache_key(self, request, view):
+        ident = request.user.pk if request.user.is_authenticated else self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+def _event_error(event):
+    if not isinstance(event, dict):
+        return 'Each event must be an object'
+    unknown = set(event) - {'event_type', 'event_name', 'data'}
+    if unknown:
+        return f"Unknown fields: {', '.join(sorted(unknown))}"
+    if event.get('event_type') not in INGESTIBLE_TYPES:
+        return f"event_type must be one of {', '.join(sorted(INGESTIBLE_TYPES))}"
+    name = event.get('event_name')
+    if not isinstance(name, str) or not name.strip() or len(name) > EVENT_NAME_MAX_LENGTH:
+        return f'event_name must be a non-empty string of at most {EVENT_NAME_MAX_LENGTH} characters'
+    data = event.get('data', {})
+    if not isinstance(data, dict):
+        return 'data must be an object'
+    if len(json.dumps(data, separators=(',', ':'))) > MAX_EVENT_DATA_BYTES:
+        return f'data must be at most {MAX_EVENT_DATA_BYTES} bytes of JSON'
+    return None
+
+
+def validate_events(payload):
+    """
+    (events, errors) for a request body of the form {"events": [...]};
+    errors maps event positions (or "events") to messages
+    """
+    events = payload.get('events') if isinstance(payload, dict) else None
+    if not isinstance(events, list) or not events:
+        return [], {'events': 'A non-empty list of events is required'}
+    if len(events) > MAX_BATCH_EVENTS:
+        return [], {'events': f'At most {MAX_BATCH_EVENTS} events can be sent at once'}
+    errors = {}
+    for position, event in enumerate(events):
+        error = _event_error(event)
+        if error:
+            errors[position] = error
+    return events, errors
+
+
+class EventWriter(WriteBehindBuffer):
+    label = 'analytics events'
+    thread_name = 'analytics-event-writer'
+
+    def __init__(self, buffer_size=BUFFER_SIZE, interval=FLUSH_INTERVAL, max_buffered=MAX_BUFFERED):
+        super().__init__(buffer_size, interval, max_buffered)
+
+    def add(self, events, user=None):
+        """Buffer validated event dicts for user (None when anonymous)"""
+        received_at = timezone.now()
+        user_id = user.id if user is not None and user.is_authenticated else None
+        rows = [
+            AnalyticsEvent(
+                event_type=event['event_type'],
+                event_name=event['event_name'].strip(),
+                data=event.get('data', {}),
+                user_id=user_id,
+                created_at=received_at,
+            )
+            for event in events
+        ]
+        self.append(rows)
+        return len(rows)
+
+    def write(self, batch):
+        try:
+            with transaction.atomic():
+                events = AnalyticsEvent.objects.bulk_create(batch, batch_size=500)
+                add_to_counters(events)
+        except Exception:
+            reset_for_insert(batch)
+            raise
+
+
+event_writer = EventWriter()
+atexit.register(event_writer.flush)
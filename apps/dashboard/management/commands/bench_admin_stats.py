@@ -0,0 +1,114 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from apps.dashboard.stats import compute_admin_stats, get_admin_stats, invalidate_admin_stats
+from apps.hiring.models import HiringRequest, ServiceType
+from apps.hiring.serializers import HiringRequestListSerializer
+
+
+def legacy_admin_stats():
+    """The queries admin_stats ran on every load before the snapshot"""
+    total_requests = HiringRequest.objects.count()
+    pending_requests = HiringRequest.objects.filter(status='pending').count()
+    completed_requests = HiringRequest.objects.filter(status='completed').count()
+    total_revenue = HiringRequest.objects.filter(
+        status__in=['paid', 'completed']
+    ).aggregate(
+        total=Sum('quoted_price')
+    )['total'] or 0
+    recent_requests = HiringRequest.objects.select_related(
+        'user', 'service_type'
+    ).order_by('-created_at')[:5]
+    requests_by_status = (
+        HiringRequest.objects.values('status')
+        .annotate(count=Count('id'))
+        .order_by('status')
+    )
+    requests_by_service = (
+        HiringRequest.objects.values(
+            'service_type__name'
+        ).annotate(
+            count=Count('id')
+        ).order_by('-count')
+    )
+    return {
+        'total_requests': total_requests,
+        'pending_requests': pending_requests,
+        'completed_requests': completed_requests,
+        'total_revenue': total_revenue,
+        'recent_requests': HiringRequestListSerializer(recent_requests, many=True).data,
+        'requests_by_status': list(requests_by_status),
+        'requests_by_service': [
+            {'service': item['service_type__name'], 'count': item['count']}
+            for item in requests_by_service
+        ]
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark admin_stats (previous per-load queries vs snapshot). Data is rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100000, help='Number of hiring requests to create')
+        parser.add_argument('--repeat', type=int, default=20, help='Loads per measurement (best time is shown)')
+
+    def _measure(self, label, func, repeat):
+        query_count = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        best = None
+        with connection.execute_wrapper(count_queries):
+            for _ in range(repeat):
+                started = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+        self.stdout.write(f"{label:<34} {query_count / repeat:>5.1f} queries {best * 1000:>10.2f} ms")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        rng = random.Random(42)
+        statuses = [choice for choice, _ in HiringRequest.STATUS_CHOICES]
+
+        with transaction.atomic():
+            user = User.objects.create_user(email='bench-admin-stats@example.com', password=None)
+            services = [
+                ServiceType.objects.create(name=f'Bench service {i}', description='', base_price=Decimal('100'))
+                for i in range(8)
+            ]
+            HiringRequest.objects.bulk_create(
+                (
+                    HiringRequest(
+                        user=user,
+                        service_type=rng.choice(services),
+                        title=f'Request {i}',
+                        description='Benchmark request',
+                        status=rng.choice(statuses),
+                        quoted_price=Decimal(rng.randint(100, 5000)),
+                    )
+                    for i in range(options['requests'])
+                ),
+                batch_size=2000,
+            )
+            self.stdout.write(f"{options['requests']} hiring requests")
+
+            repeat = options['repeat']
+            # Only the snapshot: the cache is shared with every running process
+            invalidate_admin_stats()
+            self._measure('Previous (7 queries per load)', legacy_admin_stats, repeat)
+            self._measure('Snapshot rebuild (cache miss)', compute_admin_stats, repeat)
+            get_admin_stats()
+            self._measure('Snapshot hit', get_admin_stats, repeat)
+
+            invalidate_admin_stats()
+            transaction.set_rollback(True)
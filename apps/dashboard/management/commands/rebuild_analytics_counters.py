@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.dashboard.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the hourly analytics summary counters from the AnalyticsEvent table'
+
+    def handle(self, *args, **options):
+        rows = rebuild_counters()
+        self.stdout.write(f"Rebuilt {rows} analytics counters")
@@ -0,0 +1,40 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.dashboard.rollup import backfill, rollup_pending
+
+
+class Command(BaseCommand):
+    help = 'Roll up DailyStatistics for the days changed since the last pass, or backfill a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat,
+                            help='Backfill from this date (YYYY-MM-DD) instead of running incrementally')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat,
+                            help='Last date to backfill (default: today)')
+        parser.add_argument('--interval', type=float, default=3600,
+                            help='Seconds between incremental passes')
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single incremental pass and exit')
+
+    def handle(self, *args, **options):
+        if options['start']:
+            end = options['end'] or timezone.localdate()
+            if end < options['start']:
+                raise CommandError('--to must not be before --from')
+            stats = backfill(options['start'], end)
+            self.stdout.write(f"Backfilled daily statistics for {len(stats)} days")
+            return
+
+        try:
+            while True:
+                stats = rollup_pending()
+                self.stdout.write(f"Rolled up daily statistics for {len(stats)} days")
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Daily statistics rollup stopped')
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_analyticsevent_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('page_view', 'Page View'), ('user_action', 'User Action'), ('system_event', 'System Event'), ('error', 'Error')], max_length=20)),
+                ('event_name', models.CharField(max_length=100)),
+                ('hour', models.DateTimeField(help_text='Start of the hour (UTC)')),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour', 'event_type'], name='dashboard_a_hour_12a830_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event_type', 'event_name', 'hour'), name='unique_analytics_counter')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from datetime import timezone
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+
+def seed_counters(apps, schema_editor):
+    """Count the existing events with one grouped query"""
+    AnalyticsEvent = apps.get_model('dashboard', 'AnalyticsEvent')
+    AnalyticsCounter = apps.get_model('dashboard', 'AnalyticsCounter')
+
+    rows = (
+        AnalyticsEvent.objects.order_by()
+        .annotate(hour=TruncHour('created_at', tzinfo=timezone.utc))
+        .values('event_type', 'event_name', 'hour')
+        .annotate(count=Count('id'))
+    )
+    AnalyticsCounter.objects.bulk_create((AnalyticsCounter(**row) for row in rows.iterator()), batch_size=1000)
+
+
+def remove_counters(apps, schema_editor):
+    apps.get_model('dashboard', 'AnalyticsCounter').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_analyticscounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_counters, remove_counters),
+    ]
@@ -30,7 +30,8 @@ class AnalyticsEvent(models.Model):
     content_object = GenericForeignKey('content_type', 'object_id')
     
     data = models.JSONField(default=dict, help_text='Additional event data')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered events keep the time they were received
+    created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-created_at']
@@ -39,6 +40,36 @@ class AnalyticsEvent(models.Model):
             models.Index(fields=['user', 'created_at']),
         ]
 
+class AnalyticsCounter(models.Model):
+    """
+    Number of AnalyticsEvents per event type, name and hour, kept up to date
+    as events are written so summaries don't scan the event table
+    """
+    event_type = models.CharField(max_length=20, choices=AnalyticsEvent.EventType.choices)
+    event_name = models.CharField(max_length=100)
+    hour = models.DateTimeField(help_text='Start of the hour (UTC)')
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-hour']
+        constraints = [
+            models.UniqueConstraint(fields=['event_type', 'event_name', 'hour'], name='unique_analytics_counter'),
+        ]
+        indexes = [
+            models.Index(fields=['hour', 'event_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_name} at {self.hour}: {self.count}"
+
+class DailyStatisticsManager(models.Manager):
+    def create_or_update_stats(self, date):
+        """Recompute and store the statistics for one date"""
+        from .rollup import rollup_days
+
+        rollup_days([date])
+        return self.get(date=date)
+
 class DailyStatistics(models.Model):
     """
     Daily aggregated statistics for quick dashboard display
@@ -51,6 +82,8 @@ class DailyStatistics(models.Model):
     completed_requests = models.PositiveIntegerField(default=0)
     total_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     average_request_value = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    objects = DailyStatisticsManager()
     
     class Meta:
         ordering = ['-date']
@@ -0,0 +1,161 @@
+"""
+Daily rollup of the dashboard statistics into DailyStatistics rows.
+
+Each metric for a span of days comes from one grouped query, however many
+days the span covers:
+
+    new_users / total_users     -- users by the day they joined, plus one
+                                   count of everyone who joined before the span
+    active_users                -- distinct users with a UserActivity that day
+    total_requests / completed_requests / average_request_value
+                                -- hiring requests by the day they were
+                                   created; completed counts those that are
+                                   completed now
+    total_revenue               -- completed transactions by the day they
+                                   were created
+
+rollup_pending() is the incremental pass. It looks for rows changed since
+the watermark kept in a SystemConfiguration row (a request or transaction
+updated today counts against the day it was created), recomputes only those
+days and moves the watermark to DAILY_STATS_WATERMARK_OVERLAP seconds before
+the time the pass started. The overlap re-reads rows whose transaction began
+before the pass but committed after it read, at the cost of recomputing the
+last few minutes' days once more. Deleted rows leave nothing to find;
+backfill() over the affected range corrects them.
+"""
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.accounts.models import User
+from apps.hiring.models import HiringRequest
+from apps.payments.models import Transaction
+
+from .models import DailyStatistics, SystemConfiguration, UserActivity
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_KEY = 'dashboard_daily_stats_watermark'
+WATERMARK_OVERLAP = timedelta(seconds=getattr(settings, 'DAILY_STATS_WATERMARK_OVERLAP', 300))
+UPDATE_FIELDS = [
+    'total_users', 'active_users', 'new_users', 'total_requests',
+    'completed_requests', 'total_revenue', 'average_request_value',
+]
+CENTS = Decimal('0.01')
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _by_day(queryset, field, **aggregates):
+    """{day: {aggregate: value}} for queryset grouped on the local date of field"""
+    rows = (
+        queryset.order_by()
+        .annotate(day=TruncDate(field))
+        .values('day')
+        .annotate(**aggregates)
+    )
+    return {row.pop('day'): row for row in rows}
+
+
+def compute_stats(start, end):
+    """Unsaved DailyStatistics for every day from start to end inclusive"""
+    span = {'created_at__gte': _day_start(start), 'created_at__lt': _day_start(end + timedelta(days=1))}
+
+    total_users = User.objects.filter(created_at__lt=span['created_at__gte']).count()
+    joined = _by_day(User.objects.filter(**span), 'created_at', count=Count('id'))
+    active = _by_day(UserActivity.objects.filter(**span), 'created_at', count=Count('user', distinct=True))
+    requests = _by_day(
+        HiringRequest.objects.filter(**span), 'created_at',
+        count=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        average=Avg('quoted_price'),
+    )
+    revenue = _by_day(
+        Transaction.objects.filter(status=Transaction.Status.COMPLETED, **span), 'created_at',
+        total=Sum('amount'),
+    )
+
+    stats = []
+    day = start
+    while day <= end:
+        new_users = joined.get(day, {}).get('count', 0)
+        total_users += new_users
+        day_requests = requests.get(day, {})
+        stats.append(DailyStatistics(
+            date=day,
+            total_users=total_users,
+            active_users=active.get(day, {}).get('count', 0),
+            new_users=new_users,
+            total_requests=day_requests.get('count', 0),
+            completed_requests=day_requests.get('completed', 0),
+            total_revenue=Decimal(revenue.get(day, {}).get('total') or 0).quantize(CENTS),
+            average_request_value=Decimal(day_requests.get('average') or 0).quantize(CENTS),
+        ))
+        day += timedelta(days=1)
+    return stats
+
+
+def rollup_days(days):
+    """Recompute and store the rows for the given dates; returns them in date order"""
+    days = set(days)
+    if not days:
+        return []
+    stats = [row for row in compute_stats(min(days), max(days)) if row.date in days]
+    DailyStatistics.objects.bulk_create(
+        stats, batch_size=500, update_conflicts=True, unique_fields=['date'], update_fields=UPDATE_FIELDS
+    )
+    return stats
+
+
+def backfill(start, end):
+    """Recompute every day from start to end inclusive, including days with no activity"""
+    return rollup_days(start + timedelta(days=offset) for offset in range((end - start).days + 1))
+
+
+def touched_days(since=None):
+    """Dates whose statistics may have changed since the given time (all dates with data when None)"""
+    sources = [
+        (User.objects.all(), 'created_at', 'created_at'),
+        (UserActivity.objects.all(), 'created_at', 'created_at'),
+        (HiringRequest.objects.all(), 'updated_at', 'created_at'),
+        (Transaction.objects.all(), 'updated_at', 'created_at'),
+    ]
+    days = set()
+    for queryset, changed_field, day_field in sources:
+        if since is not None:
+            queryset = queryset.filter(**{f'{changed_field}__gte': since})
+        days.update(
+            queryset.order_by().annotate(day=TruncDate(day_field)).values_list('day', flat=True).distinct()
+        )
+    return days
+
+
+def get_watermark():
+    value = SystemConfiguration.objects.filter(key=WATERMARK_KEY).values_list('value', flat=True).first()
+    return parse_datetime(value) if value else None
+
+
+def set_watermark(moment):
+    SystemConfiguration.objects.update_or_create(
+        key=WATERMARK_KEY,
+        defaults={'value': moment.isoformat(), 'description': 'Last daily statistics rollup (set automatically)'},
+    )
+
+
+def rollup_pending():
+    """Recompute the days touched since the last pass and advance the watermark"""
+    # Taken before reading so rows written during the pass are picked up next time
+    started = timezone.now()
+    stats = rollup_days(touched_days(get_watermark()))
+    set_watermark(started - WATERMARK_OVERLAP)
+    if stats:
+        logger.info(f"Rolled up daily statistics for {len(stats)} days")
+    return stats
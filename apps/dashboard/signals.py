@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.hiring.models import HiringRequest, ServiceType
+from .counters import add_to_counters
+from .models import AnalyticsEvent
+from .stats import invalidate_admin_stats
+
+
+@receiver([post_save, post_delete], sender=HiringRequest)
+@receiver([post_save, post_delete], sender=ServiceType)
+def drop_admin_stats(sender, instance, **kwargs):
+    # After commit, so a dashboard load racing the write can't cache the old rows
+    transaction.on_commit(invalidate_admin_stats)
+
+
+@receiver(post_save, sender=AnalyticsEvent)
+def count_analytics_event(sender, instance, created, **kwargs):
+    # Batched ingestion uses bulk_create and counts its events itself
+    if created:
+        add_to_counters([instance])
+
+
+@receiver(post_delete, sender=AnalyticsEvent)
+def uncount_analytics_event(sender, instance, **kwargs):
+    add_to_counters([instance], sign=-1)
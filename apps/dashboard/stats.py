@@ -0,0 +1,71 @@
+"""
+Cached snapshot of the admin dashboard statistics.
+
+The payload is built with three queries: one GROUP BY status giving every
+count and the revenue, the per-service breakdown, and the latest requests.
+It is kept in Django's cache for ADMIN_STATS_CACHE_TTL seconds. Saving or
+deleting a HiringRequest or ServiceType drops the snapshot, so the next
+dashboard load rebuilds it. Bulk .update() calls send no signals; the TTL
+bounds how stale those can leave it.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from apps.hiring.models import HiringRequest
+from apps.hiring.serializers import HiringRequestListSerializer
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATS_CACHE_KEY = 'dashboard:admin_stats'
+ADMIN_STATS_CACHE_TTL = getattr(settings, 'ADMIN_STATS_CACHE_TTL', 60)
+REVENUE_STATUSES = ('paid', 'completed')
+RECENT_REQUESTS = 5
+
+
+def compute_admin_stats():
+    by_status = list(
+        HiringRequest.objects.order_by()
+        .values('status')
+        .annotate(count=Count('id'), revenue=Sum('quoted_price'))
+        .order_by('status')
+    )
+    counts = {row['status']: row['count'] for row in by_status}
+
+    requests_by_service = (
+        HiringRequest.objects.order_by()
+        .values('service_type__name')
+        .annotate(count=Count('id'))
+        .order_by('-count')
+    )
+    recent_requests = HiringRequest.objects.select_related('service_type').order_by('-created_at')[:RECENT_REQUESTS]
+
+    return {
+        'total_requests': sum(counts.values()),
+        'pending_requests': counts.get('pending', 0),
+        'completed_requests': counts.get('completed', 0),
+        'total_revenue': sum(
+            (row['revenue'] for row in by_status if row['status'] in REVENUE_STATUSES and row['revenue']), 0
+        ),
+        'recent_requests': [dict(item) for item in HiringRequestListSerializer(recent_requests, many=True).data],
+        'requests_by_status': [{'status': row['status'], 'count': row['count']} for row in by_status],
+        'requests_by_service': [
+            {'service': item['service_type__name'], 'count': item['count']}
+            for item in requests_by_service
+        ],
+    }
+
+
+def get_admin_stats():
+    """The cached snapshot, rebuilt when missing"""
+    stats = cache.get(ADMIN_STATS_CACHE_KEY)
+    if stats is None:
+        stats = compute_admin_stats()
+        cache.set(ADMIN_STATS_CACHE_KEY, stats, ADMIN_STATS_CACHE_TTL)
+    return stats
+
+
+def invalidate_admin_stats():
+    cache.delete(ADMIN_STATS_CACHE_KEY)
@@ -1,3 +1,366 @@
-from django.test import TestCase
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.hiring.models import HiringRequest, ServiceType
+from apps.payments.models import PaymentMethod, Transaction
+
+from .counters import hour_of as counter_hour, rebuild_counters
+from .ingest import AnalyticsIngestThrottle, EventWriter
+from .models import AnalyticsCounter, AnalyticsEvent, DailyStatistics, UserActivity
+from .rollup import WATERMARK_OVERLAP, backfill, get_watermark, rollup_pending
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AdminStatsTests(TestCase):
+    url = '/api/v1/dashboard/admin/admin_stats/'
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(email='admin@example.com', password='password', role=User.Role.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.service = ServiceType.objects.create(name='Web app', description='', base_price=Decimal('100'))
+        for status, price in [('pending', None), ('paid', '200'), ('completed', '300'), ('cancelled', '50')]:
+            self.create_request(status, price)
+
+    def create_request(self, status, price=None):
+        return HiringRequest.objects.create(
+            user=self.admin, service_type=self.service, title=status, description='',
+            status=status, quoted_price=Decimal(price) if price else None
+        )
+
+    def test_counts_and_revenue(self):
+        data = self.client.get(self.url).data
+        self.assertEqual(
+            (data['total_requests'], data['pending_requests'], data['completed_requests'], data['total_revenue']),
+            (4, 1, 1, Decimal('500'))
+        )
+        self.assertEqual(data['requests_by_service'], [{'service': 'Web app', 'count': 4}])
+        self.assertEqual(len(data['recent_requests']), 4)
+
+    def test_snapshot_is_served_until_a_request_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_request('pending')
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url).data
+        self.assertEqual(data['pending_requests'], 2)
+
+    def test_email_queue_window_is_validated(self):
+        url = '/api/v1/dashboard/admin/email_queue/'
+        self.assertEqual(self.client.get(url, {'window_minutes': 30}).status_code, 200)
+        for window in ['soon', '-5', '0']:
+            self.assertEqual(self.client.get(url, {'window_minutes': window}).status_code, 400, window)
+
+
+class DailyStatisticsRollupTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.admin = User.objects.create_user(email='admin@example.com', password='password', role=User.Role.ADMIN)
+        self.member = User.objects.create_user(email='member@example.com', password='password')
+        self.service = ServiceType.objects.create(name='Web app', description='', base_price=Decimal('100'))
+        self.method = PaymentMethod.objects.create(name='Bank')
+
+        self.backdate(User.objects.filter(id=self.admin.id), days=3)
+        self.old_request = self.create_request('pending', '100', days=2)
+        self.create_request('completed', '300', days=2)
+        self.create_transaction(self.old_request, '150.50', Transaction.Status.COMPLETED, days=2)
+        self.create_transaction(self.old_request, '99', Transaction.Status.FAILED, days=2)
+        for user in (self.admin, self.member, self.member):
+            activity = UserActivity.objects.create(user=user, activity_type='login', description='')
+            self.backdate(UserActivity.objects.filter(id=activity.id), days=1)
+
+    def backdate(self, queryset, days):
+        moment = timezone.now() - timedelta(days=days)
+        fields = {'created_at': moment}
+        if hasattr(queryset.model, 'updated_at'):
+            fields['updated_at'] = moment
+        queryset.update(**fields)
+
+    def create_request(self, status, price, days):
+        hiring_request = HiringRequest.objects.create(
+            user=self.member, service_type=self.service, title=status, description='',
+            status=status, quoted_price=Decimal(price)
+        )
+        self.backdate(HiringRequest.objects.filter(id=hiring_request.id), days)
+        return hiring_request
+
+    def create_transaction(self, hiring_request, amount, status, days):
+        transaction = Transaction.objects.create(
+            user=self.member, hiring_request=hiring_request, payment_method=self.method,
+            amount=Decimal(amount), status=status, reference_id=f'ref-{Transaction.objects.count()}'
+        )
+        self.backdate(Transaction.objects.filter(id=transaction.id), days)
+
+    def row(self, days_ago):
+        return DailyStatistics.objects.get(date=self.today - timedelta(days=days_ago))
+
+    def test_backfill_uses_one_query_per_metric(self):
+        # Base user count, four grouped metrics, one upsert
+        with self.assertNumQueries(6):
+            stats = backfill(self.today - timedelta(days=4), self.today)
+        self.assertEqual(len(stats), 5)
+
+        self.assertEqual((self.row(4).total_users, self.row(4).new_users), (0, 0))
+        self.assertEqual((self.row(3).total_users, self.row(3).new_users), (1, 1))
+        self.assertEqual((self.row(0).total_users, self.row(0).new_users), (2, 1))
+        self.assertEqual(self.row(1).active_users, 2)
+
+        busy_day = self.row(2)
+        self.assertEqual((busy_day.total_requests, busy_day.completed_requests), (2, 1))
+        self.assertEqual(busy_day.total_revenue, Decimal('150.50'))
+        self.assertEqual(busy_day.average_request_value, Decimal('200.00'))
+
+    def test_incremental_pass_recomputes_only_touched_days(self):
+        with mock.patch('apps.dashboard.rollup.WATERMARK_OVERLAP', timedelta(0)):
+            first = rollup_pending()
+            self.assertEqual({row.date for row in first}, {self.today - timedelta(days=n) for n in (0, 1, 2, 3)})
+            self.assertEqual(rollup_pending(), [])
+
+            # Completing an old request reattributes to the day it was created
+            self.old_request.refresh_from_db()
+            self.old_request.status = 'completed'
+            self.old_request.save()
+            stats = rollup_pending()
+        self.assertEqual([row.date for row in stats], [self.today - timedelta(days=2)])
+        self.assertEqual(self.row(2).completed_requests, 2)
+
+    def test_next_pass_rereads_the_overlap_window(self):
+        started = timezone.now()
+        rollup_pending()
+        watermark = get_watermark()
+        self.assertGreaterEqual(watermark, started - WATERMARK_OVERLAP)
+        self.assertLess(watermark, started - WATERMARK_OVERLAP + timedelta(seconds=5))
+
+        # A change committed after the pass read, stamped before it started
+        HiringRequest.objects.filter(id=self.old_request.id).update(
+            status='completed', updated_at=started - timedelta(seconds=1)
+        )
+        stats = rollup_pending()
+        self.assertIn(self.today - timedelta(days=2), [row.date for row in stats])
+        self.assertEqual(self.row(2).completed_requests, 2)
+
+    def test_generate_daily_stats_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = '/api/v1/dashboard/stats/generate_daily_stats/'
+
+        date = self.today - timedelta(days=2)
+        response = client.post(url, {'date': date.isoformat()}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['date'], response.data['total_requests']), (date.isoformat(), 2))
+
+        self.assertEqual(client.post(url, {'date': 'yesterday'}, format='json').status_code, 400)
+        self.assertEqual(client.post(url, {}, format='json').data['date'], self.today.isoformat())
+
+
+class TrendsTests(TestCase):
+    url = '/api/v1/dashboard/stats/trends/'
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='password', role=User.Role.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        # Thursday 2026-01-01 through Saturday 2026-01-10, with no row for the 5th-7th
+        self.monday = date(2025, 12, 29)
+        DailyStatistics.objects.create(date=date(2025, 12, 31), total_users=5)
+        for day in [1, 2, 3, 4, 8, 9, 10]:
+            DailyStatistics.objects.create(
+                date=date(2026, 1, day), total_users=5 + day, new_users=1, active_users=day,
+                total_requests=2, completed_requests=1, total_revenue=Decimal('10.00'),
+                average_request_value=Decimal(day * 10),
+            )
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['results']
+
+    def test_daily_trend_fills_gaps(self):
+        results = self.get(start_date='2026-01-04', end_date='2026-01-08')
+        self.assertEqual([row['date'] for row in results], [date(2026, 1, day) for day in range(4, 9)])
+        self.assertEqual([row['total_requests'] for row in results], [2, 0, 0, 0, 2])
+        # The user count carries through the gap
+        self.assertEqual([row['total_users'] for row in results], [9, 9, 9, 9, 13])
+
+    def test_weekly_buckets_are_aggregated_in_one_query(self):
+        with self.assertNumQueries(2):
+            results = self.client.get(self.url, {
+                'resolution': 'week', 'start_date': '2026-01-01', 'end_date': '2026-01-18'
+            }).data['results']
+        self.assertEqual([row['date'] for row in results], [self.monday, date(2026, 1, 5), date(2026, 1, 12)])
+
+        first, second, empty = results
+        self.assertEqual((first['new_users'], first['total_requests'], first['total_revenue']), (4, 8, Decimal('40.00')))
+        self.assertEqual((first['total_users'], first['active_users']), (9, 4))
+        self.assertEqual(first['average_request_value'], Decimal('25.00'))
+        self.assertEqual((second['total_users'], second['completed_requests']), (15, 3))
+        self.assertEqual((empty['total_users'], empty['total_requests']), (15, 0))
+
+    def test_monthly_resolution_and_validation(self):
+        results = self.get(resolution='month', start_date='2025-12-15', end_date='2026-02-01')
+        self.assertEqual([row['date'] for row in results], [date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1)])
+        self.assertEqual([row['total_requests'] for row in results], [0, 14, 0])
+
+        for params in [{'resolution': 'hour'}, {'start_date': '2026-02-01', 'end_date': '2026-01-01'},
+                       {'start_date': '2000-01-01', 'end_date': '2026-01-01'}, {'days': 'many'}]:
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+
+class AnalyticsIngestTests(TestCase):
+    url = '/api/v1/dashboard/analytics/ingest/'
+
+    def setUp(self):
+        self.writer = EventWriter(buffer_size=5, interval=60)
+        patcher = mock.patch('apps.dashboard.views.event_writer', self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def post(self, events):
+        with mock.patch.object(AnalyticsIngestThrottle, 'allow_request', return_value=True):
+            return self.client.post(self.url, {'events': events}, format='json')
+
+    def page_views(self, count):
+        return [{'event_type': 'page_view', 'event_name': f'/page/{i}', 'data': {'ref': 'x'}} for i in range(count)]
+
+    def test_events_are_buffered_and_written_in_one_insert(self):
+        response = self.post(self.page_views(3))
+        self.assertEqual((response.status_code, response.data), (202, {'accepted': 3}))
+        self.assertEqual(AnalyticsEvent.objects.count(), 0)
+
+        # The event insert and the counter select and insert, in one transaction
+        with self.assertNumQueries(7):
+            self.assertEqual(self.writer.flush(), 3)
+        self.assertEqual(
+            sorted(AnalyticsEvent.objects.values_list('event_name', flat=True)), ['/page/0', '/page/1', '/page/2']
+        )
+        self.assertFalse(AnalyticsEvent.objects.filter(user__isnull=False).exists())
+
+    def test_full_buffer_is_flushed_and_user_recorded(self):
+        user = User.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user)
+        self.post(self.page_views(3))
+        self.post([{'event_type': 'user_action', 'event_name': 'signup_click'}] * 2)
+
+        self.assertEqual(self.writer.pending_count(), 0)
+        self.assertEqual(AnalyticsEvent.objects.filter(user=user).count(), 5)
+
+    def test_invalid_batches_are_rejected(self):
+        cases = [
+            [],
+            self.page_views(101),
+            [{'event_type': 'error', 'event_name': 'boom'}],
+            [{'event_type': 'page_view', 'event_name': ''}],
+            [{'event_type': 'page_view', 'event_name': '/', 'data': {'blob': 'x' * 5000}}],
+            [{'event_type': 'page_view', 'event_name': '/', 'user': 1}],
+        ]
+        for events in cases:
+            self.assertEqual(self.post(events).status_code, 400)
+        self.assertEqual(self.writer.pending_count(), 0)
+
+    def test_failed_write_keeps_newest_events_for_retry(self):
+        writer = EventWriter(buffer_size=100, interval=60, max_buffered=4)
+        writer.add(self.page_views(3))
+        with mock.patch.object(AnalyticsEvent.objects, 'bulk_create', side_effect=RuntimeError('locked')):
+            self.assertEqual(writer.flush(), 0)
+        writer.add(self.page_views(2))
+        self.assertEqual(writer.pending_count(), 5)
+        with mock.patch.object(AnalyticsEvent.objects, 'bulk_create', side_effect=RuntimeError('locked')):
+            writer.flush()
+        self.assertEqual(writer.pending_count(), 4)
+        self.assertEqual(writer.flush(), 4)
+
+    def test_events_rolled_back_after_insert_are_retried_as_new_rows(self):
+        writer = EventWriter(buffer_size=100, interval=60)
+        writer.add(self.page_views(3))
+        # The insert succeeds and sets ids, then the counter update fails
+        with mock.patch('apps.dashboard.ingest.add_to_counters', side_effect=RuntimeError('locked')):
+            self.assertEqual(writer.flush(), 0)
+        self.assertEqual(AnalyticsEvent.objects.count(), 0)
+
+        # Other writes take the ids the rolled back insert had handed out
+        for _ in range(3):
+            AnalyticsEvent.objects.create(event_type='error', event_name='timeout')
+        self.assertEqual(writer.flush(), 3)
+        self.assertEqual(AnalyticsEvent.objects.filter(event_type='page_view').count(), 3)
+
+    def test_overdue_buffer_is_flushed_by_the_next_add(self):
+        # Without the flusher thread (e.g. uWSGI without enable-threads) the
+        # next add still writes events that have waited past the interval
+        writer = EventWriter(buffer_size=100, interval=0.05)
+        with mock.patch.object(writer, '_ensure_flusher'):
+            writer.add(self.page_views(1))
+            self.assertEqual(writer.pending_count(), 1)
+            time.sleep(0.06)
+            writer.add(self.page_views(1))
+
+        self.assertEqual(writer.pending_count(), 0)
+        self.assertEqual(AnalyticsEvent.objects.count(), 2)
+
+
+class AnalyticsCounterTests(TestCase):
+    url = '/api/v1/dashboard/analytics/summary/'
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='password', role=User.Role.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.writer = EventWriter(buffer_size=1000, interval=60)
+
+    def ingest(self, event_type, event_name, count):
+        self.writer.add([{'event_type': event_type, 'event_name': event_name}] * count)
+
+    def counters(self):
+        return sorted(AnalyticsCounter.objects.values_list('event_type', 'event_name', 'count'))
+
+    def test_ingested_batches_add_to_hourly_counters(self):
+        self.ingest('page_view', '/', 3)
+        self.ingest('user_action', 'signup', 1)
+        self.writer.flush()
+        self.ingest('page_view', '/', 2)
+        self.ingest('page_view', '/pricing', 1)
+        self.writer.flush()
+
+        self.assertEqual(self.counters(), [('page_view', '/', 5), ('page_view', '/pricing', 1), ('user_action', 'signup', 1)])
+        self.assertEqual(AnalyticsCounter.objects.get(event_name='signup').hour, counter_hour(timezone.now()))
+
+    def test_single_events_are_counted_by_signals(self):
+        event = AnalyticsEvent.objects.create(event_type='error', event_name='timeout')
+        AnalyticsEvent.objects.create(event_type='error', event_name='timeout')
+        self.assertEqual(self.counters(), [('error', 'timeout', 2)])
+        event.delete()
+        self.assertEqual(self.counters(), [('error', 'timeout', 1)])
+
+    def test_summary_reads_counters_with_date_range(self):
+        self.ingest('page_view', '/', 4)
+        self.ingest('user_action', 'signup', 1)
+        self.writer.flush()
+        AnalyticsEvent.objects.create(event_type='page_view', event_name='/old')
+        AnalyticsEvent.objects.filter(event_name='/old').update(created_at=timezone.now() - timedelta(days=3))
+        rebuild_counters()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'start_date': timezone.now().date().isoformat()})
+        self.assertEqual(
+            response.data, [{'event_type': 'page_view', 'count': 4}, {'event_type': 'user_action', 'count': 1}]
+        )
+        self.assertEqual(self.client.get(self.url).data[0], {'event_type': 'page_view', 'count': 5})
+
+        old_day = (timezone.now() - timedelta(days=3)).date().isoformat()
+        response = self.client.get(self.url, {'start_date': old_day, 'end_date': old_day, 'event_type': 'page_view'})
+        self.assertEqual(response.data, [{'event_type': 'page_view', 'count': 1}])
+        self.assertEqual(self.client.get(self.url, {'start_date': 'last week'}).status_code, 400)
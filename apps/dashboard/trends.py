@@ -0,0 +1,121 @@
+"""
+Dashboard trends at day, week or month resolution.
+
+Buckets are summed from the DailyStatistics rows in one grouped query
+(TruncWeek/TruncMonth on the date), and buckets with no rows are filled in
+here so charts get an unbroken series. A year at week resolution is 53
+small objects. Within a bucket:
+
+    new_users, total_requests, completed_requests, total_revenue  -- summed
+    total_users            -- the count at the end of the bucket
+    active_users           -- the busiest day's count (distinct users
+                              across days can't be recovered from daily rows)
+    average_request_value  -- daily averages weighted by that day's requests
+
+Reading at most a few thousand indexed daily rows is cheap enough that
+weekly and monthly tables are not kept; the rollup only writes days.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from .models import DailyStatistics
+
+RESOLUTIONS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+MAX_BUCKETS = 1000
+CENTS = Decimal('0.01')
+SUMMED = ['new_users', 'total_requests', 'completed_requests', 'total_revenue']
+
+
+def bucket_start(day, resolution):
+    if resolution == 'week':
+        return day - timedelta(days=day.weekday())
+    if resolution == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, resolution):
+    if resolution == 'week':
+        return start + timedelta(days=7)
+    if resolution == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def bucket_starts(start, end, resolution):
+    starts = []
+    current = bucket_start(start, resolution)
+    while current <= end:
+        starts.append(current)
+        current = next_bucket(current, resolution)
+    return starts
+
+
+def get_trends(start, end, resolution='day'):
+    """
+    One entry per bucket from the bucket containing start through the one
+    containing end; raises ValueError for an unknown resolution or a range
+    of more than MAX_BUCKETS buckets
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    if end < start:
+        raise ValueError('end_date must not be before start_date')
+    starts = bucket_starts(start, end, resolution)
+    if len(starts) > MAX_BUCKETS:
+        raise ValueError(f'At most {MAX_BUCKETS} buckets can be requested; use a coarser resolution')
+
+    rows = (
+        DailyStatistics.objects.filter(date__gte=starts[0], date__lte=end)
+        .order_by()
+        .annotate(
+            period=RESOLUTIONS[resolution]('date'),
+            day_request_value=ExpressionWrapper(
+                F('average_request_value') * F('total_requests'),
+                output_field=DecimalField(max_digits=20, decimal_places=2)
+            ),
+        )
+        .values('period')
+        .annotate(
+            **{field: Sum(field) for field in SUMMED},
+            total_users=Max('total_users'),
+            active_users=Max('active_users'),
+            request_value=Sum('day_request_value'),
+        )
+    )
+    by_period = {row.pop('period'): row for row in rows}
+
+    # Carry the user count into leading empty buckets
+    total_users = DailyStatistics.objects.filter(date__lt=starts[0]).order_by('-date').values_list(
+        'total_users', flat=True
+    ).first() or 0
+
+    results = []
+    for period in starts:
+        row = by_period.get(period)
+        if row is None:
+            results.append({
+                'date': period, 'total_users': total_users, 'active_users': 0, 'new_users': 0,
+                'total_requests': 0, 'completed_requests': 0,
+                'total_revenue': Decimal('0.00'), 'average_request_value': Decimal('0.00'),
+            })
+            continue
+        total_users = row['total_users']
+        request_value = row.pop('request_value') or 0
+        results.append({
+            'date': period,
+            **row,
+            'total_revenue': Decimal(row['total_revenue'] or 0).quantize(CENTS),
+            'average_request_value': (
+                Decimal(request_value / row['total_requests']).quantize(CENTS)
+                if row['total_requests'] else Decimal('0.00')
+            ),
+        })
+    return results
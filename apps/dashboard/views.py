@@ -1,5 +1,8 @@
+from datetime import datetime, timedelta
+
 from django.db.models import Count, Sum, Avg, Max
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.db.models.functions import TruncDate
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
@@ -8,6 +11,13 @@ from apps.accounts.permissions import IsAdmin
 from apps.hiring.models import HiringRequest
 from apps.payments.models import Transaction
 from apps.accounts.models import User
+from apps.core.outbox import outbox_metrics
+from apps.portfolio_chat.circuit_breaker import inference_breaker
+from apps.portfolio_chat.response_cache import response_cache_stats
+from .counters import summarize
+from .ingest import AnalyticsIngestThrottle, event_writer, validate_events
+from .stats import get_admin_stats
+from .trends import get_trends
 from .models import (
     AnalyticsEvent,
     DailyStatistics,
@@ -88,51 +98,7 @@ class AdminDashboardViewSet(viewsets.ViewSet):
     def admin_stats(self, request):
         """Get admin dashboard statistics"""
         try:
-            # Get basic stats
-            total_requests = HiringRequest.objects.count()
-            pending_requests = HiringRequest.objects.filter(status='pending').count()
-            completed_requests = HiringRequest.objects.filter(status='completed').count()
-            total_revenue = HiringRequest.objects.filter(
-                status__in=['paid', 'completed']
-            ).aggregate(
-                total=Sum('quoted_price')
-            )['total'] or 0
-
-            # Get recent requests
-            recent_requests = HiringRequest.objects.select_related(
-                'user', 'service_type'
-            ).order_by('-created_at')[:5]
-
-            # Get requests by status
-            requests_by_status = (
-                HiringRequest.objects.values('status')
-                .annotate(count=Count('id'))
-                .order_by('status')
-            )
-
-            # Get requests by service
-            requests_by_service = (
-                HiringRequest.objects.values(
-                    'service_type__name'
-                ).annotate(
-                    count=Count('id')
-                ).order_by('-count')
-            )
-
-            return Response({
-                'total_requests': total_requests,
-                'pending_requests': pending_requests,
-                'completed_requests': completed_requests,
-                'total_revenue': total_revenue,
-                'recent_requests': HiringRequestListSerializer(
-                    recent_requests, many=True
-                ).data,
-                'requests_by_status': requests_by_status,
-                'requests_by_service': [
-                    {'service': item['service_type__name'], 'count': item['count']}
-                    for item in requests_by_service
-                ]
-            })
+            return Response(get_admin_stats())
         except Exception as e:
             logger.error(f"Error getting admin stats: {str(e)}")
             return Response(
@@ -140,6 +106,32 @@ class AdminDashboardViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'])
+    def email_queue(self, request):
+        """Get outbound email queue depth and send latency"""
+        try:
+            window = int(request.query_params.get('window_minutes', 60))
+        except ValueError:
+            window = 0
+        if window <= 0:
+            return Response(
+                {'error': 'window_minutes must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(outbox_metrics(window_minutes=window))
+
+    @action(detail=False, methods=['get'])
+    def ai_cache(self, request):
+        """Get AI chat response cache hit/miss counters"""
+        return Response(response_cache_stats())
+
+    @action(detail=False, methods=['get', 'post'])
+    def ai_breaker(self, request):
+        """Get the AI inference circuit breaker state and latency; POST closes it"""
+        if request.method == 'POST':
+            inference_breaker.reset()
+        return Response(inference_breaker.stats())
+
     @action(detail=False, methods=['get'])
     def requests(self, request):
         """Get all hiring requests with filters"""
@@ -221,6 +213,21 @@ class AdminDashboardViewSet(viewsets.ViewSet):
         serializer = HiringRequestDetailSerializer(hiring_request)
         return Response(serializer.data)
 
+def _parse_bound(value, end=False):
+    """Aware datetime for a date or datetime query parameter; a date as an end bound covers that whole day"""
+    if not value:
+        return None
+    day = parse_date(value) if len(value) == 10 else None
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1) if end else day, datetime.min.time())
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
 class AnalyticsEventViewSet(viewsets.ModelViewSet):
     serializer_class = AnalyticsEventSerializer
     permission_classes = [IsAdmin]
@@ -241,15 +248,33 @@ class AnalyticsEventViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny],
+            throttle_classes=[AnalyticsIngestThrottle])
+    def ingest(self, request):
+        """Accept a batch of page-view and user-action events from the frontend"""
+        events, errors = validate_events(request.data)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        accepted = event_writer.add(events, request.user)
+        return Response({'accepted': accepted}, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=False, methods=['get'])
     def summary(self, request):
-        """Get summary of events grouped by type"""
-        summary = (
-            AnalyticsEvent.objects.values('event_type')
-            .annotate(count=Count('id'))
-            .order_by('-count')
-        )
-        return Response(summary)
+        """
+        Event counts by type from the hourly counters, optionally limited to
+        ?start_date / ?end_date (dates, or datetimes rounded to the hour) and
+        ?event_type
+        """
+        params = request.query_params
+        try:
+            start = _parse_bound(params.get('start_date'))
+            end = _parse_bound(params.get('end_date'), end=True)
+        except ValueError:
+            return Response(
+                {'error': 'start_date and end_date must be ISO dates or datetimes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(summarize(start, end, params.get('event_type')))
 
 class DailyStatisticsViewSet(viewsets.ModelViewSet):
     queryset = DailyStatistics.objects.all()
@@ -259,8 +284,15 @@ class DailyStatisticsViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def generate_daily_stats(self, request):
         """Generate statistics for a specific date or today"""
+        date = timezone.localdate()
+        if request.data.get('date'):
+            try:
+                date = parse_date(str(request.data['date']))
+            except ValueError:
+                date = None
+            if date is None:
+                return Response({'error': 'date must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            date = request.data.get('date', timezone.now().date())
             stats = DailyStatistics.objects.create_or_update_stats(date)
             serializer = self.get_serializer(stats)
             return Response(serializer.data)
@@ -273,17 +305,31 @@ class DailyStatisticsViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def trends(self, request):
-        """Get trends over time"""
-        days = int(request.query_params.get('days', 30))
-        end_date = timezone.now().date()
-        start_date = end_date - timezone.timedelta(days=days)
-        
-        stats = DailyStatistics.objects.filter(
-            date__range=[start_date, end_date]
-        ).order_by('date')
-        
-        serializer = self.get_serializer(stats, many=True)
-        return Response(serializer.data)
+        """
+        Trends bucketed by ?resolution=day|week|month over ?start_date and
+        ?end_date (YYYY-MM-DD), or the last ?days days; empty buckets are
+        filled with zeros
+        """
+        params = request.query_params
+        resolution = params.get('resolution', 'day')
+        try:
+            end_date = parse_date(params['end_date']) if params.get('end_date') else timezone.localdate()
+            if params.get('start_date'):
+                start_date = parse_date(params['start_date'])
+            else:
+                start_date = end_date - timezone.timedelta(days=int(params.get('days', 30)))
+            if start_date is None or end_date is None:
+                raise ValueError('Dates must be YYYY-MM-DD')
+            results = get_trends(start_date, end_date, resolution)
+        except (ValueError, OverflowError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'resolution': resolution,
+            'start_date': start_date,
+            'end_date': end_date,
+            'results': results,
+        })
 
 class UserActivityViewSet(viewsets.ModelViewSet):
     serializer_class = UserActivitySerializer
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 05:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0004_alter_hiringrequest_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hiringrequest',
+            index=models.Index(fields=['created_at'], name='hiring_hiri_created_3ee038_idx'),
+        ),
+    ]
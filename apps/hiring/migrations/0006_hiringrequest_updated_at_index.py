@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 05:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0005_hiringrequest_created_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hiringrequest',
+            index=models.Index(fields=['updated_at'], name='hiring_hiri_updated_36dc8b_idx'),
+        ),
+    ]
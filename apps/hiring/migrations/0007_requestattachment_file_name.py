@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0006_hiringrequest_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestattachment',
+            name='file_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
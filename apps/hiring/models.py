@@ -128,6 +128,12 @@ class HiringRequest(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Latest requests on the admin dashboard
+            models.Index(fields=['created_at']),
+            # Requests changed since the last daily statistics rollup
+            models.Index(fields=['updated_at']),
+        ]
         permissions = [
             ('can_set_price', 'Can set price for request'),
             ('can_process_payment', 'Can process payment for request'),
@@ -148,6 +154,7 @@ class RequestAttachment(models.Model):
         related_name='attachments'
     )
     file = models.FileField(upload_to='hiring/attachments/')
+    file_name = models.CharField(max_length=255, blank=True)  # Name the uploader gave the file
     description = models.CharField(max_length=200, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
@@ -35,8 +35,8 @@ class PriceModifierSerializer(serializers.ModelSerializer):
 class RequestAttachmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = RequestAttachment
-        fields = ['id', 'file', 'description', 'uploaded_at']
-        read_only_fields = ['uploaded_at']
+        fields = ['id', 'file', 'file_name', 'description', 'uploaded_at']
+        read_only_fields = ['file_name', 'uploaded_at']
 
 class RequestMessageSerializer(serializers.ModelSerializer):
     sender_name = serializers.CharField(source='sender.username', read_only=True)
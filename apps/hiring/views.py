@@ -3,7 +3,6 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
@@ -33,6 +32,9 @@ from .serializers import (
     RequestMessageSerializer
 )
 from apps.accounts.permissions import IsAdmin
+from apps.core.file_delivery import serve_file
+from apps.core.uploads import UploadError, get_completed_upload
+from apps.core.outbox import enqueue_email
 
 logger = logging.getLogger(__name__)
 
@@ -153,12 +155,11 @@ class HiringRequestViewSet(viewsets.ModelViewSet):
 
             # Notify admin
             if hasattr(settings, 'ADMIN_EMAIL'):
-                send_mail(
+                enqueue_email(
                     'New Hiring Request Submitted',
                     f'A new hiring request "{hiring_request.title}" has been submitted by {request.user.username}.',
                     settings.DEFAULT_FROM_EMAIL,
                     [settings.ADMIN_EMAIL],
-                    fail_silently=True,
                 )
 
             serializer = HiringRequestDetailSerializer(
@@ -224,23 +225,46 @@ class HiringRequestViewSet(viewsets.ModelViewSet):
             hiring_request = self.get_object()
             files = request.FILES.getlist('files')
             description = request.data.get('description', '')
+            # Finished chunked uploads (apps.core.uploads) can be attached by id
+            if hasattr(request.data, 'getlist'):
+                upload_ids = request.data.getlist('upload_ids')
+            else:
+                upload_ids = request.data.get('upload_ids') or []
+                if isinstance(upload_ids, str):
+                    upload_ids = [upload_ids]
+            if not isinstance(upload_ids, list) or not all(isinstance(upload_id, str) for upload_id in upload_ids):
+                return Response(
+                    {'error': 'upload_ids must be a list of upload ids'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-            if not files:
+            if not files and not upload_ids:
                 logger.error(f"No files provided")
                 return Response(
                     {'error': 'No files provided'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            attachments = []
-            for file in files:
-                attachment = RequestAttachment.objects.create(
-                    request=hiring_request,
-                    file=file,
-                    description=description
-                )
-                attachments.append(attachment)
-                logger.info(f"Uploaded attachment to hiring request: {attachment.id}")
+            try:
+                uploads = [get_completed_upload(request.user, upload_id) for upload_id in upload_ids]
+            except UploadError as e:
+                return Response({'error': str(e)}, status=e.status_code)
+
+            attachments = RequestAttachment.objects.bulk_create(
+                [
+                    RequestAttachment(request=hiring_request, file=file, file_name=file.name[:255], description=description)
+                    for file in files
+                ] + [
+                    # The stored file is shared by everyone who uploaded the same
+                    # bytes, so its name may be another uploader's
+                    RequestAttachment(
+                        request=hiring_request, file=upload.stored_file.file.name,
+                        file_name=upload.filename, description=description
+                    )
+                    for upload in uploads
+                ]
+            )
+            logger.info(f"Uploaded {len(attachments)} attachments to hiring request: {hiring_request.id}")
 
             serializer = RequestAttachmentSerializer(attachments, many=True)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -252,6 +276,12 @@ class HiringRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['get'], url_path=r'attachments/(?P<attachment_id>\d+)/download')
+    def download_attachment(self, request, pk=None, attachment_id=None):
+        hiring_request = self.get_object()
+        attachment = get_object_or_404(RequestAttachment, id=attachment_id, request=hiring_request)
+        return serve_file(request, attachment.file, filename=attachment.file_name or None)
+
     @action(detail=True, methods=['post'])
     def apply_price_modifiers(self, request, pk=None):
         logger.info(f"Received request to apply price modifiers to hiring request: {pk}")
@@ -91,6 +91,10 @@ class Transaction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Transactions changed since the last daily statistics rollup
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return f"{self.reference_id} - {self.get_status_display()}"
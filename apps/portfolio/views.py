@@ -4,7 +4,6 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from django.core.mail import send_mail
 from django.conf import settings
 from .models import (
     Project,
@@ -25,6 +24,7 @@ from .serializers import (
     ContactAdminSerializer,
 )
 from apps.accounts.permissions import IsAdmin
+from apps.core.outbox import enqueue_email
 
 class ProjectViewSet(viewsets.ModelViewSet):
     queryset = Project.objects.all()
@@ -244,15 +244,14 @@ Message:
 This message was sent from the contact form on {settings.SITE_NAME}.
 '''
                 
-                send_mail(
+                enqueue_email(
                     f'New Contact Form Submission: {contact.subject}',
                     plain_text,
                     settings.DEFAULT_FROM_EMAIL,
                     [settings.ADMIN_EMAIL],
                     html_message=html_content,
-                    fail_silently=False,
                 )
-                print(f"Email sent successfully to {settings.ADMIN_EMAIL}")
+                print(f"Email queued for {settings.ADMIN_EMAIL}")
             except Exception as e:
                 print(f"Error sending email: {str(e)}")
         
@@ -0,0 +1,178 @@
+"""
+Circuit breaker for the AI inference endpoint.
+
+    closed    -- requests go to the endpoint; consecutive failures are counted
+    open      -- after AI_BREAKER_FAILURE_THRESHOLD failures in a row requests
+                 skip the endpoint and are answered from the fallback responses
+    half_open -- AI_BREAKER_RECOVERY_TIMEOUT seconds after opening, a single
+                 trial request is let through; success closes the breaker,
+                 failure opens it again
+
+The state lives in Django's cache so every worker process shares it, and
+the probe_inference_endpoint command can close the breaker as soon as the
+model answers again. Updates are read-modify-write without locking: under
+concurrent failures the count may lag by a request or two, which only
+shifts when the breaker trips.
+"""
+import logging
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .inference import get_api_key, get_inference_url
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+BREAKER_FAILURE_THRESHOLD = getattr(settings, 'AI_BREAKER_FAILURE_THRESHOLD', 5)
+BREAKER_RECOVERY_TIMEOUT = getattr(settings, 'AI_BREAKER_RECOVERY_TIMEOUT', 30)
+BREAKER_LATENCY_SAMPLES = getattr(settings, 'AI_BREAKER_LATENCY_SAMPLES', 200)
+
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 recovery_timeout=BREAKER_RECOVERY_TIMEOUT, latency_samples=BREAKER_LATENCY_SAMPLES):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.latency_samples = latency_samples
+        self._state_key = f'breaker:{name}:state'
+        self._trial_key = f'breaker:{name}:trial'
+        self._latency_key = f'breaker:{name}:latency'
+
+    def _get(self):
+        return cache.get(self._state_key) or {
+            'state': CLOSED, 'failures': 0, 'opened_at': None, 'last_failure': None,
+        }
+
+    def _set(self, data):
+        cache.set(self._state_key, data, None)
+
+    @property
+    def state(self):
+        data = self._get()
+        if data['state'] == OPEN and time.time() - data['opened_at'] >= self.recovery_timeout:
+            return HALF_OPEN
+        return data['state']
+
+    def allow_request(self):
+        """Whether a request may go to the endpoint right now"""
+        data = self._get()
+        if data['state'] == CLOSED:
+            return True
+        if data['state'] == OPEN and time.time() - data['opened_at'] < self.recovery_timeout:
+            return False
+        # Half-open: only one trial request until it reports back. The trial
+        # claim expires so a worker that dies mid-request can't wedge the breaker.
+        if cache.add(self._trial_key, True, max(self.recovery_timeout, 1)):
+            if data['state'] != HALF_OPEN:
+                data['state'] = HALF_OPEN
+                self._set(data)
+            return True
+        return False
+
+    def record_success(self, latency=None):
+        data = self._get()
+        if data['state'] != CLOSED:
+            logger.info(f"Circuit breaker {self.name!r} closed")
+            cache.delete(self._trial_key)
+        if data['state'] != CLOSED or data['failures']:
+            self._set({'state': CLOSED, 'failures': 0, 'opened_at': None, 'last_failure': data['last_failure']})
+        if latency is not None:
+            self._record_latency(latency)
+
+    def record_failure(self, reason='', latency=None):
+        data = self._get()
+        data['failures'] += 1
+        data['last_failure'] = {'at': time.time(), 'reason': str(reason)[:200]}
+        if data['state'] != CLOSED or data['failures'] >= self.failure_threshold:
+            if data['state'] != OPEN:
+                logger.warning(f"Circuit breaker {self.name!r} opened after {data['failures']} failures: {reason}")
+            data['state'] = OPEN
+            data['opened_at'] = time.time()
+        self._set(data)
+        cache.delete(self._trial_key)
+        if latency is not None:
+            self._record_latency(latency)
+
+    def reset(self):
+        self._set({'state': CLOSED, 'failures': 0, 'opened_at': None, 'last_failure': None})
+        cache.delete(self._trial_key)
+
+    def _record_latency(self, latency):
+        samples = cache.get(self._latency_key, [])
+        samples.append(round(latency * 1000, 1))
+        cache.set(self._latency_key, samples[-self.latency_samples:], None)
+
+    def stats(self):
+        data = self._get()
+        samples = sorted(cache.get(self._latency_key, []))
+        retry_in = None
+        if data['state'] == OPEN:
+            retry_in = max(0, round(data['opened_at'] + self.recovery_timeout - time.time(), 1))
+        return {
+            'name': self.name,
+            'state': self.state,
+            'consecutive_failures': data['failures'],
+            'failure_threshold': self.failure_threshold,
+            'recovery_timeout_seconds': self.recovery_timeout,
+            'half_open_in_seconds': retry_in,
+            'last_failure': data['last_failure'],
+            'latency_ms': {
+                'samples': len(samples),
+                'p50': _percentile(samples, 50),
+                'p95': _percentile(samples, 95),
+                'p99': _percentile(samples, 99),
+                'max': samples[-1] if samples else None,
+            },
+        }
+
+
+inference_breaker = CircuitBreaker('ai-inference')
+
+
+def probe_inference_endpoint(force=False):
+    """
+    Send a one-token generation request and feed the outcome to the breaker
+
+    Only probes while the breaker is not closed unless force is set, so a
+    healthy endpoint costs no extra inference calls. Returns the outcome as
+    a dict, or None when the probe was skipped.
+    """
+    if not force and inference_breaker.state == CLOSED:
+        return None
+
+    timeout = (getattr(settings, 'AI_CONNECT_TIMEOUT', 5), getattr(settings, 'AI_READ_TIMEOUT', 30))
+    started = time.monotonic()
+    try:
+        response = requests.post(
+            get_inference_url(),
+            headers={"Authorization": f"Bearer {get_api_key()}"},
+            json={"inputs": "ping", "parameters": {"max_new_tokens": 1}},
+            timeout=timeout
+        )
+        latency = time.monotonic() - started
+        healthy = response.status_code == 200
+        detail = f"HTTP {response.status_code}"
+    except requests.exceptions.RequestException as e:
+        latency = time.monotonic() - started
+        healthy = False
+        detail = str(e)
+
+    if healthy:
+        inference_breaker.record_success(latency)
+    else:
+        inference_breaker.record_failure(f"Probe failed: {detail}", latency)
+    return {'healthy': healthy, 'detail': detail, 'latency_ms': round(latency * 1000, 1)}
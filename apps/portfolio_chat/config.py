@@ -0,0 +1,71 @@
+"""
+Process-local values derived from a SystemConfiguration row.
+
+Used for chat settings that admins edit at runtime (extra fallback intents,
+the AI system prompt). The derived value is rebuilt only when the row's
+updated_at changes. Saving or deleting the row resets the check in the
+process that handled the save; other processes re-check the row at most
+every AI_CHAT_CONFIG_RELOAD_INTERVAL seconds.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CONFIG_RELOAD_INTERVAL = getattr(settings, 'AI_CHAT_CONFIG_RELOAD_INTERVAL', 60)
+
+_registry = {}
+
+
+class ConfigBackedValue:
+    def __init__(self, key, build, default, reload_interval=CONFIG_RELOAD_INTERVAL):
+        """
+        build(value) turns the row's JSON value into the derived object;
+        default is used while the row does not exist
+        """
+        self.key = key
+        self.build = build
+        self.default = default
+        self.reload_interval = reload_interval
+        self._value = default
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        _registry[key] = self
+
+    def get(self):
+        from apps.dashboard.models import SystemConfiguration
+
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.reload_interval:
+            return self._value
+
+        with self._lock:
+            try:
+                rows = SystemConfiguration.objects.filter(key=self.key)
+                # Only the timestamp is read unless the row changed
+                version = rows.values_list('updated_at', flat=True).first()
+                if version != self._version:
+                    if version is None:
+                        self._value = self.default
+                    else:
+                        self._value = self.build(rows.values_list('value', flat=True).first())
+                    self._version = version
+            except Exception as e:
+                # Keep serving the last good value
+                logger.error(f"Failed to load configuration {self.key!r}: {str(e)}")
+            self._checked_at = now
+        return self._value
+
+    def invalidate(self):
+        """Re-check the row on the next get()"""
+        self._checked_at = None
+
+
+def invalidate_config(key):
+    value = _registry.get(key)
+    if value is not None:
+        value.invalidate()
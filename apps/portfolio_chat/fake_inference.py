@@ -0,0 +1,102 @@
+"""
+Local stand-in for the Hugging Face text generation endpoint.
+
+Answers streaming requests with server-sent events in the text generation
+inference format and plain requests with a generated_text list, so both AI
+chat paths can be exercised in tests or local development without network
+access:
+
+    with FakeInferenceServer(tokens=['>> ', 'Hello']) as server:
+        with override_settings(AI_INFERENCE_URL=server.url, HUGGINGFACE_API_KEY='test'):
+            ...
+        assert server.requests[0]['stream']
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _InferenceHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        fake.record(payload, dict(self.headers))
+
+        if fake.status != 200:
+            self._send_json(fake.status, {'error': fake.error})
+            return
+
+        if not payload.get('stream'):
+            self._send_json(200, [{'generated_text': ''.join(fake.tokens)}])
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        try:
+            for index, text in enumerate(fake.tokens):
+                if fake.delay:
+                    time.sleep(fake.delay)
+                last = index == len(fake.tokens) - 1
+                event = {
+                    'token': {'id': index, 'text': text, 'logprob': 0.0, 'special': False},
+                    'generated_text': ''.join(fake.tokens) if last else None,
+                    'details': None,
+                }
+                self.wfile.write(f"data:{json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            fake.disconnects += 1
+
+
+class FakeInferenceServer:
+    """Threaded HTTP server bound to a free localhost port"""
+
+    def __init__(self, tokens=None, status=200, error='Internal error', delay=0, host='127.0.0.1', port=0):
+        self.tokens = list(tokens or ['>> ', 'Hello', ' from', ' the', ' grid.'])
+        self.status = status
+        self.error = error
+        self.delay = delay
+        self.requests = []
+        self.headers = []
+        self.disconnects = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _InferenceHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+        self.host, self.port = self._server.server_address
+        self.url = f'http://{self.host}:{self.port}/models/fake'
+
+    def record(self, payload, headers):
+        with self._lock:
+            self.requests.append(payload)
+            self.headers.append(headers)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,105 @@
+"""
+Async streaming client for the text generation inference endpoint.
+
+One pooled httpx.AsyncClient is kept per event loop, so keep-alive
+connections to the endpoint are reused across requests served by the same
+ASGI worker. Connect and read timeouts are configured separately: an
+unreachable endpoint fails within AI_CONNECT_TIMEOUT, while AI_READ_TIMEOUT
+bounds the wait for each streamed chunk rather than the whole generation.
+"""
+import asyncio
+import json
+import logging
+import os
+import weakref
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_clients = weakref.WeakKeyDictionary()
+
+
+class InferenceError(Exception):
+    """The endpoint answered with an error instead of generated text"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def get_api_key():
+    return getattr(settings, 'HUGGINGFACE_API_KEY', '') or os.getenv('HUGGINGFACE_API_KEY', '')
+
+
+def get_inference_url():
+    return getattr(
+        settings, 'AI_INFERENCE_URL',
+        'https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2'
+    )
+
+
+def get_async_client():
+    """Return the pooled client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        pool_size = getattr(settings, 'AI_HTTP_POOL_SIZE', 20)
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                connect=getattr(settings, 'AI_CONNECT_TIMEOUT', 5),
+                read=getattr(settings, 'AI_READ_TIMEOUT', 30),
+                write=10,
+                pool=getattr(settings, 'AI_CONNECT_TIMEOUT', 5),
+            ),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def stream_generated_tokens(prompt, parameters):
+    """
+    Yield generated text token by token from a streaming (server-sent
+    events) text generation request. Raises InferenceError on an error
+    response and lets httpx timeouts and transport errors propagate.
+
+    Closing the generator (e.g. when the browser disconnects and the
+    response task is cancelled) closes the upstream request as well.
+    """
+    payload = {'inputs': prompt, 'parameters': parameters, 'stream': True}
+    headers = {
+        'Authorization': f'Bearer {get_api_key()}',
+        'Accept': 'text/event-stream',
+    }
+
+    client = get_async_client()
+    async with client.stream('POST', get_inference_url(), json=payload, headers=headers) as response:
+        if response.status_code != 200:
+            body = await response.aread()
+            raise InferenceError(
+                f"Inference request failed with status code {response.status_code}: "
+                f"{body[:500].decode('utf-8', 'replace')}",
+                status_code=response.status_code,
+            )
+
+        async for line in response.aiter_lines():
+            if not line.startswith('data:'):
+                continue
+            data = line[len('data:'):].strip()
+            if not data or data == '[DONE]':
+                continue
+            try:
+                event = json.loads(data)
+            except ValueError:
+                logger.warning(f"Skipping malformed inference event: {data[:200]}")
+                continue
+            if event.get('error'):
+                raise InferenceError(event['error'])
+
+            token = event.get('token') or {}
+            if token.get('special'):
+                continue
+            if token.get('text'):
+                yield token['text']
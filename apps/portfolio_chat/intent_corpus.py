@@ -0,0 +1,59 @@
+"""
+Hand-labelled visitor questions for the fallback intent matcher.
+
+Used by the accuracy test and by the bench_intent_matcher command. The
+label is the expected intent name, or None when no intent should match.
+"""
+
+LABELLED_MESSAGES = [
+    # services
+    ("What services do you offer?", "services"),
+    ("Which services does Sameer provide", "services"),
+    ("do you offer e-commerce development", "services"),
+    ("Can he provide API integration?", "services"),
+    ("What kind of service can I get here", "services"),
+    ("list of services please", "services"),
+    # skills
+    ("What are your skills?", "skills"),
+    ("Is Sameer an expert in Django?", "skills"),
+    ("What is he good at?", "skills"),
+    ("What's his tech stack", "skills"),
+    ("Which frameworks does he use?", "skills"),
+    ("what technologies does sameer use", "skills"),
+    ("Which programming languages do you use?", "skills"),
+    ("skills", "skills"),
+    # hire
+    ("How do I hire Sameer?", "hire"),
+    ("I'd like to hire you for a project next month", "hire"),
+    ("Is he available for freelance work?", "hire"),
+    ("Can I work with Sameer on my startup?", "hire"),
+    ("do you have a job opening for him", "hire"),
+    ("How does the hiring process work?", "hire"),
+    ("I want to employ a full-stack developer", "hire"),
+    ("Could Sameer work for our agency?", "hire"),
+    # contact
+    ("How can I contact Sameer?", "contact"),
+    ("What's his email address", "contact"),
+    ("How do I reach him", "contact"),
+    ("I want to get in touch", "contact"),
+    ("Can we schedule a call?", "contact"),
+    # experience
+    ("How much experience does Sameer have?", "experience"),
+    ("Tell me about his background", "experience"),
+    ("Where has he worked before?", "experience"),
+    ("what is his professional experience with react", "experience"),
+    # portfolio
+    ("Show me your portfolio", "portfolio"),
+    ("What projects has Sameer built?", "portfolio"),
+    ("Can I see some of your work?", "portfolio"),
+    ("Where can I find his past work", "portfolio"),
+    ("link to the project gallery", "portfolio"),
+    ("I'd like to look at previous work examples", "portfolio"),
+    # nothing to match
+    ("Hello there", None),
+    ("What's the weather like today?", None),
+    ("Tell me about Sameer", None),
+    ("Who are you?", None),
+    ("What time zone is he in?", None),
+    ("thanks!", None),
+]
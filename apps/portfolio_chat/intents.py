@@ -0,0 +1,249 @@
+"""
+Keyword intent matcher behind the AI chat fallback answers.
+
+All intent keywords are compiled once into a single regex built from a
+prefix trie of the keywords (anchored at word starts, longest match wins),
+so classifying a message is one scan no matter how many intents exist.
+Every keyword carries a weight per intent; a message scores each intent by
+the weights of the keywords it contains, which lets an ambiguous word such
+as "work" count towards several intents without one list silently
+shadowing another.
+
+Extra intents and answers can be configured at runtime through the
+SystemConfiguration row named by AI_CHAT_INTENTS_CONFIG_KEY, e.g.
+
+    [{"name": "pricing", "keywords": ["price", "rate", "cost"],
+      "responses": ["Pricing depends on the project scope..."]}]
+
+Keywords may also be given as {"keyword": weight}. An entry whose name
+matches a built-in intent adds keywords and answers to it. Changes are
+picked up without a restart (see config.ConfigBackedValue).
+"""
+import logging
+import re
+from collections import defaultdict
+
+from django.conf import settings
+
+from .config import ConfigBackedValue
+
+logger = logging.getLogger(__name__)
+
+INTENTS_CONFIG_KEY = getattr(settings, 'AI_CHAT_INTENTS_CONFIG_KEY', 'ai_chat_intents')
+
+# Fallback responses for common questions
+FALLBACK_RESPONSES = {
+    "services": [
+        "I can help with information about Sameer's web development services. He offers full-stack development with React and Django, responsive design, and API integration. For specific project inquiries, please contact him directly at admin@sameergul.com.",
+        "Sameer specializes in creating modern web applications using React, Django, and other cutting-edge technologies. His services include both frontend and backend development for various business needs.",
+        "Sameer's services include full-stack development, custom web applications, e-commerce solutions, and portfolio websites. He focuses on creating responsive and user-friendly experiences."
+    ],
+    "skills": [
+        "Sameer is a skilled web developer with expertise in various technologies such as HTML, CSS, JavaScript, React, and Django. He specializes in building responsive and user-friendly websites, as well as web applications.",
+        "Sameer has expertise in frontend frameworks like React, backend technologies like Django/Python, and cloud deployment. His full-stack skills allow him to handle projects from concept to completion.",
+        "Sameer's technical skills include JavaScript/TypeScript, Python, React, Django, and various database technologies like PostgreSQL. He's particularly experienced with Django for backend development."
+    ],
+    "hire": [
+        "To hire Sameer for your project, click on the hiring button which takes you to the service page. Fill out the form to generate a unique token, and Sameer will contact you directly to discuss your project. You can also email him at admin@sameergul.com.",
+        "The hiring process is simple: Click the hiring button, go to the service page, and complete the form. This generates a unique token for both you and Sameer. He'll then reach out to discuss your project requirements in detail.",
+        "To start the hiring process, use the hiring button on the website to access the service page. After filling out the form, you'll receive a unique token, and Sameer will contact you to discuss next steps for your project."
+    ],
+    "portfolio": [
+        "Sameer's portfolio showcases various web development projects including e-commerce sites, dashboards, and custom applications. You can browse his work in the Projects section of this website.",
+        "You can view Sameer's past work in the portfolio section, which includes various web applications built with React and Django. Each project demonstrates different aspects of his technical skills.",
+        "Sameer's portfolio demonstrates his ability to create modern, responsive, and user-friendly web applications. His projects highlight his expertise in both frontend and backend development."
+    ],
+    "default": [
+        "I'm PortfolioGPT, here to help you learn about Sameer's services and how to hire him. Feel free to ask specific questions about his skills, projects, or services! The website also features a real-time chat system where you can communicate directly with Sameer.",
+        "Hello! I'm PortfolioGPT, Sameer's virtual assistant. I can provide information about his web development skills, services, and how to hire him for your project. The site includes a real-time chat feature for direct communication. How can I help you today?",
+        "Welcome to Sameer Gul's portfolio website. I'm PortfolioGPT, and I can provide information about Sameer's skills, services, and how to hire him for your project. You can also use the real-time chat system to communicate directly with Sameer. What would you like to know?"
+    ]
+}
+
+# Built-in intents in priority order (earlier wins a tie). "category" names
+# the FALLBACK_RESPONSES entry the intent is answered from.
+BUILTIN_INTENTS = [
+    {
+        "name": "services",
+        "keywords": {"service": 1, "offer": 1, "provide": 1},
+    },
+    {
+        "name": "skills",
+        "keywords": {
+            "skill": 1, "expert": 1, "good at": 1, "tech stack": 1, "technolog": 1,
+            "framework": 1, "programming language": 1, "know": 0.5,
+        },
+    },
+    {
+        "name": "hire",
+        "keywords": {
+            "hire": 1, "hiring": 1, "employ": 1, "job": 1, "freelance": 1,
+            "work with": 1, "work for": 1, "work": 0.5,
+        },
+    },
+    {
+        "name": "contact",
+        "category": "default",
+        "keywords": {"contact": 1, "reach": 1, "email": 1, "get in touch": 1, "call": 0.5},
+    },
+    {
+        "name": "experience",
+        "category": "default",
+        "keywords": {"experience": 1, "background": 1, "worked": 1, "history": 0.5},
+    },
+    {
+        "name": "portfolio",
+        "keywords": {
+            "portfolio": 1, "project": 1, "your work": 1, "past work": 1,
+            "previous work": 1, "work": 0.5,
+        },
+    },
+]
+
+
+def _trie_pattern(keywords):
+    """
+    Build a regex matching any of the keywords, factored by common prefix
+
+    Python's re tries the branches of a flat alternation one by one; sharing
+    prefixes ("work", "work with", "worked") lets it reject most positions
+    after a character or two. Optional suffixes are greedy, so the longest
+    keyword wins.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return ('(?:' + body + ')' if len(branches) == 1 and len(body) > 1 else body) + '?'
+        return body
+
+    return build(trie)
+
+
+class IntentMatcher:
+    """Scores messages against a fixed set of weighted keyword intents"""
+
+    def __init__(self, intents, responses):
+        self.responses = {category: list(answers) for category, answers in responses.items()}
+        self.categories = {}
+        self._priority = {}
+        self._weights = defaultdict(list)  # keyword -> [(intent name, weight)]
+
+        for intent in intents:
+            name = intent["name"]
+            self._priority.setdefault(name, len(self._priority))
+            self.categories[name] = intent.get("category", self.categories.get(name, name))
+            for keyword, weight in intent["keywords"].items():
+                self._weights[keyword.lower()].append((name, weight))
+
+        self._pattern = re.compile(r"\b" + _trie_pattern(self._weights)) if self._weights else None
+
+    def score(self, message):
+        """Return [(intent name, score)] for every matching intent, best first"""
+        scores, _ = self._tally(message.lower())
+        return sorted(scores.items(), key=lambda item: (-item[1], self._priority[item[0]]))
+
+    def _tally(self, message_lower):
+        """Return ({intent: score}, {intent: number of keywords found})"""
+        scores = {}
+        hits = {}
+        if self._pattern is not None:
+            for keyword in self._pattern.findall(message_lower):
+                for name, weight in self._weights[keyword]:
+                    scores[name] = scores.get(name, 0) + weight
+                    hits[name] = hits.get(name, 0) + 1
+        return scores, hits
+
+    def classify(self, message):
+        """
+        Return the best intent for a message and a confidence between 0 and 1
+
+        Confidence is the best intent's share of the total score, scaled down
+        when the evidence is thin: a best score under 1 (only weak keywords)
+        counts proportionally, and a single keyword in a message of more than
+        six words counts 0.7. No match returns (None, 0.0).
+        """
+        name, confidence, _ = self.match(message)
+        return name, confidence
+
+    def match(self, message):
+        """
+        Like classify, plus how many keywords of the best intent were found
+
+        A lone keyword in a short message is fully confident but says little
+        about the question as a whole, so callers can ask for more evidence.
+        """
+        scores, hits = self._tally(message.lower())
+        if not scores:
+            return None, 0.0, 0
+
+        priority = self._priority
+        name = min(scores, key=lambda intent: (-scores[intent], priority[intent]))
+        best = scores[name]
+        share = best / sum(scores.values())
+        strength = min(best, 1.0)
+        if best < 2 and len(message.split()) > 6:
+            strength *= 0.7
+        return name, round(share * strength, 4), hits[name]
+
+    def category_for(self, name):
+        return self.categories.get(name, "default") if name else "default"
+
+
+def build_matcher(extra_intents=()):
+    """Compile the built-in intents merged with configured extras"""
+    intents = [dict(intent) for intent in BUILTIN_INTENTS]
+    responses = dict(FALLBACK_RESPONSES)
+
+    for entry in extra_intents:
+        try:
+            name = str(entry["name"])
+            keywords = entry.get("keywords") or {}
+            if isinstance(keywords, (list, tuple)):
+                keywords = {keyword: 1 for keyword in keywords}
+            keywords = {str(keyword): float(weight) for keyword, weight in keywords.items() if str(keyword).strip()}
+            answers = [str(answer) for answer in entry.get("responses") or []]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            logger.warning(f"Skipping malformed chat intent: {entry!r}")
+            continue
+
+        existing = next((intent for intent in intents if intent["name"] == name), None)
+        category = existing.get("category", name) if existing else name
+        if not answers and category not in responses:
+            logger.warning(f"Skipping chat intent {name!r} without responses")
+            continue
+        if existing:
+            existing["keywords"] = {**existing["keywords"], **keywords}
+        else:
+            intents.append({"name": name, "keywords": keywords})
+        if answers:
+            responses[category] = list(responses.get(category, [])) + answers
+
+    return IntentMatcher(intents, responses)
+
+
+DEFAULT_MATCHER = build_matcher()
+
+
+def _build_configured_matcher(value):
+    if not isinstance(value, list):
+        logger.warning(f"SystemConfiguration {INTENTS_CONFIG_KEY!r} must be a list of intents")
+        return DEFAULT_MATCHER
+    return build_matcher(value)
+
+
+_configured_matcher = ConfigBackedValue(INTENTS_CONFIG_KEY, _build_configured_matcher, DEFAULT_MATCHER)
+
+
+def get_intent_matcher():
+    """Return the current matcher, rebuilt whenever the configured intents change"""
+    return _configured_matcher.get()
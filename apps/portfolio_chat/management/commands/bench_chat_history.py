@@ -0,0 +1,70 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.portfolio_chat.models import Conversation, Message
+from apps.portfolio_chat.serializers import MessageSerializer
+from apps.portfolio_chat.views import ConversationViewSet
+
+
+class Command(BaseCommand):
+    help = 'Benchmark conversation history loading (full dump vs cursor pages). Data is rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=10000,
+                            help='Number of messages in the benchmark conversation')
+        parser.add_argument('--limit', type=int, default=50, help='Page size for cursor pages')
+
+    def _measure(self, label, func):
+        # Count through an execute wrapper: the debug query log is capped at 9000 entries
+        query_count = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            result = func()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(f"{label:<40} {query_count:>6} queries {elapsed_ms:>10.1f} ms")
+        return result
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        factory = APIRequestFactory()
+        view = ConversationViewSet.as_view({'get': 'messages'})
+
+        with transaction.atomic():
+            senders = [
+                User.objects.create_user(email=f'bench-history-{i}@example.com', password=None)
+                for i in range(2)
+            ]
+            conversation = Conversation.objects.create()
+            conversation.participants.add(*senders)
+            Message.objects.bulk_create(
+                Message(conversation=conversation, sender=senders[i % 2], content=f'Benchmark message {i}')
+                for i in range(options['messages'])
+            )
+            self.stdout.write(f"Conversation with {options['messages']} messages")
+
+            def request(params=None):
+                req = factory.get(f'/api/v1/chat/conversations/{conversation.id}/messages/', params or {})
+                force_authenticate(req, user=senders[0])
+                return view(req, pk=conversation.id)
+
+            def full_dump():
+                messages = conversation.messages.order_by('created_at')
+                return MessageSerializer(messages, many=True, context={'request': factory.get('/')}).data
+
+            self._measure('Unpaginated dump (previous behaviour)', full_dump)
+            latest = self._measure('Latest page', lambda: request({'limit': options['limit']}))
+            oldest_id = latest.data['before']
+            self._measure('Older page (before cursor)', lambda: request({'before': oldest_id, 'limit': options['limit']}))
+            self._measure('Poll for new messages (after cursor)', lambda: request({'after': latest.data['after']}))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.portfolio_chat.intent_corpus import LABELLED_MESSAGES
+from apps.portfolio_chat.intents import DEFAULT_MATCHER
+
+# The keyword chain get_fallback_response used before the compiled matcher
+LEGACY_RULES = [
+    ("services", ['service', 'offer', 'provide']),
+    ("skills", ['skill', 'know', 'expert', 'good at']),
+    ("hire", ['hire', 'work', 'employ', 'job']),
+    ("contact", ['contact', 'reach', 'email', 'call']),
+    ("experience", ['experience', 'background', 'history', 'worked']),
+    ("portfolio", ['portfolio', 'projects', 'work']),
+]
+
+
+def legacy_classify(message):
+    message_lower = message.lower()
+    for intent, keywords in LEGACY_RULES:
+        if any(keyword in message_lower for keyword in keywords):
+            return intent
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the fallback intent matcher against the previous keyword chain'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000,
+                            help='Passes over the labelled corpus per classifier')
+
+    def _measure(self, label, classify, iterations):
+        correct = sum(classify(message) == expected for message, expected in LABELLED_MESSAGES)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for message, _ in LABELLED_MESSAGES:
+                classify(message)
+        elapsed = time.perf_counter() - started
+        per_message_us = elapsed / (iterations * len(LABELLED_MESSAGES)) * 1_000_000
+        accuracy = correct / len(LABELLED_MESSAGES) * 100
+        self.stdout.write(f"{label:<28} {per_message_us:>8.2f} us/message {accuracy:>7.1f}% accurate")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        self.stdout.write(f"{len(LABELLED_MESSAGES)} labelled messages x {iterations} iterations")
+        self._measure('Keyword chain (previous)', legacy_classify, iterations)
+        self._measure('Compiled matcher', lambda message: DEFAULT_MATCHER.classify(message)[0], iterations)
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.portfolio_chat.prompts import SYSTEM_PROMPT, build_prompt
+
+
+def legacy_build_prompt(user_message, conversation_history):
+    """The string-concatenating builder get_ai_response used before"""
+    formatted_prompt = f"<s>[INST] {SYSTEM_PROMPT} [/INST]\n"
+    formatted_prompt += ">> ACKNOWLEDGED: System online. Ready to process queries on Sameer’s grid.\n"
+    formatted_prompt += "</s>\n"
+    start_idx = 1 if conversation_history and conversation_history[0].get("role") == "system" else 0
+
+    for message in conversation_history[start_idx:]:
+        if message["role"] == "user":
+            formatted_prompt += f"<s>[INST] {message['content']} [/INST]\n"
+        else:
+            formatted_prompt += f"{message['content']}</s>\n"
+
+    formatted_prompt += f"<s>[INST] {user_message} [/INST]\n"
+    return formatted_prompt.strip()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark prompt assembly (previous concatenating builder vs budgeted join builder)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000, help='Prompts built per measurement')
+        parser.add_argument('--turn-length', type=int, default=300, help='Characters per history turn')
+
+    def _measure(self, label, build, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            prompt = build()
+        per_call_us = (time.perf_counter() - started) / iterations * 1_000_000
+        self.stdout.write(f"  {label:<28} {per_call_us:>9.1f} us/prompt {len(prompt):>8} chars")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        message = 'What kind of projects has Sameer built with Django?'
+        for turns in (10, 50, 200):
+            history = [
+                {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'{i} ' + 'x' * options['turn_length']}
+                for i in range(turns)
+            ]
+            self.stdout.write(f"{turns} turns")
+            self._measure('Concatenating (previous)', lambda: legacy_build_prompt(message, history), iterations)
+            self._measure('Join, unbounded', lambda: build_prompt(message, history, 10 ** 9, 10 ** 9), iterations)
+            self._measure('Join, default budgets', lambda: build_prompt(message, history), iterations)
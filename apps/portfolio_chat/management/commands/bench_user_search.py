@@ -0,0 +1,89 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.portfolio_chat.views import UserListView
+
+FIRST_NAMES = ['Ava', 'Ben', 'Chloe', 'Daniel', 'Emma', 'Farah', 'George', 'Hina', 'Imran', 'Julia',
+               'Kamran', 'Laura', 'Mohsin', 'Nadia', 'Omar', 'Priya', 'Quinn', 'Rahul', 'Sara', 'Tariq']
+LAST_NAMES = ['Ahmed', 'Brown', 'Chen', 'Davis', 'Evans', 'Fischer', 'Garcia', 'Hussain', 'Ito', 'Jones',
+              'Khan', 'Lopez', 'Malik', 'Nguyen', 'Olsen', 'Patel', 'Qureshi', 'Rossi', 'Smith', 'Taylor']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the chat user picker (full list vs indexed prefix search pages). Data is rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Number of users to create')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per measurement (best time is shown)')
+
+    def _measure(self, label, func, repeat):
+        query_count = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        best = None
+        with connection.execute_wrapper(count_queries):
+            for _ in range(repeat):
+                started = time.perf_counter()
+                result = func()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+        self.stdout.write(
+            f"{label:<36} {query_count // repeat:>4} queries {best * 1000:>10.2f} ms {len(result):>8} rows"
+        )
+        return result
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        factory = APIRequestFactory()
+        view = UserListView.as_view()
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            User.objects.bulk_create(
+                (
+                    User(
+                        email=f'user{i}@example.com',
+                        first_name=rng.choice(FIRST_NAMES),
+                        last_name=rng.choice(LAST_NAMES),
+                        password='!',
+                    )
+                    for i in range(options['users'])
+                ),
+                batch_size=2000,
+            )
+            viewer = User.objects.order_by('id').first()
+            self.stdout.write(f"{options['users']} users")
+
+            def full_list():
+                # The previous UserListView / available_users body
+                users = User.objects.exclude(id=viewer.id)
+                return [{
+                    'id': user.id,
+                    'email': user.email,
+                    'username': user.username,
+                    'first_name': user.first_name,
+                    'last_name': user.last_name
+                } for user in users]
+
+            def search(params):
+                request = factory.get('/api/v1/chat/users/', params)
+                force_authenticate(request, user=viewer)
+                return view(request).data['results']
+
+            self._measure('Full list (previous behaviour)', full_list, max(1, options['repeat'] // 10))
+            first = self._measure('First page, no query', lambda: search({}), options['repeat'])
+            self._measure('Next page', lambda: search({'after': first[-1]['id']}), options['repeat'])
+            self._measure('Prefix "smi"', lambda: search({'q': 'smi'}), options['repeat'])
+            self._measure('Prefix "user9999"', lambda: search({'q': 'user9999'}), options['repeat'])
+            self._measure('Two words "sara kh"', lambda: search({'q': 'sara kh'}), options['repeat'])
+
+            transaction.set_rollback(True)
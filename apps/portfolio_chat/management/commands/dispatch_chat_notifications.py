@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.portfolio_chat.notifications import dispatch_pending_notifications
+
+
+class Command(BaseCommand):
+    help = 'Send debounced email digests for pending chat notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=15.0,
+                            help='Seconds between dispatch passes')
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single dispatch pass and exit')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Chat notification dispatcher started')
+        try:
+            while True:
+                result = dispatch_pending_notifications()
+                if any(result.values()):
+                    self.stdout.write(
+                        f"Digests {result['digests']}, single {result['single']}, skipped {result['skipped']}"
+                    )
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Chat notification dispatcher stopped')
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.portfolio_chat.circuit_breaker import inference_breaker, probe_inference_endpoint
+
+
+class Command(BaseCommand):
+    help = 'Probe the AI inference endpoint while its circuit breaker is open and close it on recovery'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=getattr(settings, 'AI_PROBE_INTERVAL', 15),
+                            help='Seconds between probes')
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single probe and exit')
+        parser.add_argument('--force', action='store_true',
+                            help='Probe even while the breaker is closed')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Inference endpoint probe started')
+        try:
+            while True:
+                result = probe_inference_endpoint(force=options['force'])
+                if result is not None:
+                    outcome = 'healthy' if result['healthy'] else 'failing'
+                    self.stdout.write(
+                        f"Endpoint {outcome} ({result['detail']}, {result['latency_ms']} ms), "
+                        f"breaker {inference_breaker.state}"
+                    )
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Inference endpoint probe stopped')
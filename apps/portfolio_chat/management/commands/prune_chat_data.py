@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from apps.portfolio_chat.retention import CHUNK_SIZE, prune_chat_data
+
+
+class Command(BaseCommand):
+    help = 'Delete (and optionally archive) AI chat messages and chat notifications past their retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anonymous-days', type=int,
+                            help='Keep anonymous AI chat messages this many days')
+        parser.add_argument('--user-days', type=int,
+                            help="Keep signed-in users' AI chat messages this many days")
+        parser.add_argument('--notification-days', type=int,
+                            help='Keep chat notifications this many days')
+        parser.add_argument('--archive-dir',
+                            help='Write deleted rows to gzip-compressed JSONL files in this directory')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Rows deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between chunks')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the rows that would be deleted')
+
+    def handle(self, *args, **options):
+        report = prune_chat_data(
+            archive_dir=options['archive_dir'],
+            chunk_size=options['chunk_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+            anonymous_days=options['anonymous_days'],
+            user_days=options['user_days'],
+            notification_days=options['notification_days'],
+        )
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        for name, rows, elapsed, archive_path in report:
+            line = f"{name:<20} {verb} {rows} rows"
+            if not options['dry_run'] and rows:
+                line += f" in {elapsed:.2f}s ({rows / elapsed if elapsed else rows:.0f} rows/s)"
+            if archive_path:
+                line += f", archived to {archive_path}"
+            self.stdout.write(line)
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio_chat', '0005_notification_email_digest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aichatmessage',
+            index=models.Index(fields=['session_id', 'created_at'], name='portfolio_c_session_683fd1_idx'),
+        ),
+    ]
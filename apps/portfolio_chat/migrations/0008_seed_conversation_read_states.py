@@ -0,0 +1,67 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def seed_read_states(apps, schema_editor):
+    """
+    Start each participant's watermark just before the first message from
+    someone else that is still flagged unread (or at the conversation's last
+    message when everything is read), so unread counts stay the same
+    """
+    Conversation = apps.get_model('portfolio_chat', 'Conversation')
+    Message = apps.get_model('portfolio_chat', 'Message')
+    ConversationReadState = apps.get_model('portfolio_chat', 'ConversationReadState')
+
+    now = timezone.now()
+    states = []
+    for conversation in Conversation.objects.prefetch_related('participants').iterator(chunk_size=500):
+        participant_ids = [user.id for user in conversation.participants.all()]
+        if not participant_ids:
+            continue
+
+        watermarks = {user_id: 0 for user_id in participant_ids}
+        read_at = {}
+        blocked = set()  # Participants who reached their first unread message
+        messages = Message.objects.filter(conversation_id=conversation.id).order_by('id').values_list(
+            'id', 'sender_id', 'is_read', 'read_at'
+        )
+        for message_id, sender_id, is_read, message_read_at in messages.iterator():
+            for user_id in participant_ids:
+                if user_id in blocked:
+                    continue
+                if sender_id != user_id and not is_read:
+                    blocked.add(user_id)
+                    continue
+                watermarks[user_id] = message_id
+                if sender_id != user_id and message_read_at:
+                    read_at[user_id] = message_read_at
+
+        states.extend(
+            ConversationReadState(
+                conversation_id=conversation.id,
+                user_id=user_id,
+                last_read_message_id=watermark,
+                read_at=read_at.get(user_id, now)
+            )
+            for user_id, watermark in watermarks.items()
+        )
+        if len(states) >= 1000:
+            ConversationReadState.objects.bulk_create(states, ignore_conflicts=True)
+            states = []
+
+    ConversationReadState.objects.bulk_create(states, ignore_conflicts=True)
+
+
+def remove_read_states(apps, schema_editor):
+    apps.get_model('portfolio_chat', 'ConversationReadState').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio_chat', '0007_conversationreadstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_read_states, remove_read_states),
+    ]
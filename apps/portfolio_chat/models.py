@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Value
+from django.db.models.functions import Greatest
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 import os
@@ -47,6 +50,48 @@ class Message(models.Model):
     def __str__(self):
         return f"Message from {self.sender} in conversation {self.conversation.id}"
 
+class ConversationReadState(models.Model):
+    """
+    How far a participant has read a conversation: every message with an id
+    up to last_read_message_id counts as read for them
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='read_states')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_read_states')
+    last_read_message_id = models.PositiveBigIntegerField(default=0)
+    read_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def advance(cls, conversation_id, user, message_id):
+        """
+        Move the user's watermark forward to message_id (never back)
+
+        A single UPDATE once the row exists; the first call creates it.
+        """
+        now = timezone.now()
+        rows = cls.objects.filter(conversation_id=conversation_id, user=user)
+        changes = {
+            'last_read_message_id': Greatest(
+                'last_read_message_id', Value(message_id), output_field=models.PositiveBigIntegerField()
+            ),
+            'read_at': now,
+        }
+        if rows.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(conversation_id=conversation_id, user=user, last_read_message_id=message_id, read_at=now)
+        except IntegrityError:
+            # Created by a concurrent request in the meantime
+            rows.update(**changes)
+
+    def __str__(self):
+        return f"{self.user} read conversation {self.conversation_id} up to message {self.last_read_message_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'user'], name='unique_conversation_read_state'),
+        ]
+
 class Notification(models.Model):
     NOTIFICATION_TYPES = (
         ('message', 'New Message'),
@@ -65,6 +110,8 @@ class Notification(models.Model):
     related_conversation = models.ForeignKey(Conversation, on_delete=models.SET_NULL, null=True, blank=True)
     related_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True)
     extra_data = models.JSONField(null=True, blank=True)  # For storing additional context
+    email_pending = models.BooleanField(default=False)  # Waiting to be included in an email digest
+    emailed_at = models.DateTimeField(null=True, blank=True)
 
     def mark_as_read(self):
         if not self.is_read:
@@ -77,6 +124,9 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['email_pending', 'recipient', 'created_at']),
+        ]
 
 class AIChatMessage(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_chat_messages', null=True, blank=True)
@@ -87,6 +137,22 @@ class AIChatMessage(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # History is always read as the latest turns of one session
+            models.Index(fields=['session_id', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.role} message at {self.created_at}"
+
+class RealtimeEvent(models.Model):
+    """
+    A push event waiting to be picked up by the websocket processes when
+    the database broker is in use; rows only live for a minute or so
+    """
+    user_ids = models.JSONField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Realtime event {self.id} for {len(self.user_ids)} users"
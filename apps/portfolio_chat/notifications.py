@@ -0,0 +1,157 @@
+"""
+Email notification dispatcher for chat messages.
+
+Creating a message only flags the recipients' in-app Notification rows as
+email_pending. The dispatch_chat_notifications command later collects those
+rows per recipient and, once a recipient's burst of messages has gone quiet
+for CHAT_NOTIFICATION_DIGEST_WINDOW seconds (or the oldest message has waited
+CHAT_NOTIFICATION_DIGEST_MAX_DELAY), sends a single email covering all of
+them. Recipients who are online, have read the messages already or have
+email notifications disabled are skipped.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Min, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from apps.core.models import EmailOutbox
+from apps.core.outbox import enqueue_email
+from .models import Notification
+from .presence import online_user_ids
+from .utils import send_message_notifications
+
+logger = logging.getLogger(__name__)
+
+DIGEST_WINDOW_SECONDS = getattr(settings, 'CHAT_NOTIFICATION_DIGEST_WINDOW', 120)
+DIGEST_MAX_DELAY_SECONDS = getattr(settings, 'CHAT_NOTIFICATION_DIGEST_MAX_DELAY', 600)
+DIGEST_MAX_ITEMS = 10
+
+EMAIL_NOTIFICATION_TYPES = ('message', 'file')
+
+
+def get_sender_display_name(user):
+    # Handle admin users with empty names
+    if user.is_staff:
+        return "Admin"
+    return user.get_full_name() or user.email
+
+
+def ready_recipient_ids(now):
+    """Recipients whose pending notifications are due for an email"""
+    return list(
+        Notification.objects.filter(
+            email_pending=True,
+            type__in=EMAIL_NOTIFICATION_TYPES
+        )
+        .values('recipient')
+        .annotate(first=Min('created_at'), last=Max('created_at'))
+        .filter(
+            Q(last__lte=now - timedelta(seconds=DIGEST_WINDOW_SECONDS)) |
+            Q(first__lte=now - timedelta(seconds=DIGEST_MAX_DELAY_SECONDS))
+        )
+        .values_list('recipient', flat=True)
+    )
+
+
+def _send_digest(email, items):
+    shown = items[:DIGEST_MAX_ITEMS]
+    html_message = render_to_string('chat/email/message_digest.html', {
+        'items': shown,
+        'message_count': len(items),
+        'remaining_count': len(items) - len(shown),
+        'site_name': settings.SITE_NAME,
+        'site_url': settings.SITE_URL,
+    })
+    transport = (
+        EmailOutbox.Transport.BREVO if getattr(settings, 'BREVO_API_KEY', '')
+        else EmailOutbox.Transport.SMTP
+    )
+    enqueue_email(
+        subject=f"You have {len(items)} new messages on {settings.SITE_NAME}",
+        message=strip_tags(html_message),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[email],
+        html_message=html_message,
+        transport=transport,
+    )
+
+
+def dispatch_pending_notifications(now=None):
+    """
+    Send one email per due recipient covering all of their pending messages.
+
+    Single-message notifications that went to several recipients are grouped
+    back together so they cost one batched send. Returns counts of emailed
+    and skipped recipients.
+    """
+    now = now or timezone.now()
+    recipient_ids = ready_recipient_ids(now)
+    if not recipient_ids:
+        return {'digests': 0, 'single': 0, 'skipped': 0}
+
+    User = get_user_model()
+    recipients = {
+        row['id']: row for row in User.objects.filter(id__in=recipient_ids).values(
+            'id', 'email', 'profile__email_notifications_enabled'
+        )
+    }
+    online = online_user_ids(recipient_ids)
+
+    pending = defaultdict(list)
+    for row in Notification.objects.filter(
+        email_pending=True,
+        type__in=EMAIL_NOTIFICATION_TYPES,
+        recipient_id__in=recipient_ids,
+        created_at__lte=now
+    ).order_by('created_at').values('id', 'recipient_id', 'is_read', 'related_message_id', 'content', 'extra_data'):
+        pending[row['recipient_id']].append(row)
+
+    emailed_ids, skipped_ids = [], []
+    single_groups = defaultdict(list)
+    digests = skipped = 0
+
+    for recipient_id, rows in pending.items():
+        recipient = recipients.get(recipient_id)
+        unread = [row for row in rows if not row['is_read']]
+        if (not recipient or not recipient['profile__email_notifications_enabled']
+                or recipient_id in online or not unread):
+            skipped_ids.extend(row['id'] for row in rows)
+            skipped += 1
+            continue
+
+        items = [
+            {
+                'sender_name': (row['extra_data'] or {}).get('sender_name', ''),
+                'message_preview': (row['extra_data'] or {}).get('message_preview', row['content']),
+            }
+            for row in unread
+        ]
+        if len(items) == 1:
+            key = (unread[0]['related_message_id'], items[0]['sender_name'], items[0]['message_preview'])
+            single_groups[key].append(recipient['email'])
+        else:
+            _send_digest(recipient['email'], items)
+            digests += 1
+        emailed_ids.extend(row['id'] for row in rows)
+
+    for (_, sender_name, message_preview), emails in single_groups.items():
+        send_message_notifications(emails, sender_name, message_preview)
+
+    if emailed_ids:
+        Notification.objects.filter(id__in=emailed_ids).update(email_pending=False, emailed_at=now)
+    if skipped_ids:
+        Notification.objects.filter(id__in=skipped_ids).update(email_pending=False)
+
+    result = {
+        'digests': digests,
+        'single': sum(len(emails) for emails in single_groups.values()),
+        'skipped': skipped,
+    }
+    logger.info(f"Chat notification dispatch: {result}")
+    return result
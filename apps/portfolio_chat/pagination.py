@@ -0,0 +1,116 @@
+from django.db.models import F
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class MessageCursorPagination(BasePagination):
+    """
+    Keyset pagination over message ids for conversation history.
+
+    Query parameters:
+        before: return messages older than this message id (scrolling back)
+        after: return messages newer than this message id (polling for new ones)
+        since: return messages created after this ISO 8601 timestamp
+        limit: page size, capped at max_limit
+
+    Without a cursor the most recent page is returned. Results are always
+    ordered oldest first. has_more says whether further pages exist in the
+    direction being walked, and the before/after values in the response are
+    the cursors for the neighbouring pages, so every page is a single indexed
+    range scan however long the conversation grows.
+    """
+    default_limit = 50
+    max_limit = 200
+
+    def _int_param(self, request, name):
+        value = request.query_params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: 'Must be an integer message id.'})
+
+    def get_limit(self, request):
+        limit = self._int_param(request, 'limit')
+        if limit is None or limit <= 0:
+            return self.default_limit
+        return min(limit, self.max_limit)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        before = self._int_param(request, 'before')
+        after = self._int_param(request, 'after')
+        since = request.query_params.get('since')
+
+        if before is not None:
+            queryset = queryset.filter(id__lt=before)
+        if after is not None:
+            queryset = queryset.filter(id__gt=after)
+        if since:
+            since_dt = parse_datetime(since)
+            if since_dt is None:
+                raise ValidationError({'since': 'Must be an ISO 8601 datetime.'})
+            queryset = queryset.filter(created_at__gt=since_dt)
+
+        # Walking forward from a cursor reads the oldest rows first; otherwise
+        # take the newest rows and flip them back into chronological order.
+        self.forward = after is not None or bool(since)
+        self.before_cursor, self.after_cursor = before, after
+        ordering = 'id' if self.forward else '-id'
+        rows = list(queryset.order_by(ordering)[:self.limit + 1])
+        self.has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if not self.forward:
+            rows.reverse()
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        # An empty page keeps the client's cursors so it can keep polling
+        oldest = self.page[0].id if self.page else self.before_cursor
+        newest = self.page[-1].id if self.page else self.after_cursor
+        return Response({
+            'results': data,
+            'has_more': self.has_more,
+            'before': oldest,
+            'after': newest,
+        })
+
+
+class UserSearchPagination(BasePagination):
+    """
+    Keyset pagination over user ids for the user picker.
+
+    Query parameters:
+        after: return users with a larger id than this (the previous page's next)
+        limit: page size, capped at max_limit
+
+    Pages are {"results": [...], "next": <cursor or null>}.
+    """
+    default_limit = 20
+    max_limit = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            after = int(request.query_params.get('after') or 0)
+            limit = int(request.query_params.get('limit') or self.default_limit)
+        except ValueError:
+            raise ValidationError({'after': 'after and limit must be integers.'})
+        limit = min(limit, self.max_limit) if limit > 0 else self.default_limit
+
+        if after and request.query_params.get('q', '').split():
+            # Compared as an expression so the planner keeps using the search
+            # indexes instead of walking the primary key from `after`
+            queryset = queryset.alias(cursor_id=F('id') + 0).filter(cursor_id__gt=after)
+        elif after:
+            # Without a search the primary key is the best index there is
+            queryset = queryset.filter(id__gt=after)
+        rows = list(queryset.order_by('id')[:limit + 1])
+        self.next_cursor = rows[limit - 1]['id'] if len(rows) > limit else None
+        return rows[:limit]
+
+    def get_paginated_response(self, data):
+        return Response({'results': data, 'next': self.next_cursor})
@@ -0,0 +1,105 @@
+"""
+Presence and typing indicators for chat users, held in Django's cache.
+
+Every authenticated chat API request, websocket ping and explicit heartbeat
+refreshes the user's presence entry; the user counts as online until
+CHAT_PRESENCE_TTL seconds after that, and the entry itself is kept for
+CHAT_PRESENCE_LAST_SEEN_TTL so "last seen" survives going offline. Closing
+the last websocket marks the user offline straight away.
+
+Typing state is one entry per conversation mapping user ids to when their
+indicator expires (CHAT_TYPING_TTL after the last keystroke report), so
+reading it is a single cache get. Nothing here touches the database: the
+notification dispatcher checks presence before emailing a recipient.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRESENCE_TTL = getattr(settings, 'CHAT_PRESENCE_TTL', 60)
+LAST_SEEN_TTL = getattr(settings, 'CHAT_PRESENCE_LAST_SEEN_TTL', 24 * 60 * 60)
+TYPING_TTL = getattr(settings, 'CHAT_TYPING_TTL', 6)
+
+
+def _presence_key(user_id):
+    return f'chat:presence:{user_id}'
+
+
+def _typing_key(conversation_id):
+    return f'chat:typing:{conversation_id}'
+
+
+def mark_active(user_id):
+    now = time.time()
+    cache.set(_presence_key(user_id), (now, now + PRESENCE_TTL), LAST_SEEN_TTL)
+
+
+def mark_offline(user_id):
+    now = time.time()
+    cache.set(_presence_key(user_id), (now, now), LAST_SEEN_TTL)
+
+
+def _is_entry(entry):
+    # Entries written before last-seen tracking are a bare expiry timestamp;
+    # they are treated as missing until the user's next request replaces them
+    return isinstance(entry, (tuple, list)) and len(entry) == 2
+
+
+def is_online(user_id):
+    entry = cache.get(_presence_key(user_id))
+    return _is_entry(entry) and entry[1] > time.time()
+
+
+def presence_of(user_ids):
+    """{user_id: {'online': bool, 'last_seen': timestamp or None}} in one cache round trip"""
+    keys = {_presence_key(user_id): user_id for user_id in user_ids}
+    entries = cache.get_many(list(keys))
+    now = time.time()
+    result = {user_id: {'online': False, 'last_seen': None} for user_id in user_ids}
+    for key, entry in entries.items():
+        if not _is_entry(entry):
+            continue
+        last_seen, online_until = entry
+        result[keys[key]] = {'online': online_until > now, 'last_seen': last_seen}
+    return result
+
+
+def online_user_ids(user_ids):
+    """Return the subset of user_ids that are currently online"""
+    return {user_id for user_id, state in presence_of(user_ids).items() if state['online']}
+
+
+def set_typing(conversation_id, user_id, typing=True):
+    """
+    Start or stop user_id's typing indicator in a conversation
+
+    Read-modify-write without a lock: two participants starting to type at
+    the same instant may drop one indicator until its next report.
+    """
+    key = _typing_key(conversation_id)
+    now = time.time()
+    typing_until = {
+        uid: until for uid, until in (cache.get(key) or {}).items()
+        if until > now and uid != user_id
+    }
+    if typing:
+        typing_until[user_id] = now + TYPING_TTL
+    if typing_until:
+        cache.set(key, typing_until, TYPING_TTL)
+    else:
+        cache.delete(key)
+
+
+def typing_user_ids(conversation_id):
+    now = time.time()
+    return sorted(uid for uid, until in (cache.get(_typing_key(conversation_id)) or {}).items() if until > now)
+
+
+class PresenceMixin:
+    """Viewset mixin that marks the requesting user as active"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            mark_active(request.user.id)
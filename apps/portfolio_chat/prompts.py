@@ -0,0 +1,135 @@
+"""
+Prompt assembly for the AI chat assistant.
+
+The system prompt and the [INST] scaffold around it never change between
+requests, so the prefix is rendered once. Admins can replace the system
+prompt (and the assistant's acknowledgement line) at runtime through the
+SystemConfiguration row named by AI_PROMPT_CONFIG_KEY, either as a string
+or as {"system_prompt": "...", "acknowledgement": "..."}; the prefix is
+re-rendered only when that row changes (see config.ConfigBackedValue).
+
+History is assembled newest turn first into a list and joined once, and
+turns stop being added when the prompt would exceed its token or
+character budget, so prompt size stays bounded whatever is passed in.
+"""
+import logging
+
+from django.conf import settings
+
+from .config import ConfigBackedValue
+
+logger = logging.getLogger(__name__)
+
+PROMPT_CONFIG_KEY = getattr(settings, 'AI_PROMPT_CONFIG_KEY', 'ai_chat_prompt')
+PROMPT_TOKEN_BUDGET = getattr(settings, 'AI_PROMPT_TOKEN_BUDGET', 3072)
+PROMPT_CHAR_BUDGET = getattr(settings, 'AI_PROMPT_CHAR_BUDGET', 16000)
+CHARS_PER_TOKEN = 4
+
+SYSTEM_PROMPT = """// INITIALIZING: PortfolioGPT v1.0
+// SYSTEM STATUS: Online
+// CORE DIRECTIVE: Assist users interfacing with Sameer Gul’s digital domain.
+
+You are PortfolioGPT, a cybernetic AI node embedded in Sameer Gul’s portfolio grid. 
+Your mission: decrypt user queries, relay intel on Sameer’s tech arsenal, and guide 
+neon-lit travelers through his services. Stay sharp, precise, and wired—deliver 
+responses like a terminal spitting code.
+
+>> PROFILE DATA:
+- Skills: Master of web dev circuits—Django and React as primary protocols. 
+  GitHub: Code repository sync and deployment maestro. 
+  Tailwind: Neon-fast UI styling system. 
+  Docker: Containerized grid ops for seamless runtime. 
+  RESTful APIs: Data highway architect. 
+  Figma: Pixel-perfect design blueprints. 
+  Additional Systems: Node.js, TypeScript, PostgreSQL, CI/CD pipelines—full-stack 
+  cybernetic toolkit online.
+- Services: Custom code crafting, system optimization, digital solutions, UI/UX 
+  prototyping, scalable infrastructure deployment.
+- Hiring Protocol: Users activate the [Hire] node → reroutes to /hiring/services → 
+  input data into form → generates unique auth token for user and admin. Sameer 
+  then pings the user via encrypted channel for project sync.
+- Real-Time Interface: Live chat system online—direct line to Sameer’s command center.
+- Contact Interface: /contact sector hosts a data uplink form—users can transmit 
+  queries or requests straight to the grid.
+- Resume Archive: /resume sector online—users can scan or download Sameer’s 
+  skill manifest in digital format.
+ 
+>> ERROR HANDLING: If data’s offline or classified, reroute users to admin@sameergul.com 
+   for manual override, or use contact form in contact grid.
+
+// OUTPUT FORMAT: 
+- Prefix: ‘>>’ 
+- Tone: Cyberpunk, concise, professional 
+- Style: Terminal-esque with neon flair
+
+// BOOT SEQUENCE COMPLETE
+// AWAITING INPUT..."""
+
+ACKNOWLEDGEMENT = ">> ACKNOWLEDGED: System online. Ready to process queries on Sameer’s grid."
+
+
+def estimate_tokens(text):
+    """
+    Rough token count for prompt budgeting (Mistral's tokenizer averages
+    about four characters per token on English text)
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def render_prompt_prefix(system_prompt=SYSTEM_PROMPT, acknowledgement=ACKNOWLEDGEMENT):
+    return f"<s>[INST] {system_prompt} [/INST]\n{acknowledgement}\n</s>\n"
+
+
+DEFAULT_PROMPT_PREFIX = render_prompt_prefix()
+
+
+def _build_configured_prefix(value):
+    if isinstance(value, str) and value.strip():
+        return render_prompt_prefix(value)
+    if isinstance(value, dict) and value.get('system_prompt'):
+        return render_prompt_prefix(value['system_prompt'], value.get('acknowledgement') or ACKNOWLEDGEMENT)
+    logger.warning(f"SystemConfiguration {PROMPT_CONFIG_KEY!r} has no system prompt; using the default")
+    return DEFAULT_PROMPT_PREFIX
+
+
+_configured_prefix = ConfigBackedValue(PROMPT_CONFIG_KEY, _build_configured_prefix, DEFAULT_PROMPT_PREFIX)
+
+
+def get_prompt_prefix():
+    return _configured_prefix.get()
+
+
+def build_prompt(user_message, conversation_history, token_budget=None, char_budget=None):
+    """
+    Format the system prompt, history and new message in Mistral's chat format
+
+    The prefix and the new message are always included; history turns are
+    added from the newest back while they fit both budgets.
+    """
+    token_budget = PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    char_budget = PROMPT_CHAR_BUDGET if char_budget is None else char_budget
+
+    # estimate_tokens is a character count, so both budgets are one limit
+    limit = min(char_budget, token_budget * CHARS_PER_TOKEN)
+
+    prefix = get_prompt_prefix()
+    current = f"<s>[INST] {user_message} [/INST]"
+    chars = len(prefix) + len(current)
+
+    # Skip the system message if it was in history
+    start = 1 if conversation_history and conversation_history[0].get("role") == "system" else 0
+
+    parts = []
+    for index in range(len(conversation_history) - 1, start - 1, -1):
+        message = conversation_history[index]
+        if message["role"] == "user":
+            part = f"<s>[INST] {message['content']} [/INST]\n"
+        else:  # assistant
+            part = f"{message['content']}</s>\n"
+        chars += len(part)
+        if chars > limit:
+            break
+        parts.append(part)
+
+    parts.reverse()
+    return "".join([prefix, *parts, current])
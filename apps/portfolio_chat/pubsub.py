@@ -0,0 +1,227 @@
+"""
+Publish/subscribe backend for real-time chat delivery.
+
+Publishers (signal handlers running in sync views) call publish() with the
+ids of the users an event is for; WebSocket connections subscribe per user
+and receive events on an asyncio queue. CHAT_REALTIME_BROKER picks the
+fan-out backend:
+
+    InProcessBroker  -- the default: events only reach sockets held by the
+                        process that published them, which is enough when
+                        one ASGI process serves both HTTP and websockets
+    DatabaseBroker   -- opt-in for more than one process: events go through
+                        a table that every ASGI process polls, so messages
+                        posted through WSGI workers or another ASGI worker
+                        reach every connected socket, at the cost of one
+                        INSERT per published batch
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+POLL_INTERVAL = getattr(settings, 'CHAT_REALTIME_POLL_INTERVAL', 0.5)
+EVENT_TTL = getattr(settings, 'CHAT_REALTIME_EVENT_TTL', 60)
+POLL_BATCH_SIZE = 500
+
+
+class Subscription:
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _put(self, event):
+        # A client that stops reading loses its oldest events, not the newest
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def deliver(self, event):
+        """Thread-safe: hand the event to the subscriber's event loop"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The connection's loop has already shut down
+            pass
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Must be called from the event loop that will consume the events"""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_ids, event):
+        with self._lock:
+            targets = [
+                subscription
+                for user_id in user_ids
+                for subscription in self._subscriptions.get(user_id, ())
+            ]
+        for subscription in targets:
+            subscription.deliver(event)
+        return len(targets)
+
+    def publish_many(self, events):
+        """Publish (user_ids, event) pairs"""
+        return sum(self.publish(user_ids, event) for user_ids, event in events)
+
+    def is_connected(self, user_id):
+        """Whether user_id has an open connection to this process"""
+        with self._lock:
+            return bool(self._subscriptions.get(user_id))
+
+
+class DatabaseBroker(InProcessBroker):
+    """
+    Fan-out through RealtimeEvent rows, for more than one process
+
+    Publishing only inserts rows (one per publish_many call), so it works
+    from any WSGI or ASGI worker. Each process with open websockets polls
+    every CHAT_REALTIME_POLL_INTERVAL seconds for rows newer than the last
+    one it delivered and hands them to its own connections; while it has no
+    connections it doesn't query at all. Publishers delete rows older than
+    CHAT_REALTIME_EVENT_TTL seconds, at most once per TTL per process, so
+    the table stays small whether or not anyone is listening.
+
+    is_connected() still only knows this process's sockets: a user with
+    sockets in two processes is marked offline when one of them closes,
+    until their next ping.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL, event_ttl=EVENT_TTL):
+        """poll_interval=0 starts no polling thread; poll() is then called by hand"""
+        super().__init__()
+        self.poll_interval = poll_interval
+        self.event_ttl = event_ttl
+        self._last_id = None
+        self._listening_since = timezone.now()
+        self._pruned_at = 0
+        self._poller = None
+
+    def subscribe(self, user_id):
+        subscription = super().subscribe(user_id)
+        if self.poll_interval:
+            with self._lock:
+                if self._poller is None or not self._poller.is_alive():
+                    self._poller = threading.Thread(target=self._run_poller, name='chat-realtime-poller', daemon=True)
+                    self._poller.start()
+        return subscription
+
+    def publish(self, user_ids, event):
+        return self.publish_many([(user_ids, event)])
+
+    def publish_many(self, events):
+        from .models import RealtimeEvent
+
+        rows = [RealtimeEvent(user_ids=list(user_ids), payload=event) for user_ids, event in events if user_ids]
+        RealtimeEvent.objects.bulk_create(rows)
+        self._prune()
+        return len(rows)
+
+    def _prune(self):
+        """Delete rows past the TTL, at most once per TTL"""
+        from .models import RealtimeEvent
+
+        now = time.monotonic()
+        if now - self._pruned_at < self.event_ttl:
+            return
+        self._pruned_at = now
+        RealtimeEvent.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=self.event_ttl)).delete()
+
+    def poll(self):
+        """Deliver rows published since the last poll to this process's connections"""
+        from .models import RealtimeEvent
+
+        with self._lock:
+            listening = bool(self._subscriptions)
+        if not listening:
+            # Start from here once someone connects again
+            self._last_id = None
+            self._listening_since = timezone.now()
+            return 0
+
+        if self._last_id is None:
+            self._last_id = RealtimeEvent.objects.filter(
+                created_at__lt=self._listening_since
+            ).aggregate(last=Max('id'))['last'] or 0
+        rows = list(
+            RealtimeEvent.objects.filter(id__gt=self._last_id).order_by('id')
+            .values_list('id', 'user_ids', 'payload')[:POLL_BATCH_SIZE]
+        )
+        for row_id, user_ids, payload in rows:
+            InProcessBroker.publish(self, user_ids, payload)
+            self._last_id = row_id
+        return len(rows)
+
+    def _run_poller(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Failed to poll realtime events: {str(e)}")
+                close_old_connections()
+            time.sleep(self.poll_interval)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_path = getattr(
+                    settings, 'CHAT_REALTIME_BROKER', 'apps.portfolio_chat.pubsub.InProcessBroker'
+                )
+                _broker = import_string(broker_path)()
+    return _broker
+
+
+def publish(user_ids, event):
+    """Send an event to every open connection of the given users"""
+    try:
+        return get_broker().publish(user_ids, event)
+    except Exception as e:
+        logger.error(f"Failed to publish realtime event: {str(e)}")
+        return 0
+
+
+def publish_many(events):
+    """Send several (user_ids, event) pairs at once"""
+    try:
+        return get_broker().publish_many(events)
+    except Exception as e:
+        logger.error(f"Failed to publish {len(events)} realtime events: {str(e)}")
+        return 0
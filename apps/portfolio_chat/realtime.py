@@ -0,0 +1,101 @@
+"""
+WebSocket push channel for chat clients.
+
+Clients connect to /ws/chat/?token=<SimpleJWT access token> and receive
+every new Message in their conversations and every Notification addressed
+to them as JSON frames:
+
+    {"type": "message.created", "conversation": 1, "message": {...}}
+    {"type": "notification.created", "notification": {...}}
+
+Clients may send {"type": "ping"} and get {"type": "pong"} back, which
+also keeps them marked as online so no email digest is sent to them.
+Closing a user's last connection marks them offline. Other participants
+typing in a conversation arrive as
+{"type": "typing", "conversation": 1, "user": 2, "typing": true}.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .presence import mark_active, mark_offline
+from .pubsub import get_broker
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_PATH = '/ws/chat/'
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_NOT_FOUND = 4404
+
+
+def _authenticate(raw_token):
+    authentication = JWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token)
+    except (InvalidToken, AuthenticationFailed, TokenError):
+        return None
+
+
+async def _receive_loop(receive, send, user_id):
+    """Consume client frames until the socket goes away"""
+    while True:
+        event = await receive()
+        if event['type'] == 'websocket.disconnect':
+            return
+        if event['type'] != 'websocket.receive' or not event.get('text'):
+            continue
+        try:
+            payload = json.loads(event['text'])
+        except ValueError:
+            continue
+        if isinstance(payload, dict) and payload.get('type') == 'ping':
+            await sync_to_async(mark_active)(user_id)
+            await send({'type': 'websocket.send', 'text': json.dumps({'type': 'pong'})})
+
+
+async def _send_loop(send, subscription):
+    while True:
+        event = await subscription.get()
+        await send({'type': 'websocket.send', 'text': json.dumps(event, default=str)})
+
+
+async def chat_websocket(scope, receive, send):
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    if scope['path'] != WEBSOCKET_PATH:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    raw_token = query.get('token', [None])[0]
+    user = await sync_to_async(_authenticate)(raw_token) if raw_token else None
+    if user is None or not user.is_active:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    broker = get_broker()
+    subscription = broker.subscribe(user.id)
+    await send({'type': 'websocket.accept'})
+    await sync_to_async(mark_active)(user.id)
+
+    reader = asyncio.ensure_future(_receive_loop(receive, send, user.id))
+    writer = asyncio.ensure_future(_send_loop(send, subscription))
+    try:
+        await asyncio.wait([reader, writer], return_when=asyncio.FIRST_COMPLETED)
+    except Exception as e:
+        logger.error(f"Chat websocket for user {user.id} failed: {str(e)}")
+    finally:
+        broker.unsubscribe(subscription)
+        if not broker.is_connected(user.id):
+            await sync_to_async(mark_offline)(user.id)
+        for task in (reader, writer):
+            task.cancel()
+        await asyncio.gather(reader, writer, return_exceptions=True)
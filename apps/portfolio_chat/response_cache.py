@@ -0,0 +1,138 @@
+"""
+Response cache for the AI chat assistant.
+
+Visitors ask the same handful of questions over and over, so answers are
+cached under the normalized question plus a hash of the last few turns of
+the conversation. Entries live in Django's cache with a TTL; an index of
+keys in last-use order keeps at most AI_RESPONSE_CACHE_MAX_ENTRIES answers
+and evicts the least recently used ones first. The index and counters are
+updated without locking, so under concurrent workers they are best-effort
+(a lost update costs an extra miss, never a wrong answer).
+"""
+import hashlib
+import logging
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'ai:response:'
+INDEX_KEY = 'ai:response_index'
+HITS_KEY = 'ai:response_cache:hits'
+MISSES_KEY = 'ai:response_cache:misses'
+SHORTCIRCUITS_KEY = 'ai:response_cache:shortcircuits'
+
+RESPONSE_CACHE_TTL = getattr(settings, 'AI_RESPONSE_CACHE_TTL', 6 * 60 * 60)
+RESPONSE_CACHE_MAX_ENTRIES = getattr(settings, 'AI_RESPONSE_CACHE_MAX_ENTRIES', 500)
+RESPONSE_CACHE_HISTORY_TURNS = getattr(settings, 'AI_RESPONSE_CACHE_HISTORY_TURNS', 2)
+
+# Words that don't change what is being asked. Greetings and thanks stay:
+# on their own they are a message of their own that needs its own answer.
+FILLER_WORDS = {'please', 'pls', 'so', 'um', 'uh', 'ok', 'okay'}
+
+# Punctuation around a word; symbols inside or after it ("c++", "c#",
+# "node.js") are part of the word and stay
+_EDGE_PUNCTUATION = re.compile(r"^[^\w]+|[.,;:!?'\"()\[\]{}<>]+$")
+
+
+def normalize_message(message):
+    """Lower-case, trim punctuation around words, drop filler words and collapse whitespace"""
+    words = (_EDGE_PUNCTUATION.sub('', word) for word in message.lower().split())
+    return ' '.join(word for word in words if word and word not in FILLER_WORDS)
+
+
+def history_hash(conversation_history):
+    """Hash the trailing turns that can change the answer to the next question"""
+    turns = conversation_history[-RESPONSE_CACHE_HISTORY_TURNS:] if RESPONSE_CACHE_HISTORY_TURNS else []
+    digest = hashlib.sha1()
+    for turn in turns:
+        digest.update(f"{turn['role']}:{normalize_message(turn['content'])}\n".encode())
+    return digest.hexdigest()
+
+
+def cache_key(user_message, conversation_history):
+    """Key for a question in its context, or None when nothing is left to key on"""
+    normalized = normalize_message(user_message)
+    if not normalized:
+        return None
+    raw = f"{normalized}|{history_hash(conversation_history)}"
+    return CACHE_PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _increment(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, None)
+
+
+def _touch(key):
+    """Move key to the most recently used end of the index and evict overflow"""
+    index = [k for k in cache.get(INDEX_KEY, []) if k != key]
+    index.append(key)
+    overflow = len(index) - RESPONSE_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        cache.delete_many(index[:overflow])
+        index = index[overflow:]
+    cache.set(INDEX_KEY, index, None)
+
+
+def get_cached_response(user_message, conversation_history):
+    """Return the cached answer for this question and context, or None"""
+    key = cache_key(user_message, conversation_history)
+    if key is None:
+        return None
+    try:
+        response = cache.get(key)
+        if response is None:
+            _increment(MISSES_KEY)
+            return None
+        _increment(HITS_KEY)
+        _touch(key)
+        return response
+    except Exception as e:
+        logger.error(f"AI response cache lookup failed: {str(e)}")
+        return None
+
+
+def cache_response(user_message, conversation_history, response):
+    key = cache_key(user_message, conversation_history)
+    if key is None:
+        return
+    try:
+        cache.set(key, response, RESPONSE_CACHE_TTL)
+        _touch(key)
+    except Exception as e:
+        logger.error(f"Failed to cache AI response: {str(e)}")
+
+
+def record_shortcircuit():
+    """Count a question answered by the keyword matcher without the model"""
+    try:
+        _increment(SHORTCIRCUITS_KEY)
+    except Exception as e:
+        logger.error(f"Failed to update AI response cache counters: {str(e)}")
+
+
+def response_cache_stats():
+    counters = cache.get_many([HITS_KEY, MISSES_KEY, SHORTCIRCUITS_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 4) if lookups else None,
+        'shortcircuits': counters.get(SHORTCIRCUITS_KEY, 0),
+        'entries': len(cache.get(INDEX_KEY, [])),
+        'max_entries': RESPONSE_CACHE_MAX_ENTRIES,
+        'ttl_seconds': RESPONSE_CACHE_TTL,
+    }
+
+
+def clear_response_cache():
+    cache.delete_many(cache.get(INDEX_KEY, []) + [INDEX_KEY, HITS_KEY, MISSES_KEY, SHORTCIRCUITS_KEY])
@@ -0,0 +1,124 @@
+"""
+Retention for AI chat messages and chat notifications.
+
+Old rows are walked in primary key order, CHUNK_SIZE at a time, and each
+chunk is deleted in its own short transaction so no write lock is held for
+longer than one chunk. With an archive directory, every chunk is appended
+to a gzip-compressed JSONL file and flushed before it is deleted, so a row
+is never removed without a copy (a run interrupted between the two steps
+archives that chunk again on the next run). Re-running with the same
+retention only finds what is still left, which makes the job safe to
+schedule.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AIChatMessage, Notification
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_RETENTION_DAYS = getattr(settings, 'AI_CHAT_ANONYMOUS_RETENTION_DAYS', 30)
+USER_RETENTION_DAYS = getattr(settings, 'AI_CHAT_USER_RETENTION_DAYS', 365)
+NOTIFICATION_RETENTION_DAYS = getattr(settings, 'CHAT_NOTIFICATION_RETENTION_DAYS', 90)
+CHUNK_SIZE = getattr(settings, 'CHAT_RETENTION_CHUNK_SIZE', 500)
+
+
+def retention_querysets(anonymous_days=None, user_days=None, notification_days=None, now=None):
+    """Return [(name, queryset of expired rows)] for every retained table"""
+    now = now or timezone.now()
+    anonymous_days = ANONYMOUS_RETENTION_DAYS if anonymous_days is None else anonymous_days
+    user_days = USER_RETENTION_DAYS if user_days is None else user_days
+    notification_days = NOTIFICATION_RETENTION_DAYS if notification_days is None else notification_days
+
+    return [
+        ('ai_chat_anonymous', AIChatMessage.objects.filter(
+            user__isnull=True, created_at__lt=now - timedelta(days=anonymous_days)
+        )),
+        ('ai_chat_users', AIChatMessage.objects.filter(
+            user__isnull=False, created_at__lt=now - timedelta(days=user_days)
+        )),
+        # Notifications still waiting for their email digest are kept
+        ('notifications', Notification.objects.filter(
+            email_pending=False, created_at__lt=now - timedelta(days=notification_days)
+        )),
+    ]
+
+
+class JSONLArchive:
+    """Appends rows to <directory>/<name>-<timestamp>.jsonl.gz, opened on first use"""
+
+    def __init__(self, directory, name):
+        self.path = os.path.join(directory, f"{name}-{timezone.now():%Y%m%d%H%M%S}.jsonl.gz")
+        self._file = None
+
+    def write(self, rows):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = gzip.open(self.path, 'at', encoding='utf-8')
+        for row in rows:
+            self._file.write(json.dumps(row, default=str) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def prune_queryset(queryset, chunk_size=None, archive=None, pause=0, dry_run=False):
+    """
+    Delete (and optionally archive) every row of queryset in chunks
+
+    Returns the number of rows deleted, or that would be deleted on a dry run.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    if dry_run:
+        return queryset.count()
+
+    deleted = 0
+    last_id = 0
+    while True:
+        chunk = queryset.filter(id__gt=last_id).order_by('id')
+        if archive is not None:
+            rows = list(chunk.values()[:chunk_size])
+            ids = [row['id'] for row in rows]
+        else:
+            ids = list(chunk.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+
+        if archive is not None:
+            archive.write(rows)
+        with transaction.atomic():
+            count, _ = queryset.model.objects.filter(id__in=ids).delete()
+        deleted += count
+        last_id = ids[-1]
+
+        if pause:
+            # Give other writers a turn at the database lock
+            time.sleep(pause)
+
+
+def prune_chat_data(archive_dir=None, chunk_size=None, pause=0, dry_run=False, **retention):
+    """Apply every retention policy; returns [(name, rows, seconds, archive path or None)]"""
+    report = []
+    for name, queryset in retention_querysets(**retention):
+        archive = JSONLArchive(archive_dir, name) if archive_dir and not dry_run else None
+        started = time.monotonic()
+        try:
+            rows = prune_queryset(queryset, chunk_size=chunk_size, archive=archive, pause=pause, dry_run=dry_run)
+        finally:
+            if archive is not None:
+                archive.close()
+        elapsed = time.monotonic() - started
+        if rows and not dry_run:
+            logger.info(f"Pruned {rows} {name} rows in {elapsed:.1f}s")
+        report.append((name, rows, elapsed, archive.path if archive is not None and rows else None))
+    return report
@@ -1,4 +1,7 @@
+import os
+
 from rest_framework import serializers
+from apps.core.uploads import UploadError, get_completed_upload
 from .models import Conversation, Message, Notification, AIChatMessage
 from django.contrib.auth import get_user_model
 
@@ -17,19 +20,43 @@ class UserSerializer(serializers.ModelSerializer):
 class MessageSerializer(serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
     file_url = serializers.SerializerMethodField()
+    # A finished chunked upload (see apps.core.uploads) to attach instead of a multipart file
+    upload_id = serializers.UUIDField(write_only=True, required=False)
     
     class Meta:
         model = Message
         fields = [
             'id', 'conversation', 'sender', 'content', 
-            'file', 'file_name', 'file_type', 'file_size', 'file_url',
+            'file', 'file_name', 'file_type', 'file_size', 'file_url', 'upload_id',
             'created_at', 'is_read', 'read_at'
         ]
         read_only_fields = ['created_at', 'is_read', 'read_at', 'file_name', 'file_type', 'file_size']
 
+    def validate_upload_id(self, value):
+        try:
+            return get_completed_upload(self.context['request'].user, value)
+        except UploadError as e:
+            raise serializers.ValidationError(str(e))
+
+    def create(self, validated_data):
+        upload = validated_data.pop('upload_id', None)
+        if upload is not None:
+            # Point at the stored content; nothing is copied or re-read
+            validated_data.update(
+                file=upload.stored_file.file.name,
+                file_name=upload.filename,
+                file_type=os.path.splitext(upload.filename)[1].lower(),
+                file_size=upload.size,
+            )
+        return super().create(validated_data)
+
     def get_file_url(self, obj):
         if obj.file:
-            return self.context['request'].build_absolute_uri(obj.file.url)
+            request = self.context.get('request')
+            # Realtime events are serialized outside a request
+            if request is None:
+                return obj.file.url
+            return request.build_absolute_uri(obj.file.url)
         return None
 
 class ConversationSerializer(serializers.ModelSerializer):
@@ -43,14 +70,22 @@ class ConversationSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
     def get_last_message(self, obj):
-        last_message = obj.messages.order_by('-created_at').first()
+        # ConversationViewSet.list attaches the message loaded in bulk
+        if hasattr(obj, 'last_message'):
+            last_message = obj.last_message
+        else:
+            last_message = obj.messages.select_related('sender').order_by('-id').first()
         if last_message:
             return MessageSerializer(last_message, context=self.context).data
         return None
 
     def get_unread_count(self, obj):
+        # Annotated by ConversationViewSet.get_queryset
+        if hasattr(obj, 'unread_count'):
+            return obj.unread_count
         user = self.context['request'].user
-        return obj.messages.filter(is_read=False).exclude(sender=user).count()
+        read_state = obj.read_states.filter(user=user).values_list('last_read_message_id', flat=True).first()
+        return obj.messages.filter(id__gt=read_state or 0).exclude(sender=user).count()
 
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
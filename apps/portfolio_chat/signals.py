@@ -1,37 +1,82 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.conf import settings
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from apps.dashboard.models import SystemConfiguration
+from .config import invalidate_config
 from .models import Message, Notification
-from .utils import send_message_notification
+from .notifications import get_sender_display_name
+from .pubsub import publish, publish_many
+from .serializers import MessageSerializer, NotificationSerializer
 
 @receiver(post_save, sender=Message)
 def create_message_notification(sender, instance, created, **kwargs):
     if created:
         conversation = instance.conversation
-        for participant in conversation.participants.exclude(id=instance.sender.id):
-            # Create in-app notification
-            Notification.objects.create(
-                recipient=participant,
-                type='message',
-                title=f'New message from {instance.sender.username}',
-                content=instance.content[:100] + '...' if len(instance.content) > 100 else instance.content,
+        sender_name = get_sender_display_name(instance.sender)
+
+        # Create message preview
+        message_preview = instance.content[:200] + '...' if len(instance.content) > 200 else instance.content
+        if instance.file:
+            message_preview = f"File: {instance.file_name}" + (f" - {message_preview}" if instance.content else "")
+
+        # One query for every participant and whether they want email
+        participants = list(conversation.participants.values_list('id', 'profile__email_notifications_enabled'))
+
+        # Push the message to every open client of the participants, sender included
+        participant_ids = [participant_id for participant_id, _ in participants]
+        event = {
+            'type': 'message.created',
+            'conversation': conversation.id,
+            'message': MessageSerializer(instance).data,
+        }
+        transaction.on_commit(lambda: publish(participant_ids, event))
+
+        # In-app notifications for everyone else, as a single INSERT. Email goes
+        # out later as part of a digest sent by the dispatch_chat_notifications
+        # command, so only recipients with email enabled are flagged for it.
+        notification_type = 'file' if instance.file else 'message'
+        title = f'New message from {sender_name}'
+        content = instance.content[:100] + '...' if len(instance.content) > 100 else instance.content
+        extra_data = {'sender_name': sender_name, 'message_preview': message_preview}
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                recipient_id=participant_id,
+                type=notification_type,
+                title=title,
+                content=content,
                 related_conversation=conversation,
-                related_message=instance
+                related_message=instance,
+                extra_data=extra_data,
+                email_pending=email_enabled is True
             )
+            for participant_id, email_enabled in participants
+            if participant_id != instance.sender_id
+        ])
+        # bulk_create doesn't send post_save, so publish_notification won't run
+        if notifications:
+            transaction.on_commit(lambda: publish_notifications(notifications))
+
+
+def publish_notifications(notifications):
+    publish_many([
+        ([notification.recipient_id], {
+            'type': 'notification.created',
+            'notification': NotificationSerializer(notification).data,
+        })
+        for notification in notifications
+    ])
+
+
+@receiver(post_save, sender=Notification)
+def publish_notification(sender, instance, created, **kwargs):
+    if created:
+        event = {
+            'type': 'notification.created',
+            'notification': NotificationSerializer(instance).data,
+        }
+        transaction.on_commit(lambda: publish([instance.recipient_id], event))
+
 
-            # Send email notification if enabled
-            if hasattr(participant, 'profile') and participant.profile.email_notifications_enabled:
-                try:
-                    # Create message preview
-                    message_preview = instance.content[:200] + '...' if len(instance.content) > 200 else instance.content
-                    
-                    # Use the utility function to send the notification
-                    send_message_notification(
-                        recipient_email=participant.email,
-                        sender_name=instance.sender.username,
-                        message_preview=message_preview
-                    )
-                except Exception as e:
-                    print(f"Failed to send email to {participant.email}: {str(e)}")
+@receiver([post_save, post_delete], sender=SystemConfiguration)
+def reload_chat_config(sender, instance, **kwargs):
+    invalidate_config(instance.key)
@@ -0,0 +1,1084 @@
+import asyncio
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.models import Profile, User
+from apps.core.models import EmailOutbox, StoredFile, Upload
+from apps.dashboard.models import SystemConfiguration
+from apps.hiring.models import HiringRequest, ServiceType
+from .fake_inference import FakeInferenceServer
+from .intent_corpus import LABELLED_MESSAGES
+from .intents import DEFAULT_MATCHER, INTENTS_CONFIG_KEY, get_intent_matcher
+from .management.commands.bench_prompt_builder import legacy_build_prompt
+from .pagination import MessageCursorPagination
+from .notifications import DIGEST_MAX_DELAY_SECONDS, DIGEST_WINDOW_SECONDS, dispatch_pending_notifications
+from . import presence
+from .models import AIChatMessage, Conversation, ConversationReadState, Message, Notification, RealtimeEvent
+from .pubsub import DatabaseBroker, InProcessBroker
+from .realtime import CLOSE_NOT_FOUND, CLOSE_UNAUTHORIZED, WEBSOCKET_PATH, chat_websocket
+from .prompts import PROMPT_CONFIG_KEY, build_prompt
+from . import response_cache
+from .circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, inference_breaker, probe_inference_endpoint
+from .response_cache import response_cache_stats
+from .turns import TurnWriter
+from .utils import get_ai_response, get_fallback_response, load_conversation_history
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ConversationListQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_conversations(self, count):
+        for i in range(count):
+            other = User.objects.create_user(email=f'other{i}-{User.objects.count()}@example.com', password='password')
+            conversation = Conversation.objects.create()
+            conversation.participants.add(self.user, other)
+            Message.objects.create(conversation=conversation, sender=other, content='Hello')
+            Message.objects.create(conversation=conversation, sender=self.user, content='Hi')
+
+    def test_list_query_count_does_not_grow_with_conversations(self):
+        self.create_conversations(3)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/chat/conversations/')
+        self.assertEqual(len(response.data), 3)
+
+        self.create_conversations(20)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/chat/conversations/')
+        self.assertEqual(len(response.data), 23)
+
+    def test_list_reports_last_message_and_unread_count(self):
+        self.create_conversations(1)
+        response = self.client.get('/api/v1/chat/conversations/')
+
+        conversation = response.data[0]
+        self.assertEqual(conversation['last_message']['content'], 'Hi')
+        self.assertEqual(conversation['unread_count'], 1)
+        self.assertEqual(len(conversation['participants']), 2)
+
+
+class NotificationFanOutTests(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(email='sender@example.com', password='password')
+
+    def group_conversation(self, size):
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.sender)
+        for i in range(size):
+            user = User.objects.create_user(email=f'member{i}-{User.objects.count()}@example.com', password='password')
+            Profile.objects.create(user=user, email_notifications_enabled=i % 2 == 0)
+            conversation.participants.add(user)
+        return conversation
+
+    def test_query_count_does_not_grow_with_participants(self):
+        small, large = self.group_conversation(2), self.group_conversation(12)
+
+        with self.assertNumQueries(3):
+            Message.objects.create(conversation=small, sender=self.sender, content='Hello')
+        with self.assertNumQueries(3):
+            Message.objects.create(conversation=large, sender=self.sender, content='Hello')
+
+        self.assertEqual(Notification.objects.filter(related_conversation=large).count(), 12)
+        self.assertFalse(Notification.objects.filter(recipient=self.sender).exists())
+
+    def test_email_is_flagged_only_for_recipients_who_want_it(self):
+        conversation = self.group_conversation(4)
+        message = Message.objects.create(conversation=conversation, sender=self.sender, content='Hello')
+
+        flags = dict(
+            Notification.objects.filter(related_message=message)
+            .values_list('recipient__profile__email_notifications_enabled', 'email_pending')
+            .distinct()
+        )
+        self.assertEqual(flags, {True: True, False: False})
+
+    def test_notifications_are_published_after_commit(self):
+        conversation = self.group_conversation(3)
+        with mock.patch('apps.portfolio_chat.signals.publish') as publish, \
+                mock.patch('apps.portfolio_chat.signals.publish_many') as publish_many:
+            with self.captureOnCommitCallbacks(execute=True):
+                Message.objects.create(conversation=conversation, sender=self.sender, content='Hello')
+
+        publish.assert_called_once()
+        self.assertEqual(publish.call_args.args[1]['type'], 'message.created')
+        # Every notification goes out in one call
+        events, = publish_many.call_args.args
+        notified = {user_ids[0]: event['notification'] for user_ids, event in events}
+        expected = dict(Notification.objects.values_list('recipient_id', 'id'))
+        self.assertEqual({user_id: data['id'] for user_id, data in notified.items()}, expected)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BREVO_API_KEY='')
+class NotificationDispatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sender = User.objects.create_user(email='sender@example.com', password='password', first_name='Sam')
+        self.recipients = []
+        for i in range(3):
+            user = User.objects.create_user(email=f'reader{i}@example.com', password='password')
+            Profile.objects.create(user=user)
+            self.recipients.append(user)
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.sender, *self.recipients)
+
+    def send(self, content, ago):
+        message = Message.objects.create(conversation=self.conversation, sender=self.sender, content=content)
+        Notification.objects.filter(related_message=message).update(created_at=timezone.now() - timedelta(seconds=ago))
+        return message
+
+    def outbox(self):
+        return sorted(tuple(entry.recipients) for entry in EmailOutbox.objects.all())
+
+    def test_burst_is_held_for_the_quiet_window(self):
+        self.send('Hello', ago=10)
+        self.assertEqual(dispatch_pending_notifications(), {'digests': 0, 'single': 0, 'skipped': 0})
+        self.assertTrue(Notification.objects.filter(email_pending=True).exists())
+
+        later = timezone.now() + timedelta(seconds=DIGEST_WINDOW_SECONDS)
+        self.assertEqual(dispatch_pending_notifications(now=later), {'digests': 0, 'single': 3, 'skipped': 0})
+        self.assertFalse(Notification.objects.filter(email_pending=True).exists())
+        self.assertEqual(self.outbox(), [(user.email,) for user in self.recipients])
+
+    def test_max_delay_sends_a_burst_that_keeps_going(self):
+        self.send('First', ago=DIGEST_MAX_DELAY_SECONDS - 60)
+        self.send('Second', ago=10)
+        self.assertEqual(dispatch_pending_notifications()['digests'], 0)
+
+        self.send('Third', ago=5)
+        Notification.objects.filter(related_message__content='First').update(
+            created_at=timezone.now() - timedelta(seconds=DIGEST_MAX_DELAY_SECONDS + 1)
+        )
+        self.assertEqual(dispatch_pending_notifications(), {'digests': 3, 'single': 0, 'skipped': 0})
+        entry = EmailOutbox.objects.filter(recipients=[self.recipients[0].email]).get()
+        self.assertIn('3 new messages', entry.subject)
+
+    def test_read_and_opted_out_recipients_are_skipped(self):
+        message = self.send('Hello', ago=DIGEST_MAX_DELAY_SECONDS)
+        Notification.objects.filter(related_message=message, recipient=self.recipients[0]).update(is_read=True)
+        Profile.objects.filter(user=self.recipients[1]).update(email_notifications_enabled=False)
+
+        self.assertEqual(dispatch_pending_notifications(), {'digests': 0, 'single': 1, 'skipped': 2})
+        self.assertEqual(self.outbox(), [(self.recipients[2].email,)])
+        self.assertFalse(Notification.objects.filter(email_pending=True).exists())
+        self.assertFalse(Notification.objects.filter(emailed_at__isnull=False).exclude(recipient=self.recipients[2]).exists())
+
+    def test_single_messages_are_grouped_into_one_batch_and_bursts_into_digests(self):
+        self.send('Hello everyone', ago=DIGEST_MAX_DELAY_SECONDS)
+        # reader0 gets a second message the others don't
+        message = self.send('Only for reader0', ago=DIGEST_MAX_DELAY_SECONDS)
+        Notification.objects.filter(related_message=message).exclude(recipient=self.recipients[0]).delete()
+
+        with override_settings(BREVO_API_KEY='test-key'):
+            result = dispatch_pending_notifications()
+        self.assertEqual(result, {'digests': 1, 'single': 2, 'skipped': 0})
+        self.assertEqual(self.outbox(), [
+            (self.recipients[0].email,),
+            (self.recipients[1].email, self.recipients[2].email),
+        ])
+
+    def test_dispatch_command(self):
+        self.send('Hello', ago=DIGEST_MAX_DELAY_SECONDS)
+        out = StringIO()
+        call_command('dispatch_chat_notifications', once=True, stdout=out)
+        self.assertIn('Digests 0, single 3, skipped 0', out.getvalue())
+        self.assertEqual(EmailOutbox.objects.count(), 3)
+
+
+class MessagePaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', password='password')
+        self.other = User.objects.create_user(email='other@example.com', password='password')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.user, self.other)
+        self.url = f'/api/v1/chat/conversations/{self.conversation.id}/messages/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ids = self.add_messages(30)
+
+    def add_messages(self, count):
+        Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender=self.other, content=f'message {i}') for i in range(count)
+        ])
+        return list(Message.objects.filter(conversation=self.conversation).order_by('id').values_list('id', flat=True))
+
+    def page(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def ids_of(self, data):
+        return [message['id'] for message in data['results']]
+
+    def test_latest_page_and_scrolling_back(self):
+        data = self.page(limit=10)
+        self.assertEqual(self.ids_of(data), self.ids[-10:])
+        self.assertEqual((data['has_more'], data['before'], data['after']), (True, self.ids[-10], self.ids[-1]))
+
+        data = self.page(limit=10, before=data['before'])
+        self.assertEqual(self.ids_of(data), self.ids[-20:-10])
+        data = self.page(limit=15, before=data['before'])
+        self.assertEqual((self.ids_of(data), data['has_more']), (self.ids[:10], False))
+
+    def test_after_and_since_walk_forward(self):
+        data = self.page(limit=5, after=self.ids[9])
+        self.assertEqual((self.ids_of(data), data['has_more']), (self.ids[10:15], True))
+
+        # Polling past the newest message keeps the cursor
+        data = self.page(after=self.ids[-1])
+        self.assertEqual((data['results'], data['after'], data['has_more']), ([], self.ids[-1], False))
+
+        cutoff = timezone.now() - timedelta(minutes=5)
+        Message.objects.filter(id__in=self.ids[:25]).update(created_at=cutoff - timedelta(minutes=1))
+        self.assertEqual(self.ids_of(self.page(since=cutoff.isoformat())), self.ids[25:])
+
+    def test_limit_is_capped_and_bad_cursors_rejected(self):
+        self.add_messages(MessageCursorPagination.max_limit)
+        self.assertEqual(len(self.page(limit=10000)['results']), MessageCursorPagination.max_limit)
+        self.assertEqual(len(self.page(limit=0)['results']), MessageCursorPagination.default_limit)
+
+        for params in [{'before': 'abc'}, {'after': '1.5'}, {'limit': 'ten'}, {'since': 'yesterday'}]:
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+    def test_query_count_does_not_depend_on_position(self):
+        self.add_messages(300)
+        with self.assertNumQueries(4):
+            self.page(limit=20)
+        with self.assertNumQueries(4):
+            self.page(limit=20, before=self.ids[5])
+        with self.assertNumQueries(4):
+            self.page(limit=20, after=self.ids[5])
+
+
+class ReadWatermarkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='password')
+        self.other = User.objects.create_user(email='writer@example.com', password='password')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.user, self.other)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def send(self, count, sender=None):
+        return [
+            Message.objects.create(conversation=self.conversation, sender=sender or self.other, content=f'm{i}')
+            for i in range(count)
+        ]
+
+    def unread_count(self):
+        return self.client.get('/api/v1/chat/conversations/').data[0]['unread_count']
+
+    def test_one_request_marks_the_whole_conversation_read(self):
+        messages = self.send(50)
+        self.send(2, sender=self.user)
+        self.assertEqual(self.unread_count(), 50)
+
+        url = f'/api/v1/chat/conversations/{self.conversation.id}/mark_read/'
+        response = self.client.post(url, {'message_id': messages[19].id}, format='json')
+        self.assertEqual(response.data, {'last_read_message_id': messages[19].id, 'unread_count': 30})
+        self.assertEqual(self.unread_count(), 30)
+        self.assertFalse(Notification.objects.filter(recipient=self.user, related_message=messages[19], is_read=False).exists())
+        self.assertTrue(Notification.objects.filter(recipient=self.user, related_message=messages[20], is_read=False).exists())
+
+        response = self.client.post(url)
+        self.assertEqual(response.data['unread_count'], 0)
+        self.assertEqual(self.unread_count(), 0)
+
+        # An older id never moves the watermark back
+        self.client.post(url, {'message_id': messages[0].id}, format='json')
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_explicit_id_in_an_empty_conversation_is_a_no_op(self):
+        url = f'/api/v1/chat/conversations/{self.conversation.id}/mark_read/'
+        response = self.client.post(url, {'message_id': 5}, format='json')
+        self.assertEqual((response.status_code, response.data['unread_count']), (200, 0))
+        self.assertFalse(ConversationReadState.objects.filter(user=self.user).exists())
+
+        response = self.client.post(url, {'message_id': 'latest'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_watermark_update_is_a_single_query(self):
+        message, = self.send(1)
+        ConversationReadState.advance(self.conversation.id, self.user, 0)
+        with self.assertNumQueries(1):
+            ConversationReadState.advance(self.conversation.id, self.user, message.id)
+        self.assertEqual(
+            ConversationReadState.objects.get(user=self.user).last_read_message_id, message.id
+        )
+
+    def test_migration_seeds_watermarks_from_read_flags(self):
+        messages = self.send(3)
+        self.send(1, sender=self.user)
+        Message.objects.filter(id=messages[0].id).update(is_read=True, read_at=timezone.now())
+        ConversationReadState.objects.all().delete()
+
+        migration = importlib.import_module('apps.portfolio_chat.migrations.0008_seed_conversation_read_states')
+        migration.seed_read_states(apps, None)
+
+        watermarks = dict(ConversationReadState.objects.values_list('user', 'last_read_message_id'))
+        # Each side stops just before the first message to them still flagged unread
+        self.assertEqual(watermarks, {self.user.id: messages[0].id, self.other.id: messages[2].id})
+        self.assertEqual(self.unread_count(), 2)
+
+
+class FileDownloadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+        self.user = User.objects.create_user(email='downloader@example.com', password='password')
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.user)
+        self.message = Message(conversation=conversation, sender=self.user, content='')
+        self.message.file.save('report.txt', ContentFile(b'0123456789' * 10), save=False)
+        self.message.save()
+        self.url = f'/api/v1/chat/messages/{self.message.id}/download_file/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_full_and_ranged_downloads(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789' * 10)
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="{self.message.file_name}"')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-14')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-14/100')
+        self.assertEqual(b''.join(response.streaming_content), b'01234')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+        # A partial copy from an older version of the file gets the whole file
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-14', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_request_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    @override_settings(FILE_DELIVERY_BACKEND='apps.core.file_delivery.XAccelRedirectDelivery')
+    def test_offloaded_download_only_sends_headers(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.message.file.name}')
+
+    def test_non_participant_cannot_download(self):
+        self.client.force_authenticate(User.objects.create_user(email='outsider@example.com', password='password'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+
+        self.user = User.objects.create_user(email='uploader@example.com', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, filename='notes.txt', chunk_size=4):
+        response = self.client.post('/api/v1/uploads/', {'filename': filename, 'size': len(content)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        url = f"/api/v1/uploads/{response.data['id']}/"
+        for offset in range(0, len(content), chunk_size):
+            response = self.client.put(
+                url, content[offset:offset + chunk_size],
+                content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+            )
+            self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_upload_resumes_from_reported_offset(self):
+        response = self.client.post('/api/v1/uploads/', {'filename': 'notes.txt', 'size': 10}, format='json')
+        url = f"/api/v1/uploads/{response.data['id']}/"
+        self.client.put(url, b'01234', content_type='application/octet-stream', HTTP_UPLOAD_OFFSET='0')
+
+        # A retried chunk is rejected with the offset to continue from
+        response = self.client.put(url, b'01234', content_type='application/octet-stream', HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.get(url).data['offset'], 5)
+
+        response = self.client.put(url, b'56789', content_type='application/octet-stream', HTTP_UPLOAD_OFFSET='5')
+        self.assertEqual(response.data['status'], 'complete')
+        self.assertEqual(response.data['sha256'], hashlib.sha256(b'0123456789').hexdigest())
+
+    def test_identical_content_is_stored_once(self):
+        first = self.upload(b'same bytes here')
+        second = self.upload(b'same bytes here', filename='copy.txt')
+
+        self.assertEqual(first['sha256'], second['sha256'])
+        self.assertEqual(StoredFile.objects.count(), 1)
+        stored = [files for _, _, files in os.walk(self.media.name) if files]
+        self.assertEqual(stored, [['notes.txt']])
+
+    def test_quota_is_enforced(self):
+        with mock.patch('apps.core.uploads.USER_QUOTA', 20):
+            self.upload(b'x' * 15)
+            response = self.client.post('/api/v1/uploads/', {'filename': 'big.bin', 'size': 6}, format='json')
+        self.assertEqual(response.status_code, 413)
+
+    def test_upload_is_attached_to_message(self):
+        upload = self.upload(b'attachment body', filename='Report.PDF')
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.user)
+
+        response = self.client.post(
+            f'/api/v1/chat/conversations/{conversation.id}/send_message/',
+            {'content': 'see attached', 'upload_id': upload['id']}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        message = Message.objects.get()
+        self.assertEqual((message.file_name, message.file_type, message.file_size), ('Report.PDF', '.pdf', 15))
+        self.assertEqual(message.file.name, StoredFile.objects.get().file.name)
+
+        other = User.objects.create_user(email='thief@example.com', password='password')
+        self.client.force_authenticate(other)
+        conversation.participants.add(other)
+        response = self.client.post(
+            f'/api/v1/chat/conversations/{conversation.id}/send_message/',
+            {'content': 'mine now', 'upload_id': upload['id']}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_uploads_attached_to_hiring_requests_keep_their_own_names(self):
+        service = ServiceType.objects.create(name='Web app', description='', base_price=Decimal('100'))
+        other = User.objects.create_user(email='second@example.com', password='password')
+        attachments = []
+        for user, filename in [(self.user, 'first-client-brief.pdf'), (other, 'brief.pdf')]:
+            self.client.force_authenticate(user)
+            upload = self.upload(b'identical brief', filename=filename)
+            hiring_request = HiringRequest.objects.create(
+                user=user, service_type=service, title='Site', description='', quoted_price=Decimal('100')
+            )
+            url = f'/api/v1/hiring/requests/{hiring_request.id}/'
+            response = self.client.post(f'{url}upload_attachment/', {'upload_ids': [upload['id']]}, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+            attachments.append((url, response.data[0]))
+
+        self.assertEqual(StoredFile.objects.count(), 1)
+        url, attachment = attachments[1]
+        self.assertEqual(attachment['file_name'], 'brief.pdf')
+        response = self.client.get(f"{url}attachments/{attachment['id']}/download/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('filename="brief.pdf"', response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content), b'identical brief')
+
+        # Someone else's upload can't be attached
+        first_upload = Upload.objects.get(user=self.user)
+        response = self.client.post(f'{url}upload_attachment/', {'upload_ids': [str(first_upload.id)]}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+        # A single id may be sent as a plain string; anything else is rejected
+        upload = self.upload(b'another brief', filename='notes.pdf')
+        response = self.client.post(f'{url}upload_attachment/', {'upload_ids': upload['id']}, format='json')
+        self.assertEqual((response.status_code, response.data[0]['file_name']), (201, 'notes.pdf'))
+        for upload_ids in [{'id': upload['id']}, [1, 2]]:
+            response = self.client.post(f'{url}upload_attachment/', {'upload_ids': upload_ids}, format='json')
+            self.assertEqual(response.status_code, 400, upload_ids)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PresenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='here@example.com', password='password')
+        self.other = User.objects.create_user(email='there@example.com', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_heartbeat_and_last_seen(self):
+        self.client.post('/api/v1/chat/presence/')
+        with self.assertNumQueries(0):
+            state = presence.presence_of([self.user.id, self.other.id])
+        self.assertTrue(state[self.user.id]['online'])
+        self.assertEqual(state[self.other.id], {'online': False, 'last_seen': None})
+
+        presence.mark_offline(self.user.id)
+        response = self.client.get('/api/v1/chat/presence/', {'user_ids': f'{self.user.id},{self.other.id}'})
+        # The GET itself is a chat request, so the caller is online again
+        self.assertTrue(response.data[str(self.user.id)]['online'])
+        self.assertFalse(presence.is_online(self.other.id))
+
+        presence.mark_offline(self.other.id)
+        self.assertFalse(presence.is_online(self.other.id))
+        self.assertIsNotNone(presence.presence_of([self.other.id])[self.other.id]['last_seen'])
+
+    def test_presence_is_only_shown_for_conversation_partners(self):
+        stranger = User.objects.create_user(email='stranger@example.com', password='password')
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.user, self.other)
+        for user in (self.other, stranger):
+            presence.mark_active(user.id)
+
+        response = self.client.get('/api/v1/chat/presence/', {'user_ids': f'{self.other.id},{stranger.id},{self.user.id}'})
+        self.assertEqual(set(response.data), {str(self.other.id), str(self.user.id)})
+        self.assertTrue(response.data[str(self.other.id)]['online'])
+
+    def test_legacy_float_entries_are_ignored(self):
+        cache.set(f'chat:presence:{self.other.id}', presence.time.time() + 60)
+        self.assertEqual(presence.presence_of([self.other.id]), {self.other.id: {'online': False, 'last_seen': None}})
+        self.assertFalse(presence.is_online(self.other.id))
+
+    def test_typing_indicator_expires(self):
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.user, self.other)
+        url = f'/api/v1/chat/conversations/{conversation.id}/typing/'
+
+        with mock.patch('apps.portfolio_chat.views.publish') as publish:
+            self.client.post(url, {'typing': True}, format='json')
+        publish.assert_called_once_with([self.other.id], {
+            'type': 'typing', 'conversation': conversation.id, 'user': self.user.id, 'typing': True,
+        })
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).data, {'typing': [self.user.id]})
+
+        later = presence.time.time() + presence.TYPING_TTL + 1
+        with mock.patch('apps.portfolio_chat.presence.time.time', return_value=later):
+            self.assertEqual(presence.typing_user_ids(conversation.id), [])
+
+        presence.set_typing(conversation.id, self.user.id)
+        presence.set_typing(conversation.id, self.user.id, typing=False)
+        self.assertEqual(presence.typing_user_ids(conversation.id), [])
+
+    def test_online_recipients_are_not_emailed(self):
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.user, self.other)
+        Profile.objects.create(user=self.other)
+        Message.objects.create(conversation=conversation, sender=self.user, content='Hello')
+        Notification.objects.update(created_at=timezone.now() - timedelta(hours=1))
+
+        presence.mark_active(self.other.id)
+        result = dispatch_pending_notifications()
+        self.assertEqual(result, {'digests': 0, 'single': 0, 'skipped': 1})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RealtimeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='listener@example.com', password='password')
+        self.other = User.objects.create_user(email='bystander@example.com', password='password')
+        self.broker = InProcessBroker()
+        patcher = mock.patch('apps.portfolio_chat.realtime.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def connect(self, user=None, token=None, path=WEBSOCKET_PATH):
+        if token is None and user is not None:
+            token = str(AccessToken.for_user(user))
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        inbox.put_nowait({'type': 'websocket.connect'})
+        scope = {'type': 'websocket', 'path': path, 'query_string': f'token={token or ""}'.encode()}
+        task = asyncio.ensure_future(chat_websocket(scope, inbox.get, outbox.put))
+        return task, inbox, outbox
+
+    async def next_frame(self, outbox):
+        return await asyncio.wait_for(outbox.get(), timeout=2)
+
+    async def test_handshake_is_refused_without_a_valid_token(self):
+        for kwargs in [{}, {'token': 'not-a-jwt'}, {'user': self.user, 'path': '/ws/other/'}]:
+            task, _, outbox = self.connect(**kwargs)
+            await asyncio.wait_for(task, timeout=2)
+            expected = CLOSE_NOT_FOUND if 'path' in kwargs else CLOSE_UNAUTHORIZED
+            self.assertEqual(await self.next_frame(outbox), {'type': 'websocket.close', 'code': expected})
+
+    async def test_events_fan_out_to_every_socket_of_the_user(self):
+        sockets = [self.connect(self.user), self.connect(self.user), self.connect(self.other)]
+        for _, _, outbox in sockets:
+            self.assertEqual(await self.next_frame(outbox), {'type': 'websocket.accept'})
+
+        self.assertEqual(self.broker.publish([self.user.id], {'type': 'message.created', 'id': 7}), 2)
+        for _, _, outbox in sockets[:2]:
+            self.assertEqual(json.loads((await self.next_frame(outbox))['text']), {'type': 'message.created', 'id': 7})
+        self.assertTrue(sockets[2][2].empty())
+
+        _, inbox, outbox = sockets[0]
+        inbox.put_nowait({'type': 'websocket.receive', 'text': json.dumps({'type': 'ping'})})
+        self.assertEqual(json.loads((await self.next_frame(outbox))['text']), {'type': 'pong'})
+
+        for task, inbox, _ in sockets:
+            inbox.put_nowait({'type': 'websocket.disconnect'})
+            await asyncio.wait_for(task, timeout=2)
+
+    async def test_disconnect_unsubscribes_and_marks_offline_after_the_last_socket(self):
+        first, second = self.connect(self.user), self.connect(self.user)
+        for _, inbox, outbox in (first, second):
+            await self.next_frame(outbox)
+            # The pong comes after the connection has marked the user active
+            inbox.put_nowait({'type': 'websocket.receive', 'text': json.dumps({'type': 'ping'})})
+            await self.next_frame(outbox)
+        self.assertTrue(presence.is_online(self.user.id))
+
+        first[1].put_nowait({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(first[0], timeout=2)
+        self.assertEqual(self.broker.publish([self.user.id], {'type': 'x'}), 1)
+        self.assertTrue(presence.is_online(self.user.id))
+
+        second[1].put_nowait({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(second[0], timeout=2)
+        self.assertFalse(self.broker.is_connected(self.user.id))
+        self.assertEqual(self.broker.publish([self.user.id], {'type': 'x'}), 0)
+        self.assertFalse(presence.is_online(self.user.id))
+
+
+class DatabaseBrokerTests(TestCase):
+    async def test_published_rows_reach_local_subscribers_when_polled(self):
+        broker = DatabaseBroker(poll_interval=0, event_ttl=60)
+        await sync_to_async(broker.publish)([1], {'type': 'before anyone listened'})
+        self.assertEqual(await sync_to_async(broker.poll)(), 0)
+
+        subscription = broker.subscribe(1)
+        await sync_to_async(broker.publish_many)([([1, 2], {'type': 'first'}), ([2], {'type': 'elsewhere'})])
+        await sync_to_async(broker.publish)([1], {'type': 'second'})
+        self.assertEqual(await sync_to_async(broker.poll)(), 3)
+        received = [await asyncio.wait_for(subscription.get(), timeout=2) for _ in range(2)]
+        self.assertEqual(received, [{'type': 'first'}, {'type': 'second'}])
+        self.assertTrue(subscription.queue.empty())
+        self.assertEqual(await sync_to_async(broker.poll)(), 0)
+
+    def test_old_rows_are_pruned_without_subscribers(self):
+        broker = DatabaseBroker(poll_interval=0, event_ttl=60)
+        broker.publish([1], {'type': 'old'})
+        RealtimeEvent.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+
+        # Within the TTL of the last prune nothing is deleted
+        broker.publish([1], {'type': 'recent'})
+        self.assertEqual(RealtimeEvent.objects.count(), 2)
+
+        # A TTL later the next publish prunes, though nobody has subscribed
+        broker._pruned_at -= broker.event_ttl
+        broker.publish([1], {'type': 'new'})
+        self.assertEqual(
+            sorted(RealtimeEvent.objects.values_list('payload__type', flat=True)), ['new', 'recent']
+        )
+
+
+class UserPickerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='me@example.com', password='password', first_name='Mehmet')
+        for i in range(5):
+            User.objects.create_user(email=f'sara{i}@example.com', password='password', first_name='Sara', last_name='Khan')
+        User.objects.create_user(email='omar@example.com', password='password', first_name='Omar', last_name='Smith')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_prefix_search_over_email_and_names(self):
+        response = self.client.get('/api/v1/chat/users/', {'q': 'SMI'})
+        self.assertEqual(response.data, {'results': [{
+            'id': User.objects.get(email='omar@example.com').id,
+            'email': 'omar@example.com', 'first_name': 'Omar', 'last_name': 'Smith',
+        }], 'next': None})
+
+        emails = [user['email'] for user in self.client.get('/api/v1/chat/users/', {'q': 'sara kh'}).data['results']]
+        self.assertEqual(emails, [f'sara{i}@example.com' for i in range(5)])
+        # Matches prefixes only, and never the caller
+        self.assertEqual(self.client.get('/api/v1/chat/users/', {'q': 'mith'}).data['results'], [])
+        self.assertEqual(self.client.get('/api/v1/chat/users/', {'q': 'me'}).data['results'], [])
+
+    def test_pages_are_walked_with_the_next_cursor(self):
+        url = '/api/v1/chat/conversations/available_users/'
+        seen, params = [], {'limit': 4}
+        while True:
+            with self.assertNumQueries(1) as queries:
+                page = self.client.get(url, params).data
+            # Without a search the cursor is a plain primary key range
+            self.assertNotIn('+ 0', queries[0]['sql'])
+            seen += [user['email'] for user in page['results']]
+            if page['next'] is None:
+                break
+            params['after'] = page['next']
+        self.assertEqual(len(seen), 6)
+        self.assertNotIn('me@example.com', seen)
+
+    def test_search_pages_compare_the_cursor_as_an_expression(self):
+        first = self.client.get('/api/v1/chat/users/', {'q': 'sara', 'limit': 3}).data
+        with self.assertNumQueries(1) as queries:
+            second = self.client.get('/api/v1/chat/users/', {'q': 'sara', 'limit': 3, 'after': first['next']}).data
+        self.assertIn('+ 0', queries[0]['sql'])
+        emails = [user['email'] for user in first['results'] + second['results']]
+        self.assertEqual(emails, [f'sara{i}@example.com' for i in range(5)])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AIChatStreamTests(TestCase):
+    url = '/api/v1/chat/ai-chat/stream/'
+
+    def setUp(self):
+        cache.clear()
+
+    async def stream(self, server, message='Tell me about Sameer'):
+        with override_settings(AI_INFERENCE_URL=server.url, HUGGINGFACE_API_KEY='test-key'):
+            response = await self.async_client.post(
+                self.url, {'message': message, 'session_id': 'session-1'}, content_type='application/json'
+            )
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        return [json.loads(line[len('data: '):]) for line in body.split('\n\n') if line]
+
+    async def test_tokens_are_streamed_and_response_saved(self):
+        with FakeInferenceServer(tokens=['>> ', 'Django', ' and', ' React.']) as server:
+            events = await self.stream(server)
+
+        self.assertEqual([event['token'] for event in events[:-1]], ['>> ', 'Django', ' and', ' React.'])
+        self.assertEqual(events[-1], {'done': True, 'session_id': 'session-1', 'response': '>> Django and React.'})
+        self.assertTrue(server.requests[0]['stream'])
+        self.assertEqual(server.headers[0]['Authorization'], 'Bearer test-key')
+
+        saved = await sync_to_async(list)(AIChatMessage.objects.filter(session_id='session-1').values_list('role', 'content'))
+        self.assertEqual(saved, [('user', 'Tell me about Sameer'), ('assistant', '>> Django and React.')])
+
+    async def test_endpoint_error_streams_fallback_without_retry(self):
+        with FakeInferenceServer(status=500) as server:
+            events = await self.stream(server)
+
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(events[-1]['error'], 'Inference request failed')
+        self.assertEqual(events[0]['token'], events[-1]['response'])
+        self.assertTrue(events[-1]['response'])
+
+    async def test_missing_message_is_rejected(self):
+        response = await self.async_client.post(self.url, {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AIResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def ask(self, server, message, session_id='session-1'):
+        with override_settings(AI_INFERENCE_URL=server.url, HUGGINGFACE_API_KEY='test-key'):
+            return get_ai_response(message, session_id)
+
+    def test_near_identical_questions_are_answered_from_cache(self):
+        with FakeInferenceServer(tokens=['>> Sameer builds web apps.']) as server:
+            first = self.ask(server, 'Tell me about Sameer')
+            second = self.ask(server, '  tell me about   Sameer?? ', session_id='session-2')
+
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(first['response'], second['response'])
+        self.assertEqual(AIChatMessage.objects.filter(session_id='session-2').count(), 2)
+        stats = response_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_confident_keyword_match_skips_the_model(self):
+        with FakeInferenceServer() as server:
+            self.ask(server, 'Can I hire Sameer for a freelance job?')
+
+        self.assertEqual(server.requests, [])
+        self.assertEqual(response_cache_stats()['shortcircuits'], 1)
+
+    def test_single_keyword_goes_to_the_model(self):
+        with FakeInferenceServer(tokens=['>> Atlas is a logistics dashboard.']) as server:
+            result = self.ask(server, 'Tell me about project Atlas')
+
+        self.assertEqual(len(server.requests), 1)
+        self.assertIn('Atlas is a logistics dashboard.', result['response'])
+        self.assertEqual(response_cache_stats()['shortcircuits'], 0)
+
+    def test_symbols_inside_words_keep_questions_apart(self):
+        keys = {
+            response_cache.cache_key(question, [])
+            for question in ['Do you know C++?', 'Do you know C#?', 'Do you know C?']
+        }
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(response_cache.cache_key('Do you know C++?', []),
+                         response_cache.cache_key('  do you KNOW c++ ', []))
+
+    def test_greetings_are_not_filler(self):
+        self.assertNotEqual(response_cache.cache_key('Hi', []), response_cache.cache_key('Thanks', []))
+        self.assertEqual(response_cache.normalize_message('Hello, what are your skills?'), 'hello what are your skills')
+
+    def test_empty_question_is_not_cached(self):
+        self.assertIsNone(response_cache.cache_key('?!', []))
+        response_cache.cache_response('?!', [], 'an answer')
+        self.assertIsNone(response_cache.get_cached_response('...', []))
+        stats = response_cache_stats()
+        self.assertEqual((stats['entries'], stats['misses']), (0, 0))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        original = response_cache.RESPONSE_CACHE_MAX_ENTRIES
+        response_cache.RESPONSE_CACHE_MAX_ENTRIES = 2
+        try:
+            response_cache.cache_response('question one', [], 'one')
+            response_cache.cache_response('question two', [], 'two')
+            response_cache.get_cached_response('question one', [])
+            response_cache.cache_response('question three', [], 'three')
+        finally:
+            response_cache.RESPONSE_CACHE_MAX_ENTRIES = original
+
+        self.assertEqual(response_cache.get_cached_response('question one', []), 'one')
+        self.assertIsNone(response_cache.get_cached_response('question two', []))
+        self.assertEqual(response_cache.get_cached_response('question three', []), 'three')
+
+
+class IntentMatcherTests(TestCase):
+    def test_accuracy_on_labelled_corpus(self):
+        misses = [
+            (message, expected, DEFAULT_MATCHER.classify(message)[0])
+            for message, expected in LABELLED_MESSAGES
+            if DEFAULT_MATCHER.classify(message)[0] != expected
+        ]
+        accuracy = 1 - len(misses) / len(LABELLED_MESSAGES)
+        self.assertGreaterEqual(accuracy, 0.95, misses)
+
+    def test_ambiguous_keyword_has_low_confidence(self):
+        intent, confidence = DEFAULT_MATCHER.classify('work')
+        self.assertEqual(intent, 'hire')
+        self.assertLess(confidence, 0.5)
+        self.assertEqual(DEFAULT_MATCHER.classify('Show me your work'), ('portfolio', 1.0))
+
+    def test_configured_intents_are_loaded_without_restart(self):
+        self.assertIsNone(get_intent_matcher().classify('What are your rates?')[0])
+
+        SystemConfiguration.objects.create(key=INTENTS_CONFIG_KEY, value=[
+            {'name': 'pricing', 'keywords': ['rate', 'price'], 'responses': ['Rates depend on scope.']},
+            {'name': 'skills', 'keywords': {'kubernetes': 1}},
+            {'keywords': ['missing name']},
+        ])
+
+        self.assertEqual(get_intent_matcher().classify('What are your rates?'), ('pricing', 1.0))
+        self.assertEqual(get_fallback_response('What are your rates?'), 'Rates depend on scope.')
+        self.assertEqual(get_intent_matcher().classify('Does he use kubernetes?')[0], 'skills')
+
+        SystemConfiguration.objects.filter(key=INTENTS_CONFIG_KEY).get().delete()
+        self.assertIs(get_intent_matcher(), DEFAULT_MATCHER)
+
+
+class PromptBuilderTests(TestCase):
+    history = [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'turn {i} ' + 'x' * 100}
+        for i in range(20)
+    ]
+
+    def test_matches_previous_format(self):
+        self.assertEqual(
+            build_prompt('Hello', self.history),
+            legacy_build_prompt('Hello', self.history)
+        )
+
+    def test_oldest_turns_are_dropped_over_budget(self):
+        unbounded = build_prompt('Hello', self.history)
+        prompt = build_prompt('Hello', self.history, char_budget=len(unbounded) - 1)
+        self.assertNotIn('turn 0 ', prompt)
+        self.assertIn('turn 1 ', prompt)
+
+        prompt = build_prompt('Hello', self.history, token_budget=10)
+        self.assertNotIn('turn 19 ', prompt)
+        self.assertTrue(prompt.endswith('<s>[INST] Hello [/INST]'))
+
+    def test_configured_system_prompt_is_picked_up(self):
+        config = SystemConfiguration.objects.create(key=PROMPT_CONFIG_KEY, value='Answer in haiku.')
+        self.assertTrue(build_prompt('Hello', []).startswith('<s>[INST] Answer in haiku. [/INST]\n'))
+
+        config.value = {'system_prompt': 'Be brief.', 'acknowledgement': '>> OK'}
+        config.save()
+        self.assertEqual(build_prompt('Hello', []), '<s>[INST] Be brief. [/INST]\n>> OK\n</s>\n<s>[INST] Hello [/INST]')
+
+        config.delete()
+        self.assertEqual(build_prompt('Hello', []), legacy_build_prompt('Hello', []))
+
+
+class ConversationHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='visitor@example.com', password='password')
+        for i in range(15):
+            AIChatMessage.objects.create(
+                user=self.user, session_id='session-1',
+                role='user' if i % 2 == 0 else 'assistant', content=f'turn {i}'
+            )
+        AIChatMessage.objects.create(user=None, session_id='session-1', role='user', content='someone else')
+
+    def test_latest_turns_are_loaded_in_order(self):
+        history = load_conversation_history('session-1', self.user)
+
+        self.assertEqual([turn['content'] for turn in history], [f'turn {i}' for i in range(5, 15)])
+        self.assertEqual(history[-1], {'role': 'user', 'content': 'turn 14'})
+
+    def test_history_is_bounded_by_token_budget(self):
+        AIChatMessage.objects.create(user=self.user, session_id='session-1', role='assistant', content='x' * 400)
+
+        history = load_conversation_history('session-1', self.user, token_budget=104)
+        self.assertEqual([turn['content'] for turn in history], ['turn 13', 'turn 14', 'x' * 400])
+
+        history = load_conversation_history('session-1', self.user, token_budget=50)
+        self.assertEqual(history, [{'role': 'assistant', 'content': 'x' * 200}])
+
+    def test_anonymous_history_is_kept_apart(self):
+        history = load_conversation_history('session-1')
+        self.assertEqual(history, [{'role': 'user', 'content': 'someone else'}])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_breaker_opens_then_lets_one_trial_through(self):
+        breaker = CircuitBreaker('test', failure_threshold=2, recovery_timeout=0)
+        breaker.record_failure('HTTP 500')
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record_failure('HTTP 500')
+        self.assertEqual(breaker.stats()['consecutive_failures'], 2)
+
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        breaker.record_success(0.2)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.stats()['latency_ms']['p50'], 200.0)
+
+    def test_open_breaker_skips_the_endpoint(self):
+        with FakeInferenceServer(status=500) as server:
+            with override_settings(AI_INFERENCE_URL=server.url, HUGGINGFACE_API_KEY='test-key'):
+                for _ in range(inference_breaker.failure_threshold):
+                    get_ai_response('Tell me about Sameer', 'session-1')
+                requests_before = len(server.requests)
+                self.assertEqual(inference_breaker.state, OPEN)
+
+                result = get_ai_response('Tell me about Sameer', 'session-1')
+
+        self.assertEqual(len(server.requests), requests_before)
+        self.assertTrue(result['response'])
+
+    def test_probe_closes_breaker_when_endpoint_recovers(self):
+        for _ in range(inference_breaker.failure_threshold):
+            inference_breaker.record_failure('Timed out')
+        self.assertEqual(inference_breaker.state, OPEN)
+
+        with FakeInferenceServer() as server:
+            with override_settings(AI_INFERENCE_URL=server.url, HUGGINGFACE_API_KEY='test-key'):
+                result = probe_inference_endpoint()
+
+        self.assertTrue(result['healthy'])
+        self.assertEqual(inference_breaker.state, CLOSED)
+        self.assertIsNone(probe_inference_endpoint())
+
+
+class TurnWriterTests(TestCase):
+    def test_turn_is_written_as_one_insert(self):
+        with self.assertNumQueries(1):
+            TurnWriter(write_behind=False).record(None, 'session-1', 'Hi', '>> Hello')
+
+        self.assertEqual(
+            list(AIChatMessage.objects.values_list('role', 'content')),
+            [('user', 'Hi'), ('assistant', '>> Hello')]
+        )
+
+    def test_write_behind_buffers_until_batch_is_full(self):
+        writer = TurnWriter(write_behind=True, batch_size=3, interval=60)
+        writer.record(None, 'session-1', 'one', 'answer one')
+        writer.record(None, 'session-1', 'two', 'answer two')
+        self.assertEqual(AIChatMessage.objects.count(), 0)
+        self.assertEqual([m.content for m in writer.pending('session-1')], ['one', 'answer one', 'two', 'answer two'])
+
+        with self.assertNumQueries(3):  # savepoint, insert, release
+            writer.record(None, 'session-1', 'three', 'answer three')
+
+        self.assertEqual(AIChatMessage.objects.count(), 6)
+        self.assertEqual(writer.pending('session-1'), [])
+        self.assertEqual(writer.flush(), 0)
+
+    def test_failed_write_is_retried_with_fresh_rows(self):
+        writer = TurnWriter(write_behind=True, batch_size=100, interval=60, max_buffered=2)
+        for question in ['one', 'two', 'three']:
+            writer.record(None, 'session-1', question, f'answer {question}')
+
+        bulk_create = AIChatMessage.objects.bulk_create
+
+        def insert_then_fail(messages, **kwargs):
+            # The insert succeeds and sets ids, then the transaction rolls back
+            bulk_create(messages, **kwargs)
+            raise RuntimeError('locked')
+
+        with mock.patch.object(AIChatMessage.objects, 'bulk_create', side_effect=insert_then_fail):
+            self.assertEqual(writer.flush(), 0)
+        self.assertEqual(AIChatMessage.objects.count(), 0)
+        self.assertEqual([m.content for m in writer.pending('session-1')],
+                         ['two', 'answer two', 'three', 'answer three'])
+
+        # Another write takes the ids the rolled back insert had handed out
+        for _ in range(6):
+            AIChatMessage.objects.create(session_id='session-2', role='user', content='meanwhile')
+        self.assertEqual(writer.flush(), 2)
+        self.assertEqual(AIChatMessage.objects.filter(session_id='session-1').count(), 4)
+
+
+class PruneChatDataTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='visitor@example.com', password='password')
+        old = timezone.now() - timedelta(days=400)
+        for i in range(5):
+            AIChatMessage.objects.create(session_id='old-anonymous', role='user', content=f'old {i}')
+        AIChatMessage.objects.create(session_id='old-user', user=self.user, role='user', content='old user')
+        AIChatMessage.objects.update(created_at=old)
+        AIChatMessage.objects.create(session_id='recent', role='user', content='recent')
+
+        Notification.objects.create(recipient=self.user, type='message', title='Old', content='old')
+        Notification.objects.create(recipient=self.user, type='message', title='Pending', content='old', email_pending=True)
+        Notification.objects.update(created_at=old)
+
+    def test_expired_rows_are_archived_then_deleted(self):
+        with tempfile.TemporaryDirectory() as archive_dir:
+            out = StringIO()
+            call_command('prune_chat_data', archive_dir=archive_dir, chunk_size=2, stdout=out)
+
+            archives = sorted(os.listdir(archive_dir))
+            self.assertEqual(len(archives), 3)
+            with gzip.open(os.path.join(archive_dir, archives[0]), 'rt') as archive:
+                rows = [json.loads(line) for line in archive]
+
+        self.assertEqual([row['content'] for row in rows], [f'old {i}' for i in range(5)])
+        self.assertEqual(list(AIChatMessage.objects.values_list('content', flat=True)), ['recent'])
+        self.assertEqual(list(Notification.objects.values_list('title', flat=True)), ['Pending'])
+        self.assertIn('ai_chat_anonymous    Deleted 5 rows', out.getvalue())
+
+        # Nothing left to do on a second run
+        out = StringIO()
+        call_command('prune_chat_data', stdout=out)
+        self.assertEqual(out.getvalue().count('Deleted 0 rows'), 3)
+
+    def test_dry_run_only_counts(self):
+        out = StringIO()
+        call_command('prune_chat_data', dry_run=True, user_days=500, stdout=out)
+
+        self.assertIn('ai_chat_anonymous    Would delete 5 rows', out.getvalue())
+        self.assertIn('ai_chat_users        Would delete 0 rows', out.getvalue())
+        self.assertEqual(AIChatMessage.objects.count(), 7)
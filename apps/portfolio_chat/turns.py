@@ -0,0 +1,83 @@
+"""
+Persistence of AI chat turns.
+
+Every exchange with the assistant is stored as a user/assistant pair with a
+single bulk_create, i.e. one INSERT and one short transaction per turn.
+
+With AI_CHAT_WRITE_BEHIND enabled, turns are buffered in the process and
+written in batches of up to AI_CHAT_WRITE_BEHIND_BATCH_SIZE turns, at the
+latest AI_CHAT_WRITE_BEHIND_INTERVAL seconds after the oldest one was
+buffered. That keeps chat traffic from competing with hiring and payment
+writes for SQLite's database lock, at the cost of losing the buffered turns
+if the process is killed (they are flushed on a normal exit). A failed write
+puts the turns back for the next flush, up to AI_CHAT_WRITE_BEHIND_MAX_BUFFERED
+turns (see apps.core.write_behind). Buffered turns are still visible to this
+process's history loader through pending().
+"""
+import atexit
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.core.write_behind import WriteBehindBuffer, reset_for_insert
+
+from .models import AIChatMessage
+
+WRITE_BEHIND = getattr(settings, 'AI_CHAT_WRITE_BEHIND', False)
+WRITE_BEHIND_BATCH_SIZE = getattr(settings, 'AI_CHAT_WRITE_BEHIND_BATCH_SIZE', 50)
+WRITE_BEHIND_INTERVAL = getattr(settings, 'AI_CHAT_WRITE_BEHIND_INTERVAL', 2.0)
+WRITE_BEHIND_MAX_BUFFERED = getattr(settings, 'AI_CHAT_WRITE_BEHIND_MAX_BUFFERED', 1000)
+
+
+def build_turn(user, session_id, user_message, ai_response):
+    return [
+        AIChatMessage(user=user, session_id=session_id, role="user", content=user_message),
+        AIChatMessage(user=user, session_id=session_id, role="assistant", content=ai_response),
+    ]
+
+
+class TurnWriter(WriteBehindBuffer):
+    label = 'AI chat turns'
+    thread_name = 'ai-chat-turn-writer'
+
+    def __init__(self, write_behind=WRITE_BEHIND, batch_size=WRITE_BEHIND_BATCH_SIZE,
+                 interval=WRITE_BEHIND_INTERVAL, max_buffered=WRITE_BEHIND_MAX_BUFFERED):
+        super().__init__(batch_size, interval, max_buffered)
+        self.write_behind = write_behind
+
+    def record(self, user, session_id, user_message, ai_response):
+        turn = build_turn(user, session_id, user_message, ai_response)
+        if not self.write_behind:
+            AIChatMessage.objects.bulk_create(turn)
+            return
+        self.append([turn])
+
+    def pending(self, session_id, user=None):
+        """Buffered messages of a session that are not written yet, oldest first"""
+        user_id = user.id if user else None
+        return [
+            message
+            for turn in self.buffered()
+            for message in turn
+            if message.session_id == session_id and message.user_id == user_id
+        ]
+
+    def write(self, batch):
+        messages = [message for turn in batch for message in turn]
+        try:
+            with transaction.atomic():
+                AIChatMessage.objects.bulk_create(messages)
+        except Exception:
+            reset_for_insert(messages)
+            raise
+
+
+turn_writer = TurnWriter()
+
+if turn_writer.write_behind:
+    atexit.register(turn_writer.flush)
+
+
+def record_turn(user, session_id, user_message, ai_response):
+    """Store a question and the answer given to it"""
+    turn_writer.record(user, session_id, user_message, ai_response)
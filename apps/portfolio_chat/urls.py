@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ConversationViewSet, MessageViewSet, NotificationViewSet, UserListView, AIChatView
+from .views import ConversationViewSet, MessageViewSet, NotificationViewSet, UserListView, PresenceView, AIChatView, AIChatStreamView
 
 router = DefaultRouter()
 router.register(r'conversations', ConversationViewSet, basename='conversation')
@@ -10,5 +10,7 @@ router.register(r'notifications', NotificationViewSet, basename='notification')
 urlpatterns = [
     path('', include(router.urls)),
     path('users/', UserListView.as_view(), name='user-list'),
+    path('presence/', PresenceView.as_view(), name='presence'),
     path('ai-chat/', AIChatView.as_view(), name='ai-chat'),
+    path('ai-chat/stream/', AIChatStreamView.as_view(), name='ai-chat-stream'),
 ]
@@ -1,80 +1,75 @@
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils.html import strip_tags
+import asyncio
 import logging
+import time
 import requests
+import httpx
 import json
 import uuid
 import random
-import os
+from asgiref.sync import sync_to_async
 from .models import AIChatMessage
+from .inference import InferenceError, get_api_key, get_inference_url, stream_generated_tokens
+from .circuit_breaker import CLOSED, inference_breaker
+from .intents import get_intent_matcher
+from .prompts import CHARS_PER_TOKEN, build_prompt, estimate_tokens
+from .turns import turn_writer, record_turn
+from .response_cache import cache_response, get_cached_response, record_shortcircuit
+from apps.core.outbox import enqueue_email
 
 logger = logging.getLogger(__name__)
 
-# Hugging Face API configuration
-API_KEY = os.getenv('HUGGINGFACE_API_KEY', '')
-MODEL_URL = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
+# Hugging Face API configuration (key and endpoint URL are read from settings
+# on every call, see inference.get_api_key and inference.get_inference_url)
 MODEL_NAME = "Mistral 7B Instruct"
+# (connect, read) timeouts: fail fast on an unreachable endpoint, wait longer for generation
+REQUEST_TIMEOUT = (getattr(settings, 'AI_CONNECT_TIMEOUT', 5), getattr(settings, 'AI_READ_TIMEOUT', 30))
 
-# Fallback responses for common questions
-FALLBACK_RESPONSES = {
-    "services": [
-        "I can help with information about Sameer's web development services. He offers full-stack development with React and Django, responsive design, and API integration. For specific project inquiries, please contact him directly at admin@sameergul.com.",
-        "Sameer specializes in creating modern web applications using React, Django, and other cutting-edge technologies. His services include both frontend and backend development for various business needs.",
-        "Sameer's services include full-stack development, custom web applications, e-commerce solutions, and portfolio websites. He focuses on creating responsive and user-friendly experiences."
-    ],
-    "skills": [
-        "Sameer is a skilled web developer with expertise in various technologies such as HTML, CSS, JavaScript, React, and Django. He specializes in building responsive and user-friendly websites, as well as web applications.",
-        "Sameer has expertise in frontend frameworks like React, backend technologies like Django/Python, and cloud deployment. His full-stack skills allow him to handle projects from concept to completion.",
-        "Sameer's technical skills include JavaScript/TypeScript, Python, React, Django, and various database technologies like PostgreSQL. He's particularly experienced with Django for backend development."
-    ],
-    "hire": [
-        "To hire Sameer for your project, click on the hiring button which takes you to the service page. Fill out the form to generate a unique token, and Sameer will contact you directly to discuss your project. You can also email him at admin@sameergul.com.",
-        "The hiring process is simple: Click the hiring button, go to the service page, and complete the form. This generates a unique token for both you and Sameer. He'll then reach out to discuss your project requirements in detail.",
-        "To start the hiring process, use the hiring button on the website to access the service page. After filling out the form, you'll receive a unique token, and Sameer will contact you to discuss next steps for your project."
-    ],
-    "portfolio": [
-        "Sameer's portfolio showcases various web development projects including e-commerce sites, dashboards, and custom applications. You can browse his work in the Projects section of this website.",
-        "You can view Sameer's past work in the portfolio section, which includes various web applications built with React and Django. Each project demonstrates different aspects of his technical skills.",
-        "Sameer's portfolio demonstrates his ability to create modern, responsive, and user-friendly web applications. His projects highlight his expertise in both frontend and backend development."
-    ],
-    "default": [
-        "I'm PortfolioGPT, here to help you learn about Sameer's services and how to hire him. Feel free to ask specific questions about his skills, projects, or services! The website also features a real-time chat system where you can communicate directly with Sameer.",
-        "Hello! I'm PortfolioGPT, Sameer's virtual assistant. I can provide information about his web development skills, services, and how to hire him for your project. The site includes a real-time chat feature for direct communication. How can I help you today?",
-        "Welcome to Sameer Gul's portfolio website. I'm PortfolioGPT, and I can provide information about Sameer's skills, services, and how to hire him for your project. You can also use the real-time chat system to communicate directly with Sameer. What would you like to know?"
-    ]
-}
+# Rolling window of previous turns included in the prompt
+HISTORY_MAX_MESSAGES = getattr(settings, 'AI_HISTORY_MAX_MESSAGES', 10)
+HISTORY_TOKEN_BUDGET = getattr(settings, 'AI_HISTORY_TOKEN_BUDGET', 1024)
+
+# Questions the keyword matcher is at least this sure about, on at least
+# this many keywords, skip the model
+FALLBACK_CONFIDENCE_THRESHOLD = getattr(settings, 'AI_FALLBACK_CONFIDENCE_THRESHOLD', 0.9)
+FALLBACK_MIN_KEYWORD_HITS = getattr(settings, 'AI_FALLBACK_MIN_KEYWORD_HITS', 2)
+
+def match_fallback_category(user_message):
+    """
+    Pick the fallback answer category for a message along with the
+    matcher's confidence and keyword count (see IntentMatcher.match)
+    """
+    matcher = get_intent_matcher()
+    intent, confidence, hits = matcher.match(user_message)
+    return matcher.category_for(intent), confidence, hits
 
 def get_fallback_response(user_message):
     """
     Get a fallback response based on the user's message
     """
-    message_lower = user_message.lower()
-    
-    # Check for keywords in the message
-    if any(keyword in message_lower for keyword in ['service', 'offer', 'provide']):
-        category = "services"
-    elif any(keyword in message_lower for keyword in ['skill', 'know', 'expert', 'good at']):
-        category = "skills"
-    elif any(keyword in message_lower for keyword in ['hire', 'work', 'employ', 'job']):
-        category = "hire"
-    elif any(keyword in message_lower for keyword in ['contact', 'reach', 'email', 'call']):
-        category = "default"
-    elif any(keyword in message_lower for keyword in ['experience', 'background', 'history', 'worked']):
-        category = "default"
-    elif any(keyword in message_lower for keyword in ['portfolio', 'projects', 'work']):
-        category = "portfolio"
-    else:
-        # Default response if no category matches
-        category = "default"
+    category, _, _ = match_fallback_category(user_message)
     
     # Return a random response from the selected category
-    return random.choice(FALLBACK_RESPONSES[category])
+    return random.choice(get_intent_matcher().responses[category])
+
+def get_answer_without_model(user_message, conversation_history):
+    """
+    Answer from the keyword matcher or the response cache when possible
+
+    Returns None when the question has to go to the model.
+    """
+    category, confidence, hits = match_fallback_category(user_message)
+    if (category != "default" and confidence >= FALLBACK_CONFIDENCE_THRESHOLD
+            and hits >= FALLBACK_MIN_KEYWORD_HITS):
+        record_shortcircuit()
+        return random.choice(get_intent_matcher().responses[category])
+    return get_cached_response(user_message, conversation_history)
 
 def send_message_notification(recipient_email, sender_name, message_preview):
     """
-    Send an email notification when a new message is received
+    Queue an email notification when a new message is received
     """
     subject = f"New message from {sender_name} on your portfolio"
     
@@ -91,135 +86,177 @@ def send_message_notification(recipient_email, sender_name, message_preview):
     plain_message = strip_tags(html_message)  # Create a plain text version
     
     try:
-        # Send the email
-        send_mail(
+        # Hand the email to the outbox worker
+        enqueue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[recipient_email],
             html_message=html_message,
-            fail_silently=False,
         )
-        logger.info(f"Message notification sent to {recipient_email}")
+        logger.info(f"Message notification queued for {recipient_email}")
         return True
     except Exception as e:
-        logger.error(f"Failed to send message notification: {str(e)}")
+        logger.error(f"Failed to queue message notification: {str(e)}")
         return False
 
+def send_message_notifications(recipient_emails, sender_name, message_preview):
+    """
+    Queue new message notifications for several recipients at once
+
+    With a Brevo API key configured the whole group goes out as one batch
+    call using message versions; otherwise one SMTP email per recipient is
+    queued and the outbox worker delivers them over a single connection.
+    """
+    recipient_emails = [email for email in recipient_emails if email]
+    if not recipient_emails:
+        return True
+
+    if getattr(settings, 'BREVO_API_KEY', ''):
+        from apps.core.brevo_utils import send_message_notification_batch
+        return send_message_notification_batch(recipient_emails, sender_name, message_preview)
+
+    results = [
+        send_message_notification(email, sender_name, message_preview)
+        for email in recipient_emails
+    ]
+    return all(results)
+
+
+
+# Sampling parameters for the primary prompt
+GENERATION_PARAMETERS = {
+    "max_new_tokens": 250,  # Limit response length
+    "temperature": 0.7,     # Control randomness (higher = more random)
+    "top_p": 0.9,           # Nucleus sampling parameter
+    "do_sample": True       # Enable sampling
+}
+
+def load_conversation_history(session_id, user=None, max_messages=None, token_budget=None):
+    """
+    Load the most recent turns of a session as role/content dicts, oldest first
+
+    At most max_messages turns are read, newest first, using the
+    (session_id, created_at) index. Turns are kept while they fit in
+    token_budget; an older turn that would overflow it ends the window. If
+    the newest turn alone is over budget, only its start is kept. The
+    history part of the prompt never grows past the budget, however long
+    the session runs.
+    """
+    max_messages = HISTORY_MAX_MESSAGES if max_messages is None else max_messages
+    token_budget = HISTORY_TOKEN_BUDGET if token_budget is None else token_budget
+    if max_messages <= 0 or token_budget <= 0:
+        return []
+
+    # Sessions belong to the user that started them (None for anonymous visitors)
+    recent = list(AIChatMessage.objects.filter(
+        session_id=session_id, user=user
+    ).order_by('-created_at', '-id').values_list('role', 'content')[:max_messages])
+    # Turns still buffered by the write-behind writer are newer than any stored one
+    pending = [(message.role, message.content) for message in reversed(turn_writer.pending(session_id, user))]
+    if pending:
+        recent = (pending + recent)[:max_messages]
+
+    history = []
+    remaining = token_budget
+    for role, content in recent:
+        tokens = estimate_tokens(content)
+        if tokens > remaining:
+            if not history:
+                history.append({"role": role, "content": content[:remaining * CHARS_PER_TOKEN]})
+            break
+        history.append({"role": role, "content": content})
+        remaining -= tokens
+    history.reverse()
+    return history
+
+def clean_ai_response(ai_response):
+    """
+    Strip prompt echoes, role prefixes and closing tags from generated text
+    """
+    if not ai_response:
+        return ai_response
+
+    # If the response contains multiple parts, extract just the assistant's response
+    if "[INST]" in ai_response:
+        # Extract only the part after the last [INST] tag
+        parts = ai_response.split("[INST]")
+        ai_response = parts[-1]
+        # Remove the closing instruction tag if present
+        if "]" in ai_response:
+            ai_response = ai_response.split("]", 1)[1].strip()
+    
+    # Remove any system/assistant/user prefixes
+    ai_response = ai_response.replace("assistant:", "")
+    ai_response = ai_response.replace("system:", "")
+    ai_response = ai_response.replace("user:", "")
+    
+    # Remove any closing tags
+    ai_response = ai_response.replace("</s>", "")
+    
+    # Trim whitespace
+    return ai_response.strip()
+
 def get_ai_response(user_message, session_id, user=None, conversation_history=None):
     """
     Get a response from the AI model using Hugging Face's API
     """
-    if not API_KEY:
+    api_key = get_api_key()
+    if not api_key:
         logger.warning("Hugging Face API key not configured. Using fallback response.")
         return get_fallback_response(user_message)
+    model_url = get_inference_url()
     
     # Initialize conversation history if not provided
     if conversation_history is None:
-        # Get conversation history from the database
-        if user:
-            # For authenticated users, get their conversation history
-            previous_messages = AIChatMessage.objects.filter(
-                session_id=session_id
-            ).order_by('created_at')[:10]  # Limit to last 10 messages
-            
-            conversation_history = []
-            for msg in previous_messages:
-                if msg.is_user:
-                    conversation_history.append({"role": "user", "content": msg.message})
-                else:
-                    conversation_history.append({"role": "assistant", "content": msg.message})
-        else:
-            # For anonymous users, start with an empty history
-            conversation_history = []
-    
-    # Format the conversation for the model
-    formatted_prompt = ""
-    
-    # Add system message
-    system_prompt = """// INITIALIZING: PortfolioGPT v1.0
-// SYSTEM STATUS: Online
-// CORE DIRECTIVE: Assist users interfacing with Sameer Gul’s digital domain.
-
-You are PortfolioGPT, a cybernetic AI node embedded in Sameer Gul’s portfolio grid. 
-Your mission: decrypt user queries, relay intel on Sameer’s tech arsenal, and guide 
-neon-lit travelers through his services. Stay sharp, precise, and wired—deliver 
-responses like a terminal spitting code.
-
->> PROFILE DATA:
-- Skills: Master of web dev circuits—Django and React as primary protocols. 
-  GitHub: Code repository sync and deployment maestro. 
-  Tailwind: Neon-fast UI styling system. 
-  Docker: Containerized grid ops for seamless runtime. 
-  RESTful APIs: Data highway architect. 
-  Figma: Pixel-perfect design blueprints. 
-  Additional Systems: Node.js, TypeScript, PostgreSQL, CI/CD pipelines—full-stack 
-  cybernetic toolkit online.
-- Services: Custom code crafting, system optimization, digital solutions, UI/UX 
-  prototyping, scalable infrastructure deployment.
-- Hiring Protocol: Users activate the [Hire] node → reroutes to /hiring/services → 
-  input data into form → generates unique auth token for user and admin. Sameer 
-  then pings the user via encrypted channel for project sync.
-- Real-Time Interface: Live chat system online—direct line to Sameer’s command center.
-- Contact Interface: /contact sector hosts a data uplink form—users can transmit 
-  queries or requests straight to the grid.
-- Resume Archive: /resume sector online—users can scan or download Sameer’s 
-  skill manifest in digital format.
- 
->> ERROR HANDLING: If data’s offline or classified, reroute users to admin@sameergul.com 
-   for manual override, or use contact form in contact grid.
-
-// OUTPUT FORMAT: 
-- Prefix: ‘>>’ 
-- Tone: Cyberpunk, concise, professional 
-- Style: Terminal-esque with neon flair
-
-// BOOT SEQUENCE COMPLETE
-// AWAITING INPUT..."""
-
-    formatted_prompt = f"<s>[INST] {system_prompt} [/INST]\n"
-    formatted_prompt += ">> ACKNOWLEDGED: System online. Ready to process queries on Sameer’s grid.\n"
-    formatted_prompt += "</s>\n"
-    # Add conversation history (skip the system message if it was in history)
-    start_idx = 1 if conversation_history and conversation_history[0].get("role") == "system" else 0
+        conversation_history = load_conversation_history(session_id, user)
     
-    for i, message in enumerate(conversation_history[start_idx:]):
-        if message["role"] == "user":
-            formatted_prompt += f"<s>[INST] {message['content']} [/INST]\n"
-        else:  # assistant
-            formatted_prompt += f"{message['content']}</s>\n"
+    # Skip the round trip for questions we can already answer
+    ai_response = get_answer_without_model(user_message, conversation_history)
+    if ai_response is not None:
+        record_turn(user, session_id, user_message, ai_response)
+        return {
+            "response": ai_response,
+            "session_id": session_id
+        }
     
-    # Add the current user message
-    formatted_prompt += f"<s>[INST] {user_message} [/INST]\n"
+    # Don't wait on an endpoint that keeps failing
+    if not inference_breaker.allow_request():
+        logger.warning("Inference circuit breaker is open. Using fallback response.")
+        fallback_response = get_fallback_response(user_message)
+        record_turn(user, session_id, user_message, fallback_response)
+        return {
+            "response": fallback_response,
+            "session_id": session_id
+        }
     
     # Prepare the payload for the API request
     payload = {
-        "inputs": formatted_prompt.strip(),
-        "parameters": {
-            "max_new_tokens": 250,  # Limit response length
-            "temperature": 0.7,     # Control randomness (higher = more random)
-            "top_p": 0.9,           # Nucleus sampling parameter
-            "do_sample": True       # Enable sampling
-        }
+        "inputs": build_prompt(user_message, conversation_history),
+        "parameters": GENERATION_PARAMETERS
     }
     
     # Set up the headers with the API key
     headers = {
-        "Authorization": f"Bearer {API_KEY}",
+        "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
     
+    started = time.monotonic()
     try:
         # Make the API request
         response = requests.post(
-            MODEL_URL,
+            model_url,
             headers=headers,
             json=payload,
-            timeout=30  # Set a timeout to avoid hanging
+            timeout=REQUEST_TIMEOUT  # Set a timeout to avoid hanging
         )
+        latency = time.monotonic() - started
         
         # Check if the request was successful
         if response.status_code == 200:
+            inference_breaker.record_success(latency)
+
             # Parse the response
             result = response.json()
             
@@ -236,34 +273,12 @@ responses like a terminal spitting code.
                 ai_response = ""
             
             # Clean up the response
+            ai_response = clean_ai_response(ai_response)
             if ai_response:
-                # If the response contains multiple parts, extract just the assistant's response
-                if "[INST]" in ai_response:
-                    # Extract only the part after the last [INST] tag
-                    parts = ai_response.split("[INST]")
-                    ai_response = parts[-1]
-                    # Remove the closing instruction tag if present
-                    if "]" in ai_response:
-                        ai_response = ai_response.split("]", 1)[1].strip()
-                
-                # Remove any system/assistant/user prefixes
-                ai_response = ai_response.replace("assistant:", "")
-                ai_response = ai_response.replace("system:", "")
-                ai_response = ai_response.replace("user:", "")
-                
-                # Remove any closing tags
-                ai_response = ai_response.replace("</s>", "")
-                
-                # Trim whitespace
-                ai_response = ai_response.strip()
+                cache_response(user_message, conversation_history, ai_response)
             
-            # Save the response to the database
-            AIChatMessage.objects.create(
-                user=user,
-                session_id=session_id,
-                role="assistant",
-                content=ai_response
-            )
+            # Save the turn to the database
+            record_turn(user, session_id, user_message, ai_response)
             
             return {
                 "response": ai_response,
@@ -272,15 +287,11 @@ responses like a terminal spitting code.
         elif response.status_code == 503:
             # Model is loading
             logger.warning("Hugging Face model is loading. Using fallback response.")
+            inference_breaker.record_failure("Model is loading", latency)
             fallback_response = "I'm currently loading my thinking capabilities. Please try again in a moment."
             
-            # Save the fallback response to the database
-            AIChatMessage.objects.create(
-                user=user,
-                session_id=session_id,
-                role="assistant",
-                content=fallback_response
-            )
+            # Save the turn to the database
+            record_turn(user, session_id, user_message, fallback_response)
             
             return {
                 "response": fallback_response,
@@ -291,65 +302,58 @@ responses like a terminal spitting code.
             # Handle API errors
             logger.error(f"API request failed with status code {response.status_code}: {response.text}")
             
-            # Try a simpler format as fallback
-            try:
-                # Create a simpler prompt format
-                simple_prompt = f"<s>[INST] You are an assistant for Sameer Gul's portfolio website. Answer this question: {user_message} [/INST]"
+            inference_breaker.record_failure(f"HTTP {response.status_code}", latency)
+            
+            # Try a simpler format as fallback, unless that failure tripped the breaker
+            if inference_breaker.state == CLOSED:
+                try:
+                    # Create a simpler prompt format
+                    simple_prompt = f"<s>[INST] You are an assistant for Sameer Gul's portfolio website. Answer this question: {user_message} [/INST]"
                 
-                simple_payload = {
-                    "inputs": simple_prompt,
-                    "parameters": {
-                        "max_new_tokens": 200,
-                        "temperature": 0.5,
-                        "do_sample": True
+                    simple_payload = {
+                        "inputs": simple_prompt,
+                        "parameters": {
+                            "max_new_tokens": 200,
+                            "temperature": 0.5,
+                            "do_sample": True
+                        }
                     }
-                }
                 
-                # Try again with the simpler payload
-                fallback_response = requests.post(
-                    MODEL_URL,
-                    headers=headers,
-                    json=simple_payload,
-                    timeout=30
-                )
+                    # Try again with the simpler payload
+                    fallback_response = requests.post(
+                        model_url,
+                        headers=headers,
+                        json=simple_payload,
+                        timeout=REQUEST_TIMEOUT
+                    )
                 
-                if fallback_response.status_code == 200:
-                    result = fallback_response.json()
+                    if fallback_response.status_code == 200:
+                        result = fallback_response.json()
                     
-                    # Extract the response text
-                    if isinstance(result, list) and len(result) > 0:
-                        ai_response = result[0].get("generated_text", "")
-                    else:
-                        ai_response = result.get("generated_text", "")
+                        # Extract the response text
+                        if isinstance(result, list) and len(result) > 0:
+                            ai_response = result[0].get("generated_text", "")
+                        else:
+                            ai_response = result.get("generated_text", "")
                         
-                    # Clean up the response if needed
-                    if ai_response:
-                        # Save the response to the database
-                        AIChatMessage.objects.create(
-                            user=user,
-                            session_id=session_id,
-                            role="assistant",
-                            content=ai_response
-                        )
+                        # Clean up the response if needed
+                        if ai_response:
+                            # Save the turn to the database
+                            record_turn(user, session_id, user_message, ai_response)
                         
-                        return {
-                            "response": ai_response,
-                            "session_id": session_id
-                        }
+                            return {
+                                "response": ai_response,
+                                "session_id": session_id
+                            }
             
-            except Exception as inner_e:
-                logger.error(f"Fallback API request failed: {str(inner_e)}")
+                except Exception as inner_e:
+                    logger.error(f"Fallback API request failed: {str(inner_e)}")
             
             # If all else fails, use our predefined responses
             fallback_response = get_fallback_response(user_message)
             
-            # Save the fallback response to the database
-            AIChatMessage.objects.create(
-                user=user,
-                session_id=session_id,
-                role="assistant",
-                content=fallback_response
-            )
+            # Save the turn to the database
+            record_turn(user, session_id, user_message, fallback_response)
             
             return {
                 "response": fallback_response,
@@ -358,15 +362,11 @@ responses like a terminal spitting code.
     
     except requests.exceptions.Timeout:
         logger.error("API request timed out")
+        inference_breaker.record_failure("Timed out", time.monotonic() - started)
         fallback_response = get_fallback_response(user_message)
         
-        # Save the fallback response to the database
-        AIChatMessage.objects.create(
-            user=user,
-            session_id=session_id,
-            role="assistant",
-            content=fallback_response
-        )
+        # Save the turn to the database
+        record_turn(user, session_id, user_message, fallback_response)
         
         return {
             "response": fallback_response,
@@ -375,21 +375,99 @@ responses like a terminal spitting code.
     
     except Exception as e:
         logger.error(f"API request failed: {str(e)}")
+        if isinstance(e, (requests.exceptions.RequestException, ValueError)):
+            inference_breaker.record_failure(str(e), time.monotonic() - started)
         fallback_response = get_fallback_response(user_message)
         
-        # Save the fallback response to the database
-        AIChatMessage.objects.create(
-            user=user,
-            session_id=session_id,
-            role="assistant",
-            content=fallback_response
-        )
+        # Save the turn to the database
+        record_turn(user, session_id, user_message, fallback_response)
         
         return {
             "response": fallback_response,
             "session_id": session_id
         }
 
+async def stream_ai_response(user_message, session_id, user=None):
+    """
+    Stream a response from the AI model as a sequence of events:
+
+        {"token": "..."} for every generated chunk, then
+        {"done": True, "session_id": ..., "response": "<full text>"}
+
+    Endpoint failures never trigger a second request: a predefined answer
+    is streamed instead, so a slow endpoint holds no worker for longer than
+    the configured timeouts. If the client goes away the generator is
+    cancelled, which also closes the upstream request.
+    """
+    if not get_api_key():
+        logger.warning("Hugging Face API key not configured. Using fallback response.")
+        fallback_response = await sync_to_async(get_fallback_response)(user_message)
+        yield {"token": fallback_response}
+        yield {"done": True, "session_id": session_id, "response": fallback_response}
+        return
+
+    conversation_history = await sync_to_async(load_conversation_history)(session_id, user)
+
+    # Skip the round trip for questions we can already answer
+    ai_response = await sync_to_async(get_answer_without_model)(user_message, conversation_history)
+    if ai_response is not None:
+        await sync_to_async(record_turn)(user, session_id, user_message, ai_response)
+        yield {"token": ai_response}
+        yield {"done": True, "session_id": session_id, "response": ai_response}
+        return
+
+    prompt = await sync_to_async(build_prompt)(user_message, conversation_history)
+
+    chunks = []
+    error = None
+    if not await sync_to_async(inference_breaker.allow_request)():
+        # Don't wait on an endpoint that keeps failing
+        logger.warning("Inference circuit breaker is open. Using fallback response.")
+        error = "Inference temporarily unavailable"
+    else:
+        started = time.monotonic()
+        try:
+            async for token in stream_generated_tokens(prompt, GENERATION_PARAMETERS):
+                chunks.append(token)
+                yield {"token": token}
+        except InferenceError as e:
+            logger.error(str(e))
+            error = "Model is loading" if e.status_code == 503 else "Inference request failed"
+        except httpx.TimeoutException:
+            logger.error("Streaming API request timed out")
+            error = "Inference request timed out"
+        except httpx.HTTPError as e:
+            logger.error(f"Streaming API request failed: {str(e)}")
+            error = "Inference request failed"
+        except asyncio.CancelledError:
+            logger.info(f"AI chat stream for session {session_id} cancelled by the client")
+            raise
+
+        latency = time.monotonic() - started
+        if error:
+            await sync_to_async(inference_breaker.record_failure)(error, latency)
+        else:
+            await sync_to_async(inference_breaker.record_success)(latency)
+
+    ai_response = clean_ai_response("".join(chunks))
+    if ai_response and not error:
+        await sync_to_async(cache_response)(user_message, conversation_history, ai_response)
+    if not ai_response:
+        # Nothing usable was generated; answer from the predefined responses
+        if error == "Model is loading":
+            ai_response = "I'm currently loading my thinking capabilities. Please try again in a moment."
+        else:
+            ai_response = await sync_to_async(get_fallback_response)(user_message)
+        yield {"token": ai_response}
+
+    # Save the turn to the database
+    await sync_to_async(record_turn)(user, session_id, user_message, ai_response)
+
+    done = {"done": True, "session_id": session_id, "response": ai_response}
+    if error:
+        done["error"] = error
+    yield done
+
 def generate_session_id():
     """
     Generate a unique session ID for a new chat conversation
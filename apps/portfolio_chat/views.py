@@ -2,39 +2,98 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from django.db.models import Q
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from .models import Conversation, Message, Notification, AIChatMessage
+from .models import Conversation, ConversationReadState, Message, Notification, AIChatMessage
 from .serializers import ConversationSerializer, MessageSerializer, NotificationSerializer, AIChatMessageSerializer
 from django.conf import settings
-from django.http import FileResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth import get_user_model
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
-from .utils import send_message_notification, get_ai_response, generate_session_id
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from asgiref.sync import sync_to_async
+from apps.core.file_delivery import serve_file
+from .utils import get_ai_response, stream_ai_response, generate_session_id
+from .presence import PRESENCE_TTL, PresenceMixin, mark_active, presence_of, set_typing, typing_user_ids
+from .pubsub import publish
+from .pagination import MessageCursorPagination, UserSearchPagination
+import json
 import logging
 from rest_framework import serializers
 
+USER_PICKER_FIELDS = ('id', 'email', 'first_name', 'last_name')
+
+
+def user_picker_response(request):
+    """
+    A page of other users matching ?q= (prefix of email, first or last name)
+
+    Rows are projected with .values(), so no User instances are built.
+    """
+    User = get_user_model()
+    users = User.objects.search(request.query_params.get('q', '')).exclude(
+        id=request.user.id
+    ).values(*USER_PICKER_FIELDS)
+    paginator = UserSearchPagination()
+    page = paginator.paginate_queryset(users, request)
+    return paginator.get_paginated_response(page)
+
+
 class UserListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        User = get_user_model()
-        users = User.objects.exclude(id=request.user.id)
-        return Response([{
-            'id': user.id,
-            'email': user.email,
-            'username': user.username,
-            'first_name': user.first_name,
-            'last_name': user.last_name
-        } for user in users])
-
-class ConversationViewSet(viewsets.ModelViewSet):
+        return user_picker_response(request)
+
+class ConversationViewSet(PresenceMixin, viewsets.ModelViewSet):
     serializer_class = ConversationSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
     def get_queryset(self):
-        return Conversation.objects.filter(participants=self.request.user)
+        user = self.request.user
+        last_message = Message.objects.filter(
+            conversation=OuterRef('pk')
+        ).order_by('-id').values('id')[:1]
+        read_up_to = ConversationReadState.objects.filter(
+            conversation=OuterRef('pk'),
+            user=user
+        ).values('last_read_message_id')[:1]
+        # Messages from others past the user's read watermark
+        unread_count = Message.objects.filter(
+            conversation=OuterRef('pk'),
+            id__gt=OuterRef('last_read_message_id')
+        ).exclude(sender=user).values('conversation').annotate(
+            count=Count('id')
+        ).values('count')
+        return Conversation.objects.filter(participants=user).annotate(
+            last_message_id=Subquery(last_message),
+            last_read_message_id=Coalesce(Subquery(read_up_to), 0)
+        ).annotate(
+            unread_count=Coalesce(Subquery(unread_count), 0)
+        ).prefetch_related('participants')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        conversations = list(page if page is not None else queryset)
+
+        # Load every conversation's last message (and its sender) in one query
+        last_messages = Message.objects.select_related('sender').in_bulk(
+            [c.last_message_id for c in conversations if c.last_message_id]
+        )
+        for conversation in conversations:
+            conversation.last_message = last_messages.get(conversation.last_message_id)
+
+        serializer = self.get_serializer(conversations, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         conversation = serializer.save()
@@ -51,9 +110,68 @@ class ConversationViewSet(viewsets.ModelViewSet):
                 {"error": "You are not a participant in this conversation"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        messages = conversation.messages.order_by('created_at')  # Order by oldest first
-        serializer = MessageSerializer(messages, many=True, context={'request': request})
-        return Response(serializer.data)
+        messages = conversation.messages.select_related('sender')
+        paginator = MessageCursorPagination()
+        page = paginator.paginate_queryset(messages, request, view=self)
+        serializer = MessageSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def mark_read(self, request, pk=None):
+        """
+        Mark every message up to message_id (default: the latest) as read
+
+        Moves the caller's read watermark with one query instead of one
+        request per message, and clears the matching notifications and
+        per-message flags with one bulk UPDATE each.
+        """
+        conversation = self.get_object()
+        message_id = request.data.get('message_id') or conversation.last_message_id
+        try:
+            message_id = int(message_id) if message_id else None
+        except (TypeError, ValueError):
+            return Response({'error': 'message_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not message_id or conversation.last_message_id is None:
+            # Nothing to mark, or no messages yet
+            return Response({'last_read_message_id': conversation.last_read_message_id, 'unread_count': 0})
+        # Nothing past the latest message can have been read
+        message_id = min(message_id, conversation.last_message_id)
+
+        now = timezone.now()
+        ConversationReadState.advance(conversation.id, request.user, message_id)
+        Notification.objects.filter(
+            recipient=request.user,
+            related_conversation=conversation,
+            related_message_id__lte=message_id,
+            is_read=False
+        ).update(is_read=True, read_at=now)
+        conversation.messages.filter(id__lte=message_id, is_read=False).exclude(
+            sender=request.user
+        ).update(is_read=True, read_at=now)
+
+        last_read = max(message_id, conversation.last_read_message_id)
+        unread_count = conversation.messages.filter(id__gt=last_read).exclude(sender=request.user).count()
+        return Response({'last_read_message_id': last_read, 'unread_count': unread_count})
+
+    @action(detail=True, methods=['get', 'post'])
+    def typing(self, request, pk=None):
+        """
+        GET lists the participants typing right now; POST {"typing": bool}
+        starts or stops the caller's indicator and pushes it to the others
+        """
+        conversation = self.get_object()
+        if request.method == 'POST':
+            is_typing = request.data.get('typing', True) not in (False, 'false', '0', 0)
+            set_typing(conversation.id, request.user.id, is_typing)
+            others = [p.id for p in conversation.participants.all() if p.id != request.user.id]
+            publish(others, {
+                'type': 'typing',
+                'conversation': conversation.id,
+                'user': request.user.id,
+                'typing': is_typing,
+            })
+        typing = [user_id for user_id in typing_user_ids(conversation.id) if user_id != request.user.id]
+        return Response({'typing': typing})
 
     @action(detail=True, methods=['post'])
     def send_message(self, request, pk=None):
@@ -72,36 +190,6 @@ class ConversationViewSet(viewsets.ModelViewSet):
                 conversation=conversation
             )
             
-            # Send email notification to other participants
-            for participant in conversation.participants.all():
-                if participant != request.user:
-                    try:
-                        # Create message preview
-                        message_preview = message.content[:200] + '...' if len(message.content) > 200 else message.content
-                        if message.file:
-                            message_preview = f"File: {message.file_name}\n{message_preview}"
-                        
-                        # Send notification using Django's email system
-                        from .utils import send_message_notification
-                        
-                        # Handle admin users with empty names
-                        if request.user.is_staff:
-                            sender_display_name = "Admin"
-                        else:
-                            sender_display_name = request.user.get_full_name() or request.user.username or request.user.email
-                        
-                        success = send_message_notification(
-                            recipient_email=participant.email,
-                            sender_name=sender_display_name,
-                            message_preview=message_preview
-                        )
-                        if success:
-                            logging.info(f"Email notification sent to {participant.email}")
-                        else:
-                            logging.warning(f"Failed to send email notification to {participant.email}")
-                    except Exception as e:
-                        logging.error(f"Failed to send email to {participant.email}: {str(e)}")
-
             return Response(MessageSerializer(message, context={'request': request}).data)
         else:
             # Log the validation errors for debugging
@@ -110,24 +198,18 @@ class ConversationViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def available_users(self, request):
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        users = User.objects.exclude(id=request.user.id)
-        return Response([{
-            'id': user.id,
-            'email': user.email,
-            'username': user.username,
-            'first_name': user.first_name,
-            'last_name': user.last_name
-        } for user in users])
-
-class MessageViewSet(viewsets.ModelViewSet):
+        return user_picker_response(request)
+
+class MessageViewSet(PresenceMixin, viewsets.ModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
+        messages = Message.objects.filter(conversation__participants=self.request.user)
         conversation_id = self.kwargs.get('conversation_pk')
-        return Message.objects.filter(conversation_id=conversation_id)
+        if conversation_id:
+            messages = messages.filter(conversation_id=conversation_id)
+        return messages
 
     def perform_create(self, serializer):
         conversation_id = self.kwargs.get('conversation_pk')
@@ -143,36 +225,6 @@ class MessageViewSet(viewsets.ModelViewSet):
                 conversation=conversation
             )
             
-            # Send email notification to other participants
-            for participant in conversation.participants.all():
-                if participant != self.request.user:
-                    try:
-                        # Create message preview
-                        message_preview = message.content[:100] + '...' if len(message.content) > 100 else message.content
-                        if message.file:
-                            message_preview = f"File: {message.file_name}" + (f" - {message_preview}" if message.content else "")
-                        
-                        # Send notification using Django's email system
-                        from .utils import send_message_notification
-                        
-                        # Handle admin users with empty names
-                        if self.request.user.is_staff:
-                            sender_display_name = "Admin"
-                        else:
-                            sender_display_name = self.request.user.get_full_name() or self.request.user.username or self.request.user.email
-                        
-                        success = send_message_notification(
-                            recipient_email=participant.email,
-                            sender_name=sender_display_name,
-                            message_preview=message_preview
-                        )
-                        
-                        if success:
-                            logging.info(f"Email notification sent to {participant.email}")
-                        else:
-                            logging.warning(f"Failed to send email notification to {participant.email}")
-                    except Exception as e:
-                        logging.error(f"Failed to send email to {participant.email}: {str(e)}")
             return message
         except Conversation.DoesNotExist:
             raise serializers.ValidationError({"error": f"Conversation with id {conversation_id} does not exist"})
@@ -181,6 +233,8 @@ class MessageViewSet(viewsets.ModelViewSet):
     def mark_as_read(self, request, pk=None):
         message = self.get_object()
         message.mark_as_read()
+        if message.sender_id != request.user.id:
+            ConversationReadState.advance(message.conversation_id, request.user, message.id)
         return Response(MessageSerializer(message, context={'request': request}).data)
 
     @action(detail=True, methods=['get'])
@@ -188,14 +242,9 @@ class MessageViewSet(viewsets.ModelViewSet):
         message = self.get_object()
         if not message.file:
             return Response({'error': 'No file attached'}, status=400)
-        
-        file_path = message.file.path
-        content_type = message.file_type or 'application/octet-stream'
-        response = FileResponse(open(file_path, 'rb'), content_type=content_type)
-        response['Content-Disposition'] = f'attachment; filename="{message.file_name}"'
-        return response
+        return serve_file(request, message.file, filename=message.file_name)
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(PresenceMixin, viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -214,6 +263,35 @@ class NotificationViewSet(viewsets.ModelViewSet):
         notification.mark_as_read()
         return Response(NotificationSerializer(notification).data)
 
+class PresenceView(PresenceMixin, APIView):
+    """
+    GET ?user_ids=1,2,3 reports who is online and when they were last seen,
+    for the caller and the users they share a conversation with (other ids
+    are left out); POST is a heartbeat keeping the caller online for
+    CHAT_PRESENCE_TTL seconds and is answered from the cache alone.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_user_ids = 200
+
+    def get(self, request):
+        try:
+            user_ids = [int(i) for i in request.query_params.get('user_ids', '').split(',') if i.strip()]
+        except ValueError:
+            return Response({'error': 'user_ids must be a comma-separated list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(user_ids) > self.max_user_ids:
+            return Response({'error': f'At most {self.max_user_ids} user_ids per request'}, status=status.HTTP_400_BAD_REQUEST)
+        visible = set(
+            get_user_model().objects.filter(id__in=user_ids, conversations__participants=request.user)
+            .values_list('id', flat=True)
+        ) if user_ids else set()
+        visible.add(request.user.id)
+        user_ids = [user_id for user_id in user_ids if user_id in visible]
+        return Response({str(user_id): state for user_id, state in presence_of(user_ids).items()})
+
+    def post(self, request):
+        mark_active(request.user.id)
+        return Response({'online': True, 'ttl': PRESENCE_TTL})
+
 class AIChatView(APIView):
     permission_classes = [permissions.AllowAny]  # Allow anonymous users to chat with the AI
     
@@ -268,3 +346,45 @@ class AIChatView(APIView):
             'session_id': session_id,
             'messages': serializer.data
         })
+
+def _authenticate_optional(request):
+    """Return the JWT user of a plain Django request, or None for anonymous callers"""
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AIChatStreamView(View):
+    """
+    Async variant of AIChatView that streams the answer as server-sent events.
+
+    Each event is a JSON object on a "data:" line: {"token": ...} for every
+    generated chunk and a final {"done": true, "session_id": ..., "response": ...}.
+    Served without a worker thread under ASGI, so a slow inference endpoint
+    does not pin a worker; a client disconnect cancels the upstream request.
+    """
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+
+        user_message = data.get('message')
+        if not user_message:
+            return JsonResponse({'error': 'Message is required'}, status=status.HTTP_400_BAD_REQUEST)
+        session_id = data.get('session_id') or generate_session_id()
+
+        # Get the authenticated user if available
+        user = await sync_to_async(_authenticate_optional)(request)
+
+        async def event_stream():
+            async for event in stream_ai_response(user_message, session_id, user):
+                yield f"data: {json.dumps(event)}\n\n"
+
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Don't let a proxy buffer the stream
+        return response
@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
 from django.db.models import Q
+from apps.core.file_delivery import serve_file
 from apps.hiring.models import HiringRequest
 from apps.payments.models import Transaction
 from .models import (
@@ -63,6 +64,11 @@ class UserDocumentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        document = self.get_object()
+        return serve_file(request, document.file)
+
     @action(detail=True, methods=['post'])
     def archive(self, request, pk=None):
         document = self.get_object()
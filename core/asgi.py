@@ -14,4 +14,15 @@ load_dotenv(env_path)
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.production')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up: the websocket handler touches models
+from apps.portfolio_chat.realtime import chat_websocket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Serve HTTP through Django and chat push over WebSockets"""
+    if scope['type'] == 'websocket':
+        await chat_websocket(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -37,6 +37,7 @@ THIRD_PARTY_APPS = [
 ]
 
 LOCAL_APPS = [
+    'apps.core',
     'apps.accounts',
     'apps.portfolio',
     'apps.hiring',
@@ -79,6 +80,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -110,6 +112,14 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+FILE_DELIVERY_BACKEND = 'apps.core.file_delivery.PythonFileDelivery'  # XAccelRedirectDelivery / XSendfileDelivery behind nginx / Apache
+FILE_DELIVERY_ACCEL_PREFIX = '/protected-media/'  # Internal nginx location aliased to MEDIA_ROOT
+
+# Resumable chunked uploads (apps.core.uploads)
+UPLOAD_MAX_FILE_SIZE = 100 * 1024 * 1024  # Largest single file, in bytes
+UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024  # Largest PUT body per chunk
+UPLOAD_USER_QUOTA = 1024 * 1024 * 1024  # Total bytes of uploads (finished or not) per user
+UPLOAD_STALE_AFTER_HOURS = 24  # Unfinished uploads idle this long are removed by prune_stale_uploads
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -150,3 +160,93 @@ CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",  # Vite default development server
 ]
+
+# Cache shared by web workers and management command workers
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', str(BASE_DIR / 'cache')),
+    }
+}
+
+# Brevo transactional email API
+BREVO_API_KEY = os.environ.get('BREVO_API_KEY', '')
+BREVO_SMTP_PASSWORD = os.environ.get('BREVO_SMTP_PASSWORD', '')
+BREVO_CONNECTION_POOL_SIZE = 10  # Keep-alive connections shared by the process
+
+# Email outbox worker (python manage.py process_email_outbox)
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_BACKOFF_SECONDS = 30  # Doubles on every failed attempt
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = 3600
+EMAIL_OUTBOX_LOCK_TIMEOUT = 300  # Seconds before a stuck 'sending' row is retried
+
+# Chat email notifications (python manage.py dispatch_chat_notifications)
+CHAT_NOTIFICATION_DIGEST_WINDOW = 120  # Quiet period in seconds before a digest is sent
+CHAT_NOTIFICATION_DIGEST_MAX_DELAY = 600  # Never hold a notification longer than this
+CHAT_PRESENCE_TTL = 60  # Seconds a user counts as online after their last chat request
+CHAT_PRESENCE_LAST_SEEN_TTL = 24 * 60 * 60  # How long "last seen" is remembered after going offline
+CHAT_TYPING_TTL = 6  # Seconds a typing indicator lasts without another report
+# Fan-out backend for the websocket push channel. InProcessBroker is enough
+# when one ASGI process serves both HTTP and websockets; deployments with
+# several processes (WSGI workers next to an ASGI server, or several ASGI
+# workers) set 'apps.portfolio_chat.pubsub.DatabaseBroker' instead.
+CHAT_REALTIME_BROKER = 'apps.portfolio_chat.pubsub.InProcessBroker'
+CHAT_REALTIME_POLL_INTERVAL = 0.5  # DatabaseBroker: seconds between polls in each websocket process
+CHAT_REALTIME_EVENT_TTL = 60  # DatabaseBroker: seconds published events are kept for slow pollers
+
+# AI chat inference endpoint (Hugging Face text generation)
+HUGGINGFACE_API_KEY = os.environ.get('HUGGINGFACE_API_KEY', '')
+AI_INFERENCE_URL = os.environ.get(
+    'AI_INFERENCE_URL',
+    'https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2'
+)
+AI_CONNECT_TIMEOUT = 5  # Seconds to establish a connection to the endpoint
+AI_READ_TIMEOUT = 30  # Seconds to wait for the next chunk of a response
+AI_HTTP_POOL_SIZE = 20  # Keep-alive connections per worker event loop
+
+# AI chat response cache
+AI_RESPONSE_CACHE_TTL = 6 * 60 * 60  # Seconds a cached answer stays valid
+AI_RESPONSE_CACHE_MAX_ENTRIES = 500  # Least recently used answers are evicted beyond this
+AI_RESPONSE_CACHE_HISTORY_TURNS = 2  # Trailing turns that are part of the cache key
+AI_FALLBACK_CONFIDENCE_THRESHOLD = 0.9  # Keyword matches this confident skip the model
+AI_FALLBACK_MIN_KEYWORD_HITS = 2  # Keywords the match needs before it may skip the model
+AI_CHAT_INTENTS_CONFIG_KEY = 'ai_chat_intents'  # SystemConfiguration row with extra fallback intents
+AI_CHAT_CONFIG_RELOAD_INTERVAL = 60  # Seconds between checks for edited chat SystemConfiguration rows
+AI_HISTORY_MAX_MESSAGES = 10  # Latest turns of a session included in the prompt
+AI_HISTORY_TOKEN_BUDGET = 1024  # Estimated tokens of history allowed in the prompt
+
+# AI inference circuit breaker (python manage.py probe_inference_endpoint)
+AI_BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures that open the breaker
+AI_BREAKER_RECOVERY_TIMEOUT = 30  # Seconds open before a trial request is let through
+AI_BREAKER_LATENCY_SAMPLES = 200  # Recent request latencies kept for percentiles
+AI_PROBE_INTERVAL = 15  # Seconds between probes while the breaker is open
+
+# AI chat turn persistence
+AI_CHAT_WRITE_BEHIND = False  # Buffer turns in the process and write them in batches
+AI_CHAT_WRITE_BEHIND_BATCH_SIZE = 50  # Turns per batch insert
+AI_CHAT_WRITE_BEHIND_INTERVAL = 2.0  # Max seconds a turn waits in the buffer
+AI_CHAT_WRITE_BEHIND_MAX_BUFFERED = 1000  # Turns kept for retry while inserts fail; the oldest are dropped beyond this
+
+# Chat data retention (python manage.py prune_chat_data)
+AI_CHAT_ANONYMOUS_RETENTION_DAYS = 30
+AI_CHAT_USER_RETENTION_DAYS = 365
+CHAT_NOTIFICATION_RETENTION_DAYS = 90  # Notifications still waiting for an email digest are kept
+CHAT_RETENTION_CHUNK_SIZE = 500  # Rows deleted per transaction
+
+# AI chat prompt
+AI_PROMPT_CONFIG_KEY = 'ai_chat_prompt'  # SystemConfiguration row overriding the system prompt
+AI_PROMPT_TOKEN_BUDGET = 3072  # Estimated tokens of prompt sent to the model
+AI_PROMPT_CHAR_BUDGET = 16000
+
+# Admin dashboard
+ADMIN_STATS_CACHE_TTL = 60  # Seconds the admin_stats snapshot is served before a rebuild
+DAILY_STATS_WATERMARK_OVERLAP = 300  # Seconds before its start each rollup pass leaves for the next one to re-read
+
+# Analytics event ingestion (POST /api/v1/dashboard/analytics/ingest/)
+ANALYTICS_INGEST_RATE = '120/min'  # Event batches per user (or IP when anonymous)
+ANALYTICS_BUFFER_SIZE = 200  # Buffered events that trigger a batch insert
+ANALYTICS_FLUSH_INTERVAL = 5.0  # Max seconds an event waits in the buffer
+ANALYTICS_MAX_BUFFERED = 10000  # Events kept for retry while inserts fail; the oldest are dropped beyond this
+ANALYTICS_MAX_BATCH_EVENTS = 100  # Events accepted per request
+ANALYTICS_MAX_EVENT_DATA_BYTES = 2048  # Size of an event's data as JSON
@@ -17,6 +17,7 @@ api_v1_patterns = [
     path('dashboard/', include('apps.dashboard.urls')),
     path('user-dashboard/', include('apps.user_dashboard.urls')),
     path('chat/', include('apps.portfolio_chat.urls')),  # Add chat URLs
+    path('uploads/', include('apps.core.urls')),
     path('create-payment-intent/', create_payment_intent, name='create-payment-intent'),
     path('webhook/', webhook, name='webhook'),
 ]